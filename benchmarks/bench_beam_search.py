@@ -0,0 +1,86 @@
+'''
+Benchmark the beam search of BERT inputs with several masks. Compare the
+former expansion, which predicts the next mask for every prediction of the
+first mask, with beam searches of several widths. The predictions are
+compared with the exhaustive ranking by joint probability, which is the
+beam search with a width of top k.
+Run with python -m benchmarks.bench_beam_search
+'''
+from timeit import default_timer
+
+from src.bert_strategy import BertStrategy, TOP_K_PREDICTIONS
+from src.semantic_sequence import MASK
+from benchmarks.bench_bert_batching import INFLECTION_DICT, bert_inputs
+
+BEAM_WIDTHS = [1, 5, 10, 20]
+
+
+def expand_all(strategy: BertStrategy, bert_texts: [str]) -> [[([str], float)]]:
+    '''
+    Former prediction of inputs with several masks, which predicts the
+    following masks for every prediction of the first mask.
+    :param strategy: strategy with batch size
+    :param bert_texts: bert inputs
+    :return: Top k predictions of every input
+    '''
+    top_k_preds = strategy._predict_first_masks(bert_texts)
+    multi_mask_idx = [idx for idx, bert_text in enumerate(bert_texts)
+                      if bert_text.count(MASK) > 1]
+    next_texts = [bert_texts[idx].replace(MASK, pred[-1], 1)
+                  for idx in multi_mask_idx for pred, _ in top_k_preds[idx]]
+    next_preds = iter(expand_all(strategy, next_texts)) if next_texts else iter([])
+    for idx in multi_mask_idx:
+        top_k_preds[idx] = [(pred + pred_for_next_mask, prob) for pred, _ in top_k_preds[idx]
+                            for pred_for_next_mask, prob in next(next_preds)]
+    return top_k_preds
+
+
+def measure(strategy: BertStrategy, predict, bert_texts: [str]) -> (float, int, list):
+    '''
+    Measure prediction of bert_texts.
+    :param strategy: strategy with counter of predicted inputs
+    :param predict: prediction function
+    :param bert_texts: bert inputs
+    :return: (seconds, number of predicted inputs, predictions)
+    '''
+    num_predicted = strategy.num_predicted
+    start = default_timer()
+    top_k_preds = predict(bert_texts)
+    return default_timer() - start, strategy.num_predicted - num_predicted, top_k_preds
+
+
+def overlap(top_k_preds: list, reference: list) -> float:
+    '''
+    Return mean share of the predictions of reference, which are part of top_k_preds.
+    :param top_k_preds: predictions of every input
+    :param reference: exhaustive predictions of every input
+    :return: overlap between 0 and 1
+    '''
+    shares = [len({tuple(pred) for pred, _ in preds} & {tuple(pred) for pred, _ in ref_preds})
+              / len(ref_preds) for preds, ref_preds in zip(top_k_preds, reference)]
+    return sum(shares) / len(shares)
+
+
+def main():
+    strategy = BertStrategy(INFLECTION_DICT, beam_width=TOP_K_PREDICTIONS)
+    bert_texts = [bert_text for bert_text in bert_inputs(strategy) if bert_text.count(MASK) > 1]
+    strategy._predict_first_masks(bert_texts[:1])  # Load model before measurement
+
+    print('{} bert inputs with several masks'.format(len(bert_texts)))
+    print('{:>12} {:>10} {:>12} {:>10}'.format('decoding', 'time [s]', 'predicted', 'overlap'))
+    _, _, reference = measure(strategy, strategy._predict_masks_batch, bert_texts)
+    seconds, num_predicted, top_k_preds = measure(
+        strategy, lambda texts: expand_all(strategy, texts), bert_texts)
+    print('{:>12} {:>10.2f} {:>12} {:>10.3f}'.format('expand all', seconds, num_predicted,
+                                                     overlap(top_k_preds, reference)))
+    for beam_width in BEAM_WIDTHS:
+        strategy.beam_width = beam_width
+        seconds, num_predicted, top_k_preds = measure(strategy, strategy._predict_masks_batch,
+                                                      bert_texts)
+        print('{:>12} {:>10.2f} {:>12} {:>10.3f}'.format('beam ' + str(beam_width), seconds,
+                                                         num_predicted,
+                                                         overlap(top_k_preds, reference)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+'''
+Benchmark the batched prediction of the masked BERT inputs. The first mask
+of all inputs of some qualia theorems is predicted one input per forward pass
+and in padded batches. Compare the throughput in sentences per second and
+the agreement of the top k predictions with the unbatched prediction.
+Run with python -m benchmarks.bench_bert_batching
+'''
+from timeit import default_timer
+
+from src.bert_strategy import BertStrategy
+from src.qualia_structure import DebugQualiaStructure
+
+THEOREMS = ['dog', 'car', 'computer', 'house', 'knife', 'book', 'chair', 'phone']
+INFLECTION_DICT = {theorem: theorem + 's' for theorem in THEOREMS}
+BATCH_SIZES = [8, 16, 32, 64]
+
+
+def bert_inputs(strategy: BertStrategy) -> [str]:
+    '''
+    Return unique bert inputs of all semantic sequences of THEOREMS.
+    :param strategy: strategy to inflect the theorems
+    :return: list of bert inputs
+    '''
+    bert_texts = []
+    for theorem in THEOREMS:
+        sing, plu = strategy.inflect_sing_plural(theorem)
+        for role in DebugQualiaStructure(theorem).all_roles:
+            for sem_seq in role.get_all_pattern():
+                bert_texts += sem_seq.get_bert_input(plu if sem_seq.is_plural else sing)
+    return list(dict.fromkeys(bert_texts))
+
+
+def predict(strategy: BertStrategy, bert_texts: [str], batched: bool) -> (float, list):
+    '''
+    Predict the first mask of all bert_texts.
+    :param strategy: strategy with batch size
+    :param bert_texts: bert inputs
+    :param batched: predict all inputs by one call or one call per input
+    :return: (seconds, top k predictions of every input)
+    '''
+    start = default_timer()
+    if batched:
+        top_k_preds = strategy._predict_first_masks(bert_texts)
+    else:
+        top_k_preds = [strategy._predict_first_masks([bert_text])[0]
+                       for bert_text in bert_texts]
+    return default_timer() - start, top_k_preds
+
+
+def agreement(top_k_preds: list, reference: list) -> float:
+    '''
+    Return mean share of equal predicted words of top_k_preds and reference.
+    :param top_k_preds: top k predictions of every input
+    :param reference: unbatched top k predictions of every input
+    :return: agreement between 0 and 1
+    '''
+    shares = [len({tuple(pred) for pred, _ in preds} & {tuple(pred) for pred, _ in ref_preds})
+              / len(ref_preds) for preds, ref_preds in zip(top_k_preds, reference)]
+    return sum(shares) / len(shares)
+
+
+def main():
+    strategy = BertStrategy(INFLECTION_DICT, batch_size=1)
+    bert_texts = bert_inputs(strategy)
+    predict(strategy, bert_texts[:1], batched=False)  # Load model before measurement
+
+    print('{} bert inputs of {} theorems'.format(len(bert_texts), len(THEOREMS)))
+    print('{:>12} {:>10} {:>14} {:>10}'.format('batch size', 'time [s]', 'sentences/s',
+                                               'agreement'))
+    seconds, reference = predict(strategy, bert_texts, batched=False)
+    print('{:>12} {:>10.2f} {:>14.1f} {:>10.3f}'.format('unbatched', seconds,
+                                                        len(bert_texts) / seconds, 1.0))
+    for batch_size in BATCH_SIZES:
+        strategy.batch_size = batch_size
+        seconds, top_k_preds = predict(strategy, bert_texts, batched=True)
+        print('{:>12} {:>10.2f} {:>14.1f} {:>10.3f}'.format(
+            batch_size, seconds, len(bert_texts) / seconds, agreement(top_k_preds, reference)))
+
+
+if __name__ == '__main__':
+    main()
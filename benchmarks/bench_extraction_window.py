@@ -0,0 +1,104 @@
+'''
+Benchmark the sentence window extraction on the sentences of the pattern tests.
+Every sentence is embedded into a synthetic search item between other sentences
+of the corpus. Compare parse time and extracted qualia elements of every window
+with the parsing of the whole search item.
+Run with python -m benchmarks.bench_extraction_window
+'''
+import random
+from collections import defaultdict
+from timeit import default_timer
+
+from src.extraction_window import SENTENCE
+from src.qualia_structure import SearchEngineStrategy
+from src.requester import WebRequester
+from src.semantic_sequence import SemanticSequence
+from test.test_sequence_matcher import CORPUS
+
+WINDOWS = [None, SENTENCE, 10, 5]
+NUM_CONTEXT_SENTENCES = 2  # Sentences before and after the sentence of the corpus
+REPEATS = 3
+
+
+class CorpusRequester(WebRequester):
+    '''
+    Return the synthetic search items of the corpus for the class of the
+    semantic sequence and the theorem.
+    '''
+
+    def __init__(self, seq_name_theorem_to_items: dict):
+        self.seq_name_theorem_to_items = seq_name_theorem_to_items
+
+    def search_for_patter(self, pattern: SemanticSequence, qualia_theorem: str) -> [str]:
+        return self.seq_name_theorem_to_items.get((repr(pattern), qualia_theorem), [])
+
+    def pattern_request(self, pattern: SemanticSequence, qualia_theorem: str) -> str:
+        return '"{}"'.format(pattern.get_search_requests(qualia_theorem))
+
+
+def create_search_items(seed: int = 0) -> dict:
+    '''
+    Embed every sentence of the corpus between random sentences of the corpus.
+    :param seed: seed of random generator
+    :return: dict which map (name of semantic sequence, theorem) to search items
+    '''
+    rand = random.Random(seed)
+    sentences = [sentence for _, _, sentence in CORPUS]
+    seq_name_theorem_to_items = defaultdict(list)
+    for semantic_seq, qualia_theorem, sentence in CORPUS:
+        context = rand.sample(sentences, 2 * NUM_CONTEXT_SENTENCES)
+        search_item = ' '.join(context[:NUM_CONTEXT_SENTENCES] + [sentence] +
+                               context[NUM_CONTEXT_SENTENCES:])
+        seq_name_theorem_to_items[(repr(semantic_seq), qualia_theorem)].append(search_item)
+    return seq_name_theorem_to_items
+
+
+def extract_all(requester: CorpusRequester, qualia_theorems: [str], window) -> (float, dict):
+    '''
+    Extract qualia elements of all theorems with the window.
+    :param requester: requester of the search items
+    :param qualia_theorems: theorems of the corpus
+    :param window: extraction window
+    :return: (seconds, dict which map (theorem, semantic sequence) to extracted elements)
+    '''
+    strategy = SearchEngineStrategy({theorem: theorem for theorem in qualia_theorems},
+                                    requester=requester, metric=None,
+                                    extraction_window=window)
+    start = default_timer()
+    results = strategy.extract_qualia_structures(qualia_theorems)
+    seconds = default_timer() - start
+
+    extractions = dict()
+    for qualia_theorem, structure in results:
+        for role in structure.all_roles:
+            for semantic_seq, qualia_elements in role.sem_seq_to_qe.items():
+                extractions[(qualia_theorem, repr(semantic_seq))] = \
+                    {qualia_element.str for qualia_element in qualia_elements}
+    return seconds, extractions
+
+
+def main():
+    requester = CorpusRequester(create_search_items())
+    qualia_theorems = list(dict.fromkeys(theorem for _, theorem, _ in CORPUS))
+
+    reference = None
+    print('{:>10} {:>12} {:>10} {:>10} {:>12}'.format('window', 'time [s]', 'recall',
+                                                        'precision', 'equal seqs'))
+    for window in WINDOWS:
+        seconds, extractions = min((extract_all(requester, qualia_theorems, window)
+                                    for _ in range(REPEATS)), key=lambda result: result[0])
+        if reference is None:
+            reference = extractions
+
+        expected = sum(len(elements) for elements in reference.values())
+        found = sum(len(elements) for elements in extractions.values())
+        correct = sum(len(elements & reference[key]) for key, elements in extractions.items())
+        equal = sum(elements == reference[key] for key, elements in extractions.items())
+        print('{:>10} {:>12.4f} {:>10.3f} {:>10.3f} {:>6}/{:<5}'.format(
+            'snippet' if window is None else str(window), seconds,
+            correct / expected if expected else 1.0, correct / found if found else 1.0,
+            equal, len(extractions)))
+
+
+if __name__ == '__main__':
+    main()
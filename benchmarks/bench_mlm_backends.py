@@ -0,0 +1,57 @@
+'''
+Benchmark the inference backends of the masked language model on the BERT
+inputs of some qualia theorems. Compare latency of single inputs, throughput
+of batches in sentences per second and agreement of the top k predictions
+with the TensorFlow backend. The onnx models are exported on first run.
+Run with python -m benchmarks.bench_mlm_backends
+'''
+from statistics import median
+from timeit import default_timer
+
+from src.bert_strategy import BertStrategy
+from src.mlm_backend import BACKEND_CHOICES, TF_BACKEND, create_backend
+from benchmarks.bench_bert_batching import INFLECTION_DICT, bert_inputs, agreement
+
+BATCH_SIZE = 32
+NUM_LATENCY_INPUTS = 50
+
+
+def measure(strategy: BertStrategy, bert_texts: [str]) -> (float, float, list):
+    '''
+    Measure latency and throughput of the backend of strategy.
+    :param strategy: strategy with backend
+    :param bert_texts: bert inputs
+    :return: (median latency in ms, sentences per second, top k predictions)
+    '''
+    strategy._predict_first_masks(bert_texts[:1])  # Warm up backend
+    latencies = []
+    for bert_text in bert_texts[:NUM_LATENCY_INPUTS]:
+        start = default_timer()
+        strategy._predict_first_masks([bert_text])
+        latencies.append(default_timer() - start)
+
+    start = default_timer()
+    top_k_preds = strategy._predict_first_masks(bert_texts)
+    seconds = default_timer() - start
+    return median(latencies) * 1000, len(bert_texts) / seconds, top_k_preds
+
+
+def main():
+    reference = None
+    print('{:>10} {:>14} {:>14} {:>10} {:>10}'.format('backend', 'latency [ms]', 'sentences/s',
+                                                      'agreement', 'top 1'))
+    for name in BACKEND_CHOICES:
+        strategy = BertStrategy(INFLECTION_DICT, batch_size=BATCH_SIZE,
+                                backend=create_backend(name))
+        bert_texts = bert_inputs(strategy)
+        latency, throughput, top_k_preds = measure(strategy, bert_texts)
+        if name == TF_BACKEND:
+            reference = top_k_preds
+        top_1 = sum(preds[0][0] == ref_preds[0][0] for preds, ref_preds
+                    in zip(top_k_preds, reference)) / len(reference)
+        print('{:>10} {:>14.1f} {:>14.1f} {:>10.3f} {:>10.3f}'.format(
+            name, latency, throughput, agreement(top_k_preds, reference), top_1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+'''
+Benchmark the occurrence metrics on synthetic roles with up to 10k candidates.
+Compare the former rescan of the role for every element with the scoring by
+OccurrenceIndex. Run with python -m benchmarks.bench_occurrence_metrics
+'''
+import random
+from itertools import chain
+from timeit import default_timer
+
+from src.metrics import NumberOfSources, OccurrenceInRequests
+from src.qualia_structure import QualiaElement, Role, FORMAL
+
+SIZES = [1000, 2000, 5000, 10000]
+MAX_RESCAN_SIZE = 5000  # Larger roles take too long with the rescan
+
+
+def create_role(num_candidates: int, seed: int = 0) -> Role:
+    '''
+    Create formal role in which every semantic sequence extracted a random
+    subset of num_candidates elements.
+    :param num_candidates: number of different candidates
+    :param seed: seed of random generator
+    :return: synthetic role
+    '''
+    rand = random.Random(seed)
+    role = Role(*FORMAL)
+    for semantic_seq in role.get_all_pattern():
+        words = rand.sample(range(num_candidates), num_candidates // 2)
+        role.sem_seq_to_qe[semantic_seq] = [
+            QualiaElement('word{}'.format(word),
+                          sources=['source'] * rand.randint(1, 10)) for word in words]
+    return role
+
+
+def rescan_number_of_sources(db_qualia_element, debug_role) -> float:
+    '''
+    Former implementation of NumberOfSources, which rescan the role.
+    :param db_qualia_element: debug qualia element
+    :param debug_role: role of the qualia element
+    :return: metric value of db_qualia_element
+    '''
+    return sum(len(d_q_e.sources) for d_q_e in
+               chain.from_iterable(debug_role.sem_seq_to_qe.values())
+               if d_q_e == db_qualia_element)
+
+
+def rescan_occurrence_in_requests(db_qualia_element, debug_role) -> float:
+    '''
+    Former implementation of OccurrenceInRequests, which rescan the role.
+    :param db_qualia_element: debug qualia element
+    :param debug_role: role of the qualia element
+    :return: metric value of db_qualia_element
+    '''
+    return len([d_q_e for d_q_e in chain.from_iterable(debug_role.sem_seq_to_qe.values())
+                if d_q_e == db_qualia_element])
+
+
+def measure(function) -> (float, object):
+    '''
+    Measure runtime of function.
+    :param function: function without arguments
+    :return: (seconds, result of function)
+    '''
+    start = default_timer()
+    result = function()
+    return default_timer() - start, result
+
+
+def main():
+    print('{:>8} {:>22} {:>12} {:>12}'.format('size', 'metric', 'rescan [s]', 'index [s]'))
+    for size in SIZES:
+        role = create_role(size)
+        elements = list(dict.fromkeys(chain.from_iterable(role.sem_seq_to_qe.values())))
+        for metric, rescan in [(NumberOfSources(), rescan_number_of_sources),
+                               (OccurrenceInRequests(), rescan_occurrence_in_requests)]:
+            index_time, values = measure(lambda: metric.calc_metric_values(elements, role))
+            rescan_time = float('nan')
+            if size <= MAX_RESCAN_SIZE:
+                rescan_time, rescan_values = measure(
+                    lambda: [rescan(element, role) for element in elements])
+                assert rescan_values == values
+            print('{:>8} {:>22} {:>12.4f} {:>12.4f}'.format(size, metric.__class__.__name__,
+                                                             rescan_time, index_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+'''
+Benchmark the micro-batching of the http server. Concurrent clients request
+the qualia structures of THEOREMS from a QualiaServer with a warm BertStrategy.
+Compare throughput, latency and mean batch size of several batch windows.
+Every run uses a fresh in memory prediction cache, so every run predicts.
+Run with python -m benchmarks.bench_server
+'''
+import asyncio
+import json
+from timeit import default_timer
+
+from benchmarks.bench_bert_batching import THEOREMS, INFLECTION_DICT
+from src.bert_strategy import BertStrategy
+from src.prediction_cache import PredictionCache
+from src.server import QualiaServer
+from test.test_server import request
+
+BATCH_WINDOWS = [0, 0.005, 0.01, 0.05]  # Seconds
+NUM_CLIENTS = 16
+REQUESTS_PER_CLIENT = 4
+
+
+def encode_result(qualia_theorem: str, result) -> str:
+    return json.dumps({'theorem': qualia_theorem, 'failed': isinstance(result, Exception)})
+
+
+async def run_clients(server: QualiaServer) -> (float, dict):
+    '''
+    Start server on a free port and send the requests of all clients.
+    :param server: server to benchmark
+    :return: (seconds, statistics of server)
+    '''
+    started = asyncio.get_event_loop().create_future()
+    serve_task = asyncio.ensure_future(server.serve(port=0, started=started))
+    port = await started
+
+    async def client(idx: int):
+        for num in range(REQUESTS_PER_CLIENT):
+            theorem = THEOREMS[(idx + num * NUM_CLIENTS) % len(THEOREMS)]
+            await request(port, '/qualia?theorem={}'.format(theorem))
+
+    start = default_timer()
+    await asyncio.gather(*[client(idx) for idx in range(NUM_CLIENTS)])
+    seconds = default_timer() - start
+    _, stats = await request(port, '/stats')
+    serve_task.cancel()
+    await asyncio.gather(serve_task, return_exceptions=True)
+    return seconds, stats
+
+
+def main():
+    print('{:>12} {:>12} {:>10} {:>10} {:>10} {:>12}'.format('window [ms]', 'req/s', 'p50 [ms]',
+                                                            'p95 [ms]', 'batches',
+                                                            'batch size'))
+    for batch_window in BATCH_WINDOWS:
+        strategy = BertStrategy(INFLECTION_DICT, prediction_cache=PredictionCache(':memory:'))
+        server = QualiaServer(strategy, encode_result, batch_window=batch_window)
+        seconds, stats = asyncio.run(run_clients(server))
+        print('{:>12} {:>12.2f} {:>10.1f} {:>10.1f} {:>10} {:>12.2f}'.format(
+            1000 * batch_window, stats['requests'] / seconds, stats['latencyMs']['p50'],
+            stats['latencyMs']['p95'], stats['batches'], stats['meanBatchSize']))
+
+
+if __name__ == '__main__':
+    main()
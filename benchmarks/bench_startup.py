@@ -0,0 +1,76 @@
+'''
+Benchmark startup time and peak memory of the command line paths of
+qualia_generator.py. Every path is run as a new process, so the loading of
+the spaCy and BERT models is part of the measurement. Commands which parse
+or predict nothing should not load a model.
+Run with python -m benchmarks.bench_startup [--searchCache FILE]
+'''
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from timeit import default_timer
+
+SCRIPT = str(Path(__file__).resolve().parent.parent / 'qualia_generator.py')
+REPEATS = 3
+THEOREM = 'dog'
+
+
+def cli_paths(folder: Path, search_cache: str = None) -> [(str, [str])]:
+    '''
+    Return the measured command line paths. All files are created in folder,
+    so the benchmark does not change the caches of the working directory.
+    :param folder: temporary folder
+    :param search_cache: sqlite file of search cache, which contains all
+    requests of THEOREM, or None to skip the cached google run
+    :return: list of (name, arguments)
+    '''
+    keys_file = folder / 'apiKeys'
+    keys_file.write_text('key cx\n')
+    common = ['-k', str(keys_file), '--keyUsage', str(folder / 'keyUsage.db'),
+              '--parseCache', str(folder / 'parseCache'), '-o', str(folder / 'results')]
+
+    paths = [('help', ['--help']),
+             ('keyStatus', ['--keyStatus'] + common),
+             ('dryRun', [THEOREM, '--dryRun', '--searchCache', str(folder / 'search.db')]
+              + common)]
+    if search_cache is not None:
+        paths.append(('google cached', [THEOREM, '--searchCache', search_cache] + common))
+    paths.append(('bert', [THEOREM, '-c', 'b'] + common))
+    return paths
+
+
+def run(arguments: [str]) -> (float, int, int):
+    '''
+    Run qualia_generator.py with arguments in a new process.
+    :param arguments: command line arguments
+    :return: (seconds, peak rss in MiB, return code)
+    '''
+    start = default_timer()
+    process = subprocess.Popen([sys.executable, SCRIPT] + arguments,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    seconds = default_timer() - start
+    process.returncode = os.waitstatus_to_exitcode(status) \
+        if hasattr(os, 'waitstatus_to_exitcode') else status >> 8
+    return seconds, usage.ru_maxrss // 1024, process.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark startup of qualia_generator.py')
+    parser.add_argument('--searchCache', type=str, default=None,
+                        help='Search cache with all requests of {} to measure a cached '
+                             'google run'.format(THEOREM))
+    search_cache = parser.parse_args().searchCache
+
+    print('{:>14} {:>10} {:>14} {:>6}'.format('path', 'time [s]', 'peak rss [MiB]', 'exit'))
+    with tempfile.TemporaryDirectory() as folder:
+        for name, arguments in cli_paths(Path(folder), search_cache):
+            seconds, peak_rss, return_code = min(run(arguments) for _ in range(REPEATS))
+            print('{:>14} {:>10.2f} {:>14} {:>6}'.format(name, seconds, peak_rss, return_code))
+
+
+if __name__ == '__main__':
+    main()
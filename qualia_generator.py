@@ -3,11 +3,18 @@ Simple script to parse command line arguments load inflection dict
 and create qualia structure.
 '''
 import argparse
+import json
+import os
+import sys
 from pathlib import Path
+from time import sleep
 
 import jsonpickle
 
-from src.requester import AllKeysReachLimit
+from src.requester import AllKeysReachLimit, SearchRequestError
+from src.extraction_window import parse_window_arg, SNIPPET, SENTENCE
+from src.inflection import InflectionService, INFLECTION_TABLE
+from src.mlm_backend import BACKEND_CHOICES, TF_BACKEND, ONNX_INT8_BACKEND, ONNX_FOLDER
 from src.qualia_structure import WordNotSupportedError, CreationStrategy, DebugQualiaStructure, \
     QualiaStructure, debug_to_normal_structure
 
@@ -24,7 +31,64 @@ TOP_K_FLAG = 'topK'
 METRIC_FLAG = 'metric'
 KEYS_FLAG = 'keys'
 INFLECTION_DICT_FLAG = 'inflectionDict'
+INFLECTION_TABLE_FLAG = 'inflectionTable'
+SEARCH_CACHE_FLAG = 'searchCache'
+CACHE_TTL_FLAG = 'cacheTtl'
+CACHE_SIZE_FLAG = 'cacheSize'
+MAX_IN_FLIGHT_FLAG = 'maxInFlight'
+REQUESTS_PER_SECOND_FLAG = 'requestsPerSecond'
+KEY_USAGE_FLAG = 'keyUsage'
+DAILY_LIMIT_FLAG = 'dailyLimit'
+KEY_SCHEDULING_FLAG = 'keyScheduling'
+KEY_STATUS_FLAG = 'keyStatus'
+QUEUE_FLAG = 'queue'
+PLAN_FLAG = 'plan'
+DRY_RUN_FLAG = 'dryRun'
+PARSE_PROCESSES_FLAG = 'parseProcesses'
+PARSE_BATCH_SIZE_FLAG = 'parseBatchSize'
+PARSE_CACHE_FLAG = 'parseCache'
+PARSE_CACHE_SIZE_FLAG = 'parseCacheSize'
+EXTRACTION_WINDOW_FLAG = 'extractionWindow'
+BERT_BATCH_SIZE_FLAG = 'bertBatchSize'
+BEAM_WIDTH_FLAG = 'beamWidth'
+MASK_TOP_K_FLAG = 'maskTopK'
+BERT_BACKEND_FLAG = 'bertBackend'
+ONNX_FOLDER_FLAG = 'onnxFolder'
+PREDICTION_CACHE_FLAG = 'predictionCache'
+WORKERS_FLAG = 'workers'
+JSON_LINES_FLAG = 'jsonLines'
+RESUME_FLAG = 'resume'
+HOST_FLAG = 'host'
+PORT_FLAG = 'port'
+BATCH_WINDOW_FLAG = 'batchWindow'
+MAX_BATCH_SIZE_FLAG = 'maxBatchSize'
+SERVE_FLAG = 'serve'
+STDIN = '-'  # Input file or output file which is stdin or stdout
+STREAM_CHUNK_SIZE = 256  # Number of streamed theorems inflected together
+RESET_MARGIN = 60  # Seconds to wait after the reset of the daily quota
+SECONDS_PER_DAY = 24 * 60 * 60
 METRIC_CHOICES = ['webP', 'webJac', 'webPMI', 'occurrenceInPattern', 'numOfSources']
+ALL_METRICS = 'all'
+
+
+
+def parse_metric_names(value: str) -> [str]:
+    '''
+    Parse argument --metric, which is a name of METRIC_CHOICES, a comma
+    separated list of names or ALL_METRICS.
+    :param value: argument value
+    :return: list of metric names
+    '''
+    if value == ALL_METRICS:
+        return METRIC_CHOICES
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in METRIC_CHOICES]
+    if not names or unknown:
+        raise argparse.ArgumentTypeError('invalid metric {} (choose from {} or {})'
+                                         .format(', '.join(unknown) or value,
+                                                 ', '.join(METRIC_CHOICES), ALL_METRICS))
+    return list(dict.fromkeys(names))
+
 
 PARSER = argparse.ArgumentParser(description='Generate qualia structure for given words')
 PARSER.add_argument(WORDS, metavar='W', type=str, nargs='*', default=[],
@@ -35,7 +99,8 @@ PARSER.add_argument('-c', '--creation', type=str, default='google',
                     .format(BERT_FL, MODIFIED_BERT_FL, GOOGLE_FL))
 
 PARSER.add_argument('-i', '--{}'.format(INPUT_FILE_FLAG), type=str, default=None,
-                    help='Input file with line separated qualia theorems')
+                    help='Input file with line separated qualia theorems, {} for stdin'
+                    .format(STDIN))
 PARSER.add_argument('-w', '--{}'.format(FILE_FLAG), action='store_true',
                     help='Write output to file')
 PARSER.add_argument('-o', '--{}'.format(OUTPUT_FLAG), type=str, default='results',
@@ -48,10 +113,115 @@ PARSER.add_argument('-t', '--{}'.format(TOP_K_FLAG), type=int, default=8,
 PARSER.add_argument('--{}'.format(INFLECTION_DICT_FLAG), type=str, default='inflectionDict',
                     help='Filepath of lookup table for words which are not inflectable '
                          'by pyinflect')
-PARSER.add_argument('-m', '--{}'.format(METRIC_FLAG), type=str, choices=METRIC_CHOICES,
-                    default='numOfSources', help='Metric to rank qualia elements')
+PARSER.add_argument('--{}'.format(INFLECTION_TABLE_FLAG), type=str, default=INFLECTION_TABLE,
+                    help='File to persist the singular and plural of qualia theorems '
+                         'inflected by pyinflect')
+PARSER.add_argument('-m', '--{}'.format(METRIC_FLAG), type=parse_metric_names,
+                    default='numOfSources',
+                    help='Metric to rank qualia elements. A comma separated list or {} '
+                         'ranks by multiple metrics in one run. Choices: {}'
+                         .format(ALL_METRICS, ', '.join(METRIC_CHOICES)))
 PARSER.add_argument('-k', '--{}'.format(KEYS_FLAG), type=str, default='apiKeys',
                     help='File with api keys')
+PARSER.add_argument('--{}'.format(SEARCH_CACHE_FLAG), type=str, default='.searchRequests.db',
+                    help='Sqlite file to cache search requests')
+PARSER.add_argument('--{}'.format(CACHE_TTL_FLAG), type=float, default=None,
+                    help='Days after which cached search requests are executed again')
+PARSER.add_argument('--{}'.format(CACHE_SIZE_FLAG), type=int, default=None,
+                    help='Maximal number of cached search requests. Least recently used '
+                         'requests are removed')
+PARSER.add_argument('--{}'.format(MAX_IN_FLIGHT_FLAG), type=int, default=8,
+                    help='Maximal number of concurrently executed search requests')
+PARSER.add_argument('--{}'.format(REQUESTS_PER_SECOND_FLAG), type=float, default=None,
+                    help='Maximal number of search requests started per second')
+PARSER.add_argument('--{}'.format(KEY_USAGE_FLAG), type=str, default='.keyUsage.db',
+                    help='Sqlite file to persist the used daily quota of the api keys')
+PARSER.add_argument('--{}'.format(DAILY_LIMIT_FLAG), type=int, default=100,
+                    help='Daily limit of requests per api key')
+PARSER.add_argument('--{}'.format(KEY_SCHEDULING_FLAG), type=str, default='roundRobin',
+                    choices=['roundRobin', 'leastUsed'],
+                    help='Order in which the api keys are used')
+PARSER.add_argument('--{}'.format(KEY_STATUS_FLAG), action='store_true',
+                    help='Print used and remaining daily quota of every api key and exit')
+PARSER.add_argument('--{}'.format(QUEUE_FLAG), type=str, default=None, metavar='DIR',
+                    help='Directory of a durable queue of qualia theorems. If the limit of '
+                         'all keys is reached, the queue waits for the reset of the quota')
+PARSER.add_argument('--{}'.format(PLAN_FLAG), action='store_true',
+                    help='Plan, deduplicate and prefetch the search requests of all qualia '
+                         'theorems before creation (only google strategy)')
+PARSER.add_argument('--{}'.format(DRY_RUN_FLAG), '--dry-run', action='store_true',
+                    help='Print cached and uncached search requests per theorem, role and '
+                         'metric without executing requests (only google strategy)')
+PARSER.add_argument('--{}'.format(PARSE_PROCESSES_FLAG), type=int, default=1,
+                    help='Number of processes used to parse the search items')
+PARSER.add_argument('--{}'.format(PARSE_BATCH_SIZE_FLAG), type=int, default=64,
+                    help='Number of search items parsed together')
+PARSER.add_argument('--{}'.format(PARSE_CACHE_FLAG), type=str, default='.parseCache',
+                    metavar='DIR', help='Folder to cache parsed search items')
+PARSER.add_argument('--{}'.format(PARSE_CACHE_SIZE_FLAG), type=int, default=10000,
+                    help='Maximal number of parsed search items kept in memory')
+PARSER.add_argument('--{}'.format(EXTRACTION_WINDOW_FLAG), type=parse_window_arg,
+                    default=SNIPPET, metavar='WINDOW',
+                    help='Part of a search item which is parsed for a match: {} (default), '
+                         '{} or a number of tokens before and after the match'
+                    .format(SNIPPET, SENTENCE))
+PARSER.add_argument('--{}'.format(BERT_BATCH_SIZE_FLAG), type=int, default=32,
+                    help='Number of masked inputs predicted together by BERT')
+PARSER.add_argument('--{}'.format(BEAM_WIDTH_FLAG), type=int, default=10,
+                    help='Number of hypotheses kept after each mask of BERT inputs with '
+                         'several masks')
+PARSER.add_argument('--{}'.format(MASK_TOP_K_FLAG), type=int, default=50,
+                    help='Number of predictions of BERT per mask')
+PARSER.add_argument('--{}'.format(BERT_BACKEND_FLAG), type=str, default=TF_BACKEND,
+                    choices=BACKEND_CHOICES,
+                    help='Inference backend of BERT. The onnx backends export the model '
+                         'once and run it with ONNX Runtime, {} with int8 weights'
+                    .format(ONNX_INT8_BACKEND))
+PARSER.add_argument('--{}'.format(ONNX_FOLDER_FLAG), type=str, default=ONNX_FOLDER,
+                    metavar='DIR', help='Folder of the exported onnx models')
+PARSER.add_argument('--{}'.format(PREDICTION_CACHE_FLAG), type=str,
+                    default='.maskedPredictions.db',
+                    help='Sqlite file to cache the predictions of BERT')
+PARSER.add_argument('--{}'.format(WORKERS_FLAG), type=int, default=1,
+                    help='Number of forked processes, which create the qualia structures '
+                         'of the theorems. The models are loaded once before the fork')
+PARSER.add_argument('--{}'.format(JSON_LINES_FLAG), type=str, nargs='?', const=STDIN,
+                    default=None, metavar='FILE',
+                    help='Stream the theorems and write one json object per theorem and line '
+                         'to FILE or stdout')
+PARSER.add_argument('--{}'.format(RESUME_FLAG), action='store_true',
+                    help='Skip theorems whose structures are already written to the output '
+                         'directory (-w) or the file of --{} by a former run'
+                    .format(JSON_LINES_FLAG))
+PARSER.add_argument('--{}'.format(SERVE_FLAG), action='store_true',
+                    help='Start a http server, which creates qualia structures on request')
+PARSER.add_argument('--{}'.format(HOST_FLAG), type=str, default='127.0.0.1',
+                    help='Host of the http server')
+PARSER.add_argument('--{}'.format(PORT_FLAG), type=int, default=8765,
+                    help='Port of the http server')
+PARSER.add_argument('--{}'.format(BATCH_WINDOW_FLAG), type=float, default=10,
+                    help='Milliseconds the http server waits for further requests, which are '
+                         'created together')
+PARSER.add_argument('--{}'.format(MAX_BATCH_SIZE_FLAG), type=int, default=32,
+                    help='Maximal number of theorems the http server creates together')
+
+
+def validate_arguments():
+    '''
+    Exit with usage message if the passed arguments can not be combined.
+    :return: None
+    '''
+    if args[WORKERS_FLAG] > 1:
+        for flag in [SERVE_FLAG, DRY_RUN_FLAG, QUEUE_FLAG, PLAN_FLAG]:
+            if args[flag] not in [None, False]:
+                PARSER.error('--{} can not be combined with --{}, which runs in a single '
+                             'process'.format(WORKERS_FLAG, flag))
+    if args[SERVE_FLAG]:
+        if args[WORDS] or args[INPUT_FILE_FLAG] is not None:
+            PARSER.error('--{} does not take qualia theorems'.format(SERVE_FLAG))
+        if is_multi_metric_mode():
+            PARSER.error('--{} ranks by a single metric, multiple metrics passed by --{}'
+                         .format(SERVE_FLAG, METRIC_FLAG))
 
 
 def print_or_write_json_to_file(qs_json_str: str, qualia_theorem: str, debug_mode: bool):
@@ -63,23 +233,77 @@ def print_or_write_json_to_file(qs_json_str: str, qualia_theorem: str, debug_mod
     :return: None
     '''
     if write_to_file:
-        if creation_arg in BERT_FL:
-            model_name = BERT_FL[1]
-        elif creation_arg in MODIFIED_BERT_FL:
-            model_name = MODIFIED_BERT_FL[1]
-        else:
-            model_name = GOOGLE_FL[1]
-
-        file_path = '{}/{}_{}{}{}.qs'.format(result_path, qualia_theorem, model_name,
-                                             '_' + args[METRIC_FLAG] if model_name
-                                                                        in GOOGLE_FL else ''
-                                             , '_' + DEBUG_FLAG if debug_mode else '')
-        with open(Path(file_path), 'w') as text_file:
+        file_path = get_file_path(qualia_theorem, debug_mode)
+        temp_path = file_path.with_name('{}.{}.tmp'.format(file_path.name, os.getpid()))
+        with open(temp_path, 'w') as text_file:
             text_file.write(qs_json_str)
+        temp_path.replace(file_path)
     else:
         print(qs_json_str)
 
 
+def get_model_name() -> str:
+    '''
+    Return name of the creation strategy used in filenames.
+    :return: name of creation strategy
+    '''
+    if creation_arg in BERT_FL:
+        return BERT_FL[1]
+    if creation_arg in MODIFIED_BERT_FL:
+        return MODIFIED_BERT_FL[1]
+    return GOOGLE_FL[1]
+
+
+def get_file_path(qualia_theorem: str, debug_mode: bool) -> Path:
+    '''
+    Return path of the .qs file of a created structure in the output directory.
+    :param qualia_theorem: qualia theorem of created structure
+    :param debug_mode: true if is path of debug structure else false
+    :return: path of .qs file
+    '''
+    model_name = get_model_name()
+    return Path('{}/{}_{}{}{}.qs'.format(result_path, qualia_theorem, model_name,
+                                         '_' + get_metric_label() if model_name
+                                                                    in GOOGLE_FL else ''
+                                         , '_' + DEBUG_FLAG if debug_mode else ''))
+
+
+def get_metric_label() -> str:
+    '''
+    Return label of the metrics passed by --metric used in filenames.
+    :return: label of metrics
+    '''
+    if set(args[METRIC_FLAG]) == set(METRIC_CHOICES):
+        return ALL_METRICS
+    return '-'.join(args[METRIC_FLAG])
+
+
+def is_multi_metric_mode() -> bool:
+    '''
+    Return true if google strategy ranks by multiple metrics.
+    :return: true if multiple metrics are passed by --metric
+    '''
+    return creation_arg in GOOGLE_FL and len(args[METRIC_FLAG]) > 1
+
+
+def load_metrics(requester) -> dict:
+    '''
+    Create the metrics passed by --metric.
+    :param requester: web requester of web based metrics
+    :return: dict which map metric name to metric
+    '''
+    from src.metrics import WebBasedMetric
+
+    name_to_metric = dict()
+    for name in args[METRIC_FLAG]:
+        metric_class = get_metric_classes()[name]
+        if issubclass(metric_class, WebBasedMetric):
+            name_to_metric[name] = metric_class(requester)
+        else:
+            name_to_metric[name] = metric_class()
+    return name_to_metric
+
+
 def get_creation_strategy() -> CreationStrategy:
     '''
     Load creation strategy which is passed by creation argument.
@@ -88,35 +312,100 @@ def get_creation_strategy() -> CreationStrategy:
     if creation_arg in BERT_FL:
 
         from src.bert_strategy import BertStrategy
+        from src.prediction_cache import PredictionCache
 
-        return BertStrategy(inflection_dict)
+        return BertStrategy(inflection_service, batch_size=args[BERT_BATCH_SIZE_FLAG],
+                            beam_width=args[BEAM_WIDTH_FLAG], top_k=args[MASK_TOP_K_FLAG],
+                            backend=load_bert_backend(),
+                            prediction_cache=PredictionCache(args[PREDICTION_CACHE_FLAG]))
     elif creation_arg in MODIFIED_BERT_FL:
 
         from src.bert_strategy import AdvBertStrategy
+        from src.prediction_cache import PredictionCache
 
-        return AdvBertStrategy(inflection_dict)
+        return AdvBertStrategy(inflection_service, batch_size=args[BERT_BATCH_SIZE_FLAG],
+                               beam_width=args[BEAM_WIDTH_FLAG], top_k=args[MASK_TOP_K_FLAG],
+                               backend=load_bert_backend(),
+                               prediction_cache=PredictionCache(args[PREDICTION_CACHE_FLAG]))
     else:
 
         from src.qualia_structure import SearchEngineStrategy
-        from src.requester import GoogleRequester, read_key_file
-        from src.metrics import WebP, WebJac, WebPMI, NumberOfSources, OccurrenceInRequests
+        from src.requester import AsyncGoogleRequester, SEARCH_REQ_FOLDER
+        from src.search_cache import SqliteSearchCache, migrate_pickle_folder
+        from src.parse_cache import ParseCache
+
+        ttl = args[CACHE_TTL_FLAG] * SECONDS_PER_DAY if args[CACHE_TTL_FLAG] is not None \
+            else None
+        cache = SqliteSearchCache(args[SEARCH_CACHE_FLAG], ttl=ttl,
+                                  max_entries=args[CACHE_SIZE_FLAG])
+        num_migrated = migrate_pickle_folder(SEARCH_REQ_FOLDER, cache)
+        if num_migrated > 0:
+            print_info('Migrated {} search requests from {} to {}'
+                       .format(num_migrated, SEARCH_REQ_FOLDER, args[SEARCH_CACHE_FLAG]))
+
+        key_pool = load_key_pool()
+        requester = AsyncGoogleRequester(key_pool.keys, cache=cache, key_pool=key_pool,
+                                         max_in_flight=args[MAX_IN_FLIGHT_FLAG],
+                                         requests_per_second=args[REQUESTS_PER_SECOND_FLAG])
+
+        metric = list(load_metrics(requester).values())[0]
+
+        return SearchEngineStrategy(inflection_service, requester=requester, metric=metric,
+                                    parse_batch_size=args[PARSE_BATCH_SIZE_FLAG],
+                                    parse_processes=args[PARSE_PROCESSES_FLAG],
+                                    parse_cache=ParseCache(args[PARSE_CACHE_FLAG],
+                                                           args[PARSE_CACHE_SIZE_FLAG]),
+                                    extraction_window=args[EXTRACTION_WINDOW_FLAG])
+
+
+def load_bert_backend():
+    '''
+    Create inference backend of BERT passed by --bertBackend.
+    :return: backend of masked language model
+    '''
+    from src.mlm_backend import create_backend
 
-        keys = read_key_file(Path(args[KEYS_FLAG]))
+    return create_backend(args[BERT_BACKEND_FLAG], args[ONNX_FOLDER_FLAG])
 
-        requester = GoogleRequester(keys)
 
-        if args[METRIC_FLAG] == METRIC_CHOICES[0]:
-            metric = WebP(requester)
-        elif args[METRIC_FLAG] == METRIC_CHOICES[1]:
-            metric = WebJac(requester)
-        elif args[METRIC_FLAG] == METRIC_CHOICES[2]:
-            metric = WebPMI(requester)
-        elif args[METRIC_FLAG] == METRIC_CHOICES[3]:
-            metric = OccurrenceInRequests()
-        else:
-            metric = NumberOfSources()
+def get_metric_classes() -> dict:
+    '''
+    Return metric classes of the google strategy.
+    :return: dict which map name in METRIC_CHOICES to metric class
+    '''
+    from src.metrics import WebP, WebJac, WebPMI, NumberOfSources, OccurrenceInRequests
+
+    return dict(zip(METRIC_CHOICES, [WebP, WebJac, WebPMI, OccurrenceInRequests,
+                                     NumberOfSources]))
+
+
+def load_key_pool():
+    '''
+    Load pool of api keys from keyfile passed by argument --keys.
+    :return: KeyPool of api keys
+    '''
+    from src.key_pool import KeyPool
+    from src.requester import read_key_file
+
+    keys = read_key_file(Path(args[KEYS_FLAG]))
 
-        return SearchEngineStrategy(inflection_dict, requester=requester, metric=metric)
+    return KeyPool(keys, path=args[KEY_USAGE_FLAG], daily_limit=args[DAILY_LIMIT_FLAG],
+                   scheduling=args[KEY_SCHEDULING_FLAG])
+
+
+def print_key_status(key_pool):
+    '''
+    Print used and remaining daily quota of every key in key_pool.
+    :param key_pool: KeyPool of api keys
+    :return: None
+    '''
+    from src.key_pool import mask_key
+
+    remaining = key_pool.remaining()
+    for api_key, (used, exhausted) in key_pool.usage().items():
+        print('{} used: {} remaining: {}{}'.format(mask_key(api_key), used, remaining[api_key],
+                                                   ' (rejected by api)' if exhausted else ''))
+    print('Total remaining: {}'.format(sum(remaining.values())))
 
 
 def load_inflection_dict() -> dict:
@@ -135,30 +424,463 @@ def load_inflection_dict() -> dict:
     return inf_dict
 
 
-def get_qualia_theorems() -> [str]:
+def iter_qualia_theorems():
     '''
-    Load qualia theorems for file passed by -i arg and directly as positional
-    args.
-    :return: list of qualia theorems
+    Read qualia theorems passed directly as positional args and lazily line
+    by line from file or stdin passed by -i arg.
+    :return: generator of qualia theorems
     '''
-    qualia_theorems = []
-
     if args[WORDS] is not None:
-        qualia_theorems += args[WORDS]
+        yield from args[WORDS]
 
     input_file = args[INPUT_FILE_FLAG]
 
-    if input_file is not None:
+    if input_file == STDIN:
+        yield from _read_theorems(sys.stdin)
+    elif input_file is not None:
         with open(input_file) as file:
-            qualia_theorems += [line for line in file.read().splitlines() if
-                                line and not line.startswith('#')]
+            yield from _read_theorems(file)
+
+
+def _read_theorems(file) -> [str]:
+    for line in file:
+        line = line.rstrip('\n')
+        if line and not line.startswith('#'):
+            yield line
+
+
+def stream_qualia_theorems(qualia_theorems):
+    '''
+    Resolve the inflections of lazily read qualia theorems in chunks of
+    STREAM_CHUNK_SIZE theorems.
+    :param qualia_theorems: iterable of qualia theorems
+    :return: generator of qualia theorems
+    '''
+    chunk = []
+    for qualia_theorem in qualia_theorems:
+        chunk.append(qualia_theorem)
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            yield from _resolve_chunk(chunk)
+            chunk = []
+    yield from _resolve_chunk(chunk)
+
+
+def _resolve_chunk(chunk: [str]) -> [str]:
+    inflection_service.resolve_all(chunk)
+    inflection_service.flush()
+    return chunk
+
+
+def create_qualia_structure(qualia_theorem: str):
+    '''
+    Create qualia structure of theorem and print or write it (and debug
+    structure if --debug is used).
+    :param qualia_theorem: qualia theorem of created structure
+    :raise AllKeysReachLimit if limit of all keys is reached
+    :raise SearchRequestError if a search request failed
+    :raise WordNotSupportedError if theorem could not be inflected
+    :return: None
+    '''
+    output_result(qualia_theorem, generate_structure(qualia_theorem))
+
+
+def generate_structure(qualia_theorem: str):
+    '''
+    Generate debug structure of theorem or debug structures ranked by every
+    metric if multiple metrics are passed.
+    :param qualia_theorem: qualia theorem of created structure
+    :raise AllKeysReachLimit if limit of all keys is reached
+    :raise SearchRequestError if a search request failed
+    :raise WordNotSupportedError if theorem could not be inflected
+    :return: DebugQualiaStructure or dict which map name of metric to debug structure
+    '''
+    if is_multi_metric_mode():
+        return creation_strategy.generate_qualia_structures_by_metrics(qualia_theorem,
+                                                                       name_to_metric)
+    return creation_strategy.generate_qualia_structure(qualia_theorem)
+
+
+def output_result(qualia_theorem: str, result):
+    '''
+    Print or write generated structures of theorem or print why the creation
+    failed.
+    :param qualia_theorem: qualia theorem of created structure
+    :param result: DebugQualiaStructure, dict which map name of metric to debug
+    structure or raised exception
+    :return: None
+    '''
+    if json_lines_file is not None:
+        write_json_line(qualia_theorem, result)
+    elif isinstance(result, Exception):
+        print(failure_message(qualia_theorem, result))
+    elif isinstance(result, dict):
+        output_qualia_structures(qualia_theorem, result)
+    else:
+        output_qualia_structure(qualia_theorem, result)
+
+    if checkpoint is not None:
+        output_size = json_lines_file.tell() if json_lines_file is not None else None
+        if isinstance(result, Exception):
+            checkpoint.mark_failed(qualia_theorem, output_size)
+        else:
+            checkpoint.mark_finished(qualia_theorem, output_size)
+
+
+def failure_message(qualia_theorem: str, exception: Exception) -> str:
+    '''
+    Return message why the creation of the structure of theorem failed.
+    :param qualia_theorem: qualia theorem of created structure
+    :param exception: raised exception
+    :return: message
+    '''
+    if isinstance(exception, AllKeysReachLimit):
+        return 'Qualia Structure of {} failed, because ' \
+               'the maximal requests of all keys is reached'.format(qualia_theorem)
+    if isinstance(exception, SearchRequestError):
+        return 'Qualia Structure of {} failed: {}'.format(qualia_theorem, exception)
+    if isinstance(exception, WordNotSupportedError):
+        return str(exception)
+    return 'Qualia Structure of {} failed: {!r}'.format(qualia_theorem, exception)
+
+
+def write_json_line(qualia_theorem: str, result):
+    '''
+    Write one compact json object with the theorem and its structure (and debug
+    structure if --debug is used) or the failure message as line to the file
+    passed by --jsonLines. The line is flushed immediately.
+    :param qualia_theorem: qualia theorem of created structure
+    :param result: DebugQualiaStructure, dict which map name of metric to debug
+    structure or raised exception
+    :return: None
+    '''
+    json_lines_file.write(encode_result(qualia_theorem, result) + '\n')
+    json_lines_file.flush()
+
+
+def encode_result(qualia_theorem: str, result) -> str:
+    '''
+    Encode theorem and its structure (and debug structure if --debug is used)
+    or the failure message as one compact json object.
+    :param qualia_theorem: qualia theorem of created structure
+    :param result: DebugQualiaStructure, dict which map name of metric to debug
+    structure or raised exception
+    :return: json string without line breaks
+    '''
+    fields = ['"theorem":' + json.dumps(qualia_theorem)]
+    if isinstance(result, Exception):
+        fields.append('"error":' + json.dumps(failure_message(qualia_theorem, result)))
+    else:
+        if is_debug_mode:
+            fields.append('"debug":' + _encode_compact(result))
+        if isinstance(result, dict):
+            normal_structure = {name: debug_to_normal_structure(structure, args[TOP_K_FLAG])
+                                for name, structure in result.items()}
+        else:
+            normal_structure = debug_to_normal_structure(result, args[TOP_K_FLAG])
+        fields.append('"structure":' + _encode_compact(normal_structure))
+    return '{' + ','.join(fields) + '}'
+
+
+def _encode_compact(structure) -> str:
+    return jsonpickle.encode(structure, unpicklable=True, separators=(',', ':'))
+
+
+def create_checkpoint():
+    '''
+    Create checkpoint of the finished theorems in the output directory, if
+    the structures are written to files, or next to the file of --jsonLines.
+    :return: Checkpoint or None if the output is printed to stdout
+    '''
+    from src.checkpoint import Checkpoint, CHECKPOINT_FILE, CHECKPOINT_SUFFIX
+
+    if args[JSON_LINES_FLAG] == STDIN:
+        return None
+    if args[JSON_LINES_FLAG] is not None:
+        path = args[JSON_LINES_FLAG] + CHECKPOINT_SUFFIX
+    elif write_to_file:
+        path = Path(result_path) / CHECKPOINT_FILE
+    else:
+        return None
+    metric = get_metric_label() if creation_arg in GOOGLE_FL else ''
+    return Checkpoint(path, get_model_name(), metric, args[TOP_K_FLAG])
+
+
+def open_json_lines_file():
+    '''
+    Open file of --jsonLines. If --resume is used, lines after the last
+    recorded theorem of the checkpoint and the lines of failed theorems are
+    removed and new lines are appended. Otherwise the file and the checkpoint
+    are cleared.
+    :return: opened file, stdout or None if --jsonLines is not used
+    '''
+    if args[JSON_LINES_FLAG] is None:
+        return None
+    if args[JSON_LINES_FLAG] == STDIN:
+        return sys.stdout
 
-    return qualia_theorems
+    path = Path(args[JSON_LINES_FLAG])
+    if not args[RESUME_FLAG]:
+        checkpoint.clear()
+        return open(path, 'w')
+
+    from src.checkpoint import prepare_json_lines
+
+    if not path.exists() or path.stat().st_size < checkpoint.output_size():
+        print_info('{} is shorter than its checkpoint, all theorems are created again'
+                   .format(path))
+        checkpoint.clear()
+        return open(path, 'w')
+    prepare_json_lines(path, checkpoint)
+    return open(path, 'a')
+
+
+def skip_finished(qualia_theorems):
+    '''
+    Skip theorems, which are finished according to the checkpoint. For files
+    in the output directory, the .qs file of the structure must also exist.
+    :param qualia_theorems: iterable of qualia theorems
+    :return: generator of unfinished qualia theorems
+    '''
+    num_skipped = 0
+    for qualia_theorem in qualia_theorems:
+        if checkpoint.is_finished(qualia_theorem) and \
+                (json_lines_file is not None or get_file_path(qualia_theorem, False).exists()):
+            num_skipped += 1
+        else:
+            yield qualia_theorem
+    print_info('Skipped {} finished theorems'.format(num_skipped))
+
+
+def print_info(message: str):
+    '''
+    Print status message to stdout or to stderr if the json lines are written
+    to stdout.
+    :param message: status message
+    :return: None
+    '''
+    print(message, file=sys.stderr if json_lines_file is sys.stdout else sys.stdout)
+
+
+def output_qualia_structure(qualia_theorem: str, debug_qualia_structure: DebugQualiaStructure):
+    '''
+    Print or write created qualia structure (and debug structure if --debug
+    is used).
+    :param qualia_theorem: qualia theorem of created structure
+    :param debug_qualia_structure: created debug structure
+    :return: None
+    '''
+    assert isinstance(debug_qualia_structure, DebugQualiaStructure)
+    if is_debug_mode:
+        json_str = jsonpickle.encode(debug_qualia_structure, indent=4, unpicklable=True)
+        print_or_write_json_to_file(json_str, qualia_theorem, True)
+
+    qualia_structure = debug_to_normal_structure(debug_qualia_structure, args[TOP_K_FLAG])
+    assert isinstance(qualia_structure, QualiaStructure)
+    json_str = jsonpickle.encode(qualia_structure, indent=4, unpicklable=True)
+    print_or_write_json_to_file(json_str, qualia_theorem, False)
+
+
+def output_qualia_structures(qualia_theorem: str, name_to_structure: dict):
+    '''
+    Print or write qualia structures of theorem ranked by multiple metrics as
+    one json object, which map the name of the metric to the structure.
+    :param qualia_theorem: qualia theorem of created structures
+    :param name_to_structure: dict which map name of metric to debug structure
+    :return: None
+    '''
+    if is_debug_mode:
+        json_str = jsonpickle.encode(name_to_structure, indent=4, unpicklable=True)
+        print_or_write_json_to_file(json_str, qualia_theorem, True)
+
+    name_to_normal_structure = {name: debug_to_normal_structure(structure, args[TOP_K_FLAG])
+                                for name, structure in name_to_structure.items()}
+    json_str = jsonpickle.encode(name_to_normal_structure, indent=4, unpicklable=True)
+    print_or_write_json_to_file(json_str, qualia_theorem, False)
+
+
+def close_caches():
+    '''
+    Write parsed search items of the google strategy to the parse cache and
+    print how many search items were parsed and skipped by the prefilter.
+    Close the prediction cache of the BERT strategies and print how many
+    inputs were predicted. Close the requester of the google strategy.
+    :return: None
+    '''
+    parse_cache = getattr(creation_strategy, 'parse_cache', None)
+    if parse_cache is not None:
+        parse_cache.close()
+        print_info('Parsed {} search items, {} taken from parse cache'
+                   .format(parse_cache.num_parsed, parse_cache.num_hits))
+    prefilter_counter = getattr(creation_strategy, 'prefilter_counter', None)
+    if prefilter_counter is not None:
+        print_info(str(prefilter_counter))
+    prediction_cache = getattr(creation_strategy, 'prediction_cache', None)
+    if prediction_cache is not None:
+        prediction_cache.close()
+        print_info('Predicted {} bert inputs, {} taken from prediction cache'
+                   .format(prediction_cache.num_predicted, prediction_cache.num_hits))
+    search_engine = getattr(creation_strategy, 'search_engine', None)
+    if search_engine is not None:
+        search_engine.close()
+
+
+def run_planned(qualia_theorems: [str]):
+    '''
+    Create qualia structures of all theorems by planning and prefetching the
+    search requests of the whole batch.
+    :param qualia_theorems: qualia theorems of batch
+    :return: None
+    '''
+    from src.query_planner import QueryPlanner
+
+    planner = QueryPlanner(creation_strategy, report=print_info,
+                           name_to_metric=name_to_metric if is_multi_metric_mode() else None)
+    for qualia_theorem, result in planner.generate_qualia_structures(qualia_theorems):
+        output_result(qualia_theorem, result)
+
+
+def run_in_workers(num_workers: int, qualia_theorems):
+    '''
+    Create qualia structures of all theorems in num_workers forked processes.
+    The models are loaded before the fork, so the workers share them. The
+    structures are printed or written by this process in order of the theorems.
+    :param num_workers: number of worker processes
+    :param qualia_theorems: iterable of qualia theorems
+    :return: None
+    '''
+    from src.worker_pool import map_in_workers, set_worker_finalizer
+
+    load_models()
+    set_worker_finalizer(flush_worker_caches)
+    for qualia_theorem, result in map_in_workers(generate_structure, qualia_theorems,
+                                                 num_workers):
+        output_result(qualia_theorem, result)
+
+
+def run_server():
+    '''
+    Serve qualia structures by http on --host and --port until the process
+    is interrupted. The models are loaded before the first request.
+    :return: None
+    '''
+    import asyncio
+    from src.server import QualiaServer
+
+    load_models()
+    server = QualiaServer(creation_strategy, encode_result,
+                          batch_window=args[BATCH_WINDOW_FLAG] / 1000,
+                          max_batch_size=args[MAX_BATCH_SIZE_FLAG])
+    print_info('Serve qualia structures on http://{}:{}/qualia?theorem=... and statistics '
+               'on /stats'.format(args[HOST_FLAG], args[PORT_FLAG]))
+    try:
+        asyncio.run(server.serve(args[HOST_FLAG], args[PORT_FLAG]))
+    except KeyboardInterrupt:
+        print_info('Server stopped')
+
+
+def load_models():
+    '''
+    Load spaCy and, for the BERT strategies, the tokenizer and the TensorFlow
+    model of BERT.
+    :return: None
+    '''
+    from src.spacy_utils import get_lang_model
+
+    get_lang_model()
+    if creation_arg in BERT_FL + MODIFIED_BERT_FL:
+        from src.bert_strategy import get_tokenizer
+        from src.mlm_backend import get_model
+
+        get_tokenizer()
+        if args[BERT_BACKEND_FLAG] == TF_BACKEND:
+            get_model()
+
+
+def flush_worker_caches():
+    '''
+    Write the parsed search items and the inflected theorems of a worker to
+    the parse cache and the inflection table.
+    :return: None
+    '''
+    parse_cache = getattr(creation_strategy, 'parse_cache', None)
+    if parse_cache is not None:
+        parse_cache.flush()
+    inflection_service.flush()
+
+
+def run_dry(qualia_theorems):
+    '''
+    Print cached and uncached search requests of all qualia theorems per role
+    and metric by using only the search cache. Also print the key-days
+    required by the batch.
+    :param qualia_theorems: iterable of qualia theorems
+    :return: None
+    '''
+    from src.cost_estimator import CostEstimator
+
+    requester = creation_strategy.search_engine
+    estimator = CostEstimator(requester, inflection_service, get_metric_classes(),
+                              parse_batch_size=creation_strategy.parse_batch_size,
+                              parse_processes=creation_strategy.parse_processes,
+                              parse_cache=creation_strategy.parse_cache,
+                              extraction_window=creation_strategy.extraction_window)
+    estimates = []
+    for qualia_theorem in qualia_theorems:
+        try:
+            estimate = estimator.estimate(qualia_theorem)
+            estimates.append(estimate)
+            print(estimator.format_estimate(estimate))
+        except WordNotSupportedError as word_not_supported_error:
+            print(word_not_supported_error)
+
+    print(estimator.format_total(estimates, requester.key_pool.daily_limit,
+                                 len(requester.key_pool.keys)))
+
+
+def run_queue(queue_dir: str, qualia_theorems):
+    '''
+    Append qualia theorems to durable queue in queue_dir and process all pending
+    theorems. If the limit of all keys is reached, the theorem is parked and
+    the queue waits until the daily quota is reset. Executed search requests
+    are cached, so a parked theorem only executes its missing requests.
+    :param queue_dir: directory of the queue
+    :param qualia_theorems: iterable of qualia theorems to append
+    :return: None
+    '''
+    from src.job_queue import JobQueue
+    from src.key_pool import seconds_until_reset
+
+    queue = JobQueue(queue_dir)
+    queue.add(qualia_theorems)
+    print_info('Queue {}: {}'.format(queue_dir, queue.counts()))
+
+    qualia_theorem = queue.next_pending()
+    while qualia_theorem is not None:
+        try:
+            create_qualia_structure(qualia_theorem)
+            queue.mark_done(qualia_theorem)
+        except AllKeysReachLimit:
+            queue.release(qualia_theorem)
+            wait = seconds_until_reset() + RESET_MARGIN
+            print_info('Maximal requests of all keys is reached. Queue {} is parked for {:.0f} '
+                       'seconds: {}'.format(queue_dir, wait, queue.counts()))
+            sleep(wait)
+        except (SearchRequestError, WordNotSupportedError) as error:
+            output_result(qualia_theorem, error)
+            queue.mark_failed(qualia_theorem, str(error))
+        qualia_theorem = queue.next_pending()
+
+    print_info('Queue {} finished: {}'.format(queue_dir, queue.counts()))
+    queue.close()
 
 
 if __name__ == '__main__':
     args = vars(PARSER.parse_args())
 
+    if args[KEY_STATUS_FLAG]:
+        print_key_status(load_key_pool())
+        raise SystemExit(0)
+
     result_path = args[OUTPUT_FLAG]
 
     Path(result_path).mkdir(parents=True, exist_ok=True)
@@ -167,25 +889,53 @@ if __name__ == '__main__':
     is_debug_mode = args[DEBUG_FLAG]
     write_to_file = args[FILE_FLAG]
 
-    inflection_dict = load_inflection_dict()
+    validate_arguments()
+    is_server_mode = args[SERVE_FLAG]
+
+    json_lines_file = None
+    checkpoint = None
+    if not is_server_mode:
+        checkpoint = create_checkpoint()
+        json_lines_file = open_json_lines_file()
+
+    inflection_service = InflectionService(load_inflection_dict(), args[INFLECTION_TABLE_FLAG])
+    qualia_theorems = iter_qualia_theorems()
+    if checkpoint is not None and args[RESUME_FLAG]:
+        qualia_theorems = skip_finished(qualia_theorems)
+    if json_lines_file is not None:
+        qualia_theorems = stream_qualia_theorems(qualia_theorems)
+    else:
+        qualia_theorems = list(qualia_theorems)
+        inflection_service.resolve_all(qualia_theorems)
     creation_strategy = get_creation_strategy()
     assert isinstance(creation_strategy, CreationStrategy)
-
-    for qt in get_qualia_theorems():
-        try:
-            debug_qualia_structure = creation_strategy.generate_qualia_structure(qt)
-            assert isinstance(debug_qualia_structure, DebugQualiaStructure)
-            if is_debug_mode:
-                json_str = jsonpickle.encode(debug_qualia_structure, indent=4, unpicklable=True)
-                print_or_write_json_to_file(json_str, qt, True)
-
-            qualia_structure = debug_to_normal_structure(debug_qualia_structure, args[TOP_K_FLAG])
-            assert isinstance(qualia_structure, QualiaStructure)
-            json_str = jsonpickle.encode(qualia_structure, indent=4, unpicklable=True)
-            print_or_write_json_to_file(json_str, qt, False)
-
-        except AllKeysReachLimit:
-            print('Qualia Structure of {} failed, because '
-                  'the maximal requests of all keys is reached'.format(qt))
-        except WordNotSupportedError as word_not_supported_error:
-            print(word_not_supported_error)
+    name_to_metric = load_metrics(creation_strategy.search_engine) \
+        if is_multi_metric_mode() else None
+
+    try:
+        if is_server_mode:
+            run_server()
+        elif args[DRY_RUN_FLAG]:
+            if creation_arg in GOOGLE_FL:
+                run_dry(qualia_theorems)
+            else:
+                print('Creation strategy {} does not execute search requests'.format(creation_arg))
+        elif args[QUEUE_FLAG] is not None:
+            run_queue(args[QUEUE_FLAG], qualia_theorems)
+        elif args[PLAN_FLAG] and creation_arg in GOOGLE_FL:
+            run_planned(list(qualia_theorems))
+        elif args[WORKERS_FLAG] > 1:
+            run_in_workers(args[WORKERS_FLAG], qualia_theorems)
+        else:
+            for qt in qualia_theorems:
+                try:
+                    create_qualia_structure(qt)
+                except (AllKeysReachLimit, SearchRequestError, WordNotSupportedError) as error:
+                    output_result(qt, error)
+    finally:
+        close_caches()
+        inflection_service.close()
+        if json_lines_file not in [None, sys.stdout]:
+            json_lines_file.close()
+        if checkpoint is not None:
+            checkpoint.close()
@@ -5,7 +5,8 @@ Provide the semantic sequences for the role agentive.
 from spacy.symbols import *
 from spacy.tokens.doc import Doc
 
-from src.semantic_sequence import SemanticSequence, MASK, to_bert_seq
+from src.semantic_sequence import SemanticSequence, MASK, to_bert_seq, token_pattern, \
+    WILDCARD
 from src.spacy_utils import ROOT, get_ancestor
 
 
@@ -14,6 +15,10 @@ class ToANew(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return 'to(.*?)(\sa|) new ' + qualia_theorem
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('to') + [WILDCARD] +
+                token_pattern('new ' + qualia_theorem, open_start=False)]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'to * a new ' + qualia_theorem
 
@@ -31,6 +36,10 @@ class ToAComplete(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return 'to(.*?)(\sa|) complete {}'.format(qualia_theorem)
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('to') + [WILDCARD] +
+                token_pattern('complete ' + qualia_theorem, open_start=False)]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'to * a complete ' + qualia_theorem
 
@@ -48,6 +57,10 @@ class NewHasBeen(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return '(a\s|)new {} has been'.format(qualia_theorem)
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('a new {} has been'.format(qualia_theorem)),
+                token_pattern('new {} has been'.format(qualia_theorem))]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'a new {} has been *'.format(qualia_theorem)
 
@@ -65,6 +78,10 @@ class CompleteHasBeen(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return '(a\s|)complete {} has been'.format(qualia_theorem)
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('a complete {} has been'.format(qualia_theorem)),
+                token_pattern('complete {} has been'.format(qualia_theorem))]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'a complete {} has been *'.format(qualia_theorem)
 
@@ -78,6 +95,10 @@ class ToNew(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return 'to(.*?) new ' + qualia_theorem
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('to') + [WILDCARD] +
+                token_pattern('new ' + qualia_theorem, open_start=False)]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'to * new ' + qualia_theorem
 
@@ -94,6 +115,10 @@ class ToComplete(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return 'to(.*?) complete {}'.format(qualia_theorem)
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('to') + [WILDCARD] +
+                token_pattern('complete ' + qualia_theorem, open_start=False)]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'to * complete ' + qualia_theorem
 
@@ -3,22 +3,38 @@ Provide creation of qualia structure by using the language model BERT.
 '''
 
 import string
+from collections import defaultdict
 
-import tensorflow as tf
 import numpy as np
 import jsonpickle
-from tensorflow.python.keras.layers import Softmax
-from transformers import BertTokenizer, TFBertForMaskedLM
+from transformers import BertTokenizer
 
-from src.spacy_utils import LANG_MODEL, PatternNotFoundException
+from src.mlm_backend import NAME_OF_MODEL, MaskedLMBackend, TFBackend
+from src.prediction_cache import PredictionCache, prediction_key
+from src.spacy_utils import PatternNotFoundException, parse_sequences
 from src.semantic_sequence import SemanticSequence, MASK
-from src.qualia_structure import CreationStrategy, QualiaElement, DebugQualiaStructure, Role
+from src.qualia_structure import CreationStrategy, QualiaElement, DebugQualiaStructure, Role, \
+    WordNotSupportedError
 
 from spacy.lang.en.stop_words import STOP_WORDS
 
-NAME_OF_MODEL = 'bert-base-cased'
-tokenizer = BertTokenizer.from_pretrained(NAME_OF_MODEL)
-MODEL = TFBertForMaskedLM.from_pretrained(NAME_OF_MODEL, return_dict=True)
+BERT_BATCH_SIZE = 32  # Number of bert inputs predicted in one forward pass
+TOP_K_PREDICTIONS = 50  # Number of predictions per mask
+BEAM_WIDTH = 10  # Number of hypotheses expanded at the next mask of inputs with several masks
+MIN_PROBABILITY = np.finfo(np.float32).tiny  # Lower bound of probabilities to avoid log(0)
+
+_TOKENIZER = None
+
+
+def get_tokenizer() -> BertTokenizer:
+    '''
+    Return tokenizer of NAME_OF_MODEL, which is loaded on first use.
+    :return: bert tokenizer
+    '''
+    global _TOKENIZER
+    if _TOKENIZER is None:
+        _TOKENIZER = BertTokenizer.from_pretrained(NAME_OF_MODEL)
+    return _TOKENIZER
 
 
 class NumpyFloatHandler(jsonpickle.handlers.BaseHandler):
@@ -36,6 +52,39 @@ jsonpickle.handlers.registry.register(np.float32, NumpyFloatHandler)
 jsonpickle.handlers.registry.register(np.float64, NumpyFloatHandler)
 
 
+def _pad_input_ids(batch_ids: [[int]], pad_id: int) -> (np.ndarray, np.ndarray):
+    '''
+    Pad input ids of a batch to the length of the longest input.
+    :param batch_ids: input ids of every bert input in batch
+    :param pad_id: id of padding token
+    :return: (padded input ids, attention mask)
+    '''
+    max_len = max(len(input_ids) for input_ids in batch_ids)
+    padded_ids = np.full((len(batch_ids), max_len), pad_id, dtype=np.int32)
+    attention_mask = np.zeros((len(batch_ids), max_len), dtype=np.int32)
+    for row, input_ids in enumerate(batch_ids):
+        padded_ids[row, :len(input_ids)] = input_ids
+        attention_mask[row, :len(input_ids)] = 1
+    return padded_ids, attention_mask
+
+
+def _top_k_softmax(logits: np.ndarray, k: int) -> (np.ndarray, np.ndarray):
+    '''
+    Return the k largest logits of every row in descending order and their
+    softmax over the k logits.
+    :param logits: logits with shape (rows, vocabulary size)
+    :param k: number of predictions per row
+    :return: (indices, probabilities) with shape (rows, k)
+    '''
+    indices = np.argpartition(-logits, k - 1, axis=-1)[:, :k]
+    values = np.take_along_axis(logits, indices, axis=-1)
+    order = np.lexsort((indices, -values), axis=-1)
+    indices = np.take_along_axis(indices, order, axis=-1)
+    values = np.take_along_axis(values, order, axis=-1).astype(np.float32)
+    exp_values = np.exp(values - values[:, :1])
+    return indices, exp_values / exp_values.sum(axis=-1, keepdims=True)
+
+
 def clean_up_pred(pred: [str]) -> str:
     '''
     Clean prediction by joining sequence, replace punctuation and stript words
@@ -68,7 +117,7 @@ def _append_invalid_predictions(invalid_predictions: [], sem_seq: SemanticSequen
 
 
 def _append_valid_prediction(valid_pred: [], qe_to_prob: dict, qe_to_mask: dict,
-                             bert_text: str):
+                             bert_text: str, pred_to_lemma: dict):
     '''
     Append all lemmatized elements in valid_pred to qe_to_mask[prediction]. Also
     set probability to qe_to_prob.
@@ -76,12 +125,12 @@ def _append_valid_prediction(valid_pred: [], qe_to_prob: dict, qe_to_mask: dict,
     :param qe_to_prob: dictionary to map qe to maximal probabilities
     :param qe_to_mask: dictionary to map qe to bert input
     :param bert_text: bert text used as input
+    :param pred_to_lemma: dict which map cleaned prediction to its lemma
     :return: None
     '''
     for prediction, prob in valid_pred:
 
-        prediction = clean_up_pred(prediction)
-        prediction = ' '.join([token.lemma_ for token in LANG_MODEL(prediction)])
+        prediction = pred_to_lemma[clean_up_pred(prediction)]
 
         if prediction not in qe_to_prob:
             qe_to_prob[prediction] = prob
@@ -93,13 +142,50 @@ def _append_valid_prediction(valid_pred: [], qe_to_prob: dict, qe_to_mask: dict,
         qe_to_mask[prediction].append('[CLS] ' + bert_text + '. [SEP]')
 
 
+def fill_masks(bert_text: str, pred: [str]) -> str:
+    '''
+    Replace the masks of bert_text from left to right by the predicted words.
+    :param bert_text: input for bert
+    :param pred: predicted words
+    :return: bert_text with predicted words
+    '''
+    for pred_word in pred:
+        bert_text = bert_text.replace(MASK, pred_word, 1)
+    return bert_text
+
+
+def lemmatize_predictions(predictions: [str]) -> dict:
+    '''
+    Lemmatize all unique cleaned predictions in batches.
+    :param predictions: cleaned predictions
+    :return: dict which map prediction to its lemma
+    '''
+    unique_predictions = list(dict.fromkeys(predictions))
+    return {prediction: ' '.join([token.lemma_ for token in doc]) for prediction, doc
+            in zip(unique_predictions, parse_sequences(unique_predictions))}
+
+
 class BertStrategy(CreationStrategy):
     '''
     Strategy for using word prediction of BERT to generate qualia elements.
+    The bert inputs of all semantic sequences are padded and predicted in
+    batches of batch_size. Every mask is predicted with top_k candidates.
+    Inputs with several masks are decoded by a beam search, which keeps the
+    beam_width best hypotheses after each mask. The masked language model
+    is run by backend, which is TensorFlow by default. If prediction_cache
+    is passed, only inputs which are not cached are predicted.
     '''
 
-    def __init__(self, inflection_dict: dict):
+    def __init__(self, inflection_dict: dict, batch_size: int = BERT_BATCH_SIZE,
+                 beam_width: int = BEAM_WIDTH, top_k: int = TOP_K_PREDICTIONS,
+                 backend: MaskedLMBackend = None, prediction_cache: PredictionCache = None):
         super().__init__(inflection_dict)
+        self.backend = backend if backend is not None else TFBackend()
+        self.prediction_cache = prediction_cache
+        self.batch_size = batch_size
+        self.beam_width = beam_width
+        self.top_k = top_k
+        self.num_predicted = 0
 
     def is_valid_prediction(self, theorem: str, pred: [str], sem_seq: SemanticSequence,
                             bert_text: str):
@@ -116,6 +202,15 @@ class BertStrategy(CreationStrategy):
                     or any(i.lower() in STOP_WORDS for i in pred)
                     or any(i.lower() in string.punctuation for i in pred))
 
+    def validate_predictions(self, candidates: [(str, [str], SemanticSequence, str)]) -> [bool]:
+        '''
+        Validate the predictions of multiple bert inputs.
+        :param candidates: list of (theorem, prediction, sem_seq, bert_text)
+        :return: list with true for every valid prediction
+        '''
+        return [self.is_valid_prediction(theorem, pred, sem_seq, bert_text)
+                for theorem, pred, sem_seq, bert_text in candidates]
+
     def generate_qualia_structure(self, qualia_theorem: str):
         '''
         Generate qualia structure for qualia theorem by using
@@ -123,6 +218,162 @@ class BertStrategy(CreationStrategy):
         :param qualia_theorem: qualia theorem of creat
         :return: DebugQualiaStructure of qualia_theorem
         '''
+        [(_, qualia_structure)] = self.generate_qualia_structures([qualia_theorem])
+        if isinstance(qualia_structure, Exception):
+            raise qualia_structure
+        return qualia_structure
+
+    def generate_qualia_structures(self, qualia_theorems: [str]) -> [(str, object)]:
+        '''
+        Generate qualia structures of all theorems. The bert inputs of all
+        theorems are predicted together, so the model works on full batches.
+        The unique predictions of all inputs are validated and the valid
+        predictions are lemmatized together.
+        :param qualia_theorems: qualia theorems of batch
+        :return: list of (theorem, DebugQualiaStructure or raised WordNotSupportedError)
+        '''
+        bert_inputs = []
+        for qualia_theorem in qualia_theorems:
+            try:
+                bert_inputs += self.__bert_inputs(qualia_theorem)
+            except WordNotSupportedError:
+                continue
+        bert_texts = list(dict.fromkeys(bert_text for _, _, bert_text in bert_inputs))
+        text_to_predictions = dict(zip(bert_texts, self._predict_masks_batch(bert_texts)))
+
+        candidates = list(dict.fromkeys((tense, tuple(pred), sem_seq, bert_text)
+                                        for tense, sem_seq, bert_text in bert_inputs
+                                        for pred, _ in text_to_predictions[bert_text]))
+        candidate_to_valid = dict(zip(candidates, self.validate_predictions(
+            [(tense, list(pred), sem_seq, bert_text)
+             for tense, pred, sem_seq, bert_text in candidates])))
+        pred_to_lemma = lemmatize_predictions([clean_up_pred(pred) for (_, pred, _, _), valid
+                                               in candidate_to_valid.items() if valid])
+
+        results = []
+        for qualia_theorem in qualia_theorems:
+            try:
+                results.append((qualia_theorem, self.__create_structure(
+                    qualia_theorem, text_to_predictions, candidate_to_valid, pred_to_lemma)))
+            except WordNotSupportedError as word_not_supported_error:
+                results.append((qualia_theorem, word_not_supported_error))
+        return results
+
+    def _predict_masks(self, bert_text: str) -> ([str], float):
+        '''
+        Predict masked tokens in bert_text
+        :param bert_text: input sequence for bert
+        :return: Top k prediction for input sequence
+        '''
+        return self._predict_masks_batch([bert_text])[0]
+
+    def _predict_masks_batch(self, bert_texts: [str]) -> [[([str], float)]]:
+        '''
+        Predict masked tokens of all bert_texts. The masks are predicted from
+        left to right by a beam search. At every mask, all live hypotheses of
+        all texts are predicted together and expanded by their top_k
+        predictions. The score of a hypothesis is the sum of the log
+        probabilities of its predictions. After the last mask the top_k best
+        hypotheses are returned, otherwise the beam_width best are kept.
+        :param bert_texts: input sequences for bert
+        :return: Top k predictions of every input sequence with their joint probability
+        '''
+        top_k_preds = [[] for _ in bert_texts]
+        idx_to_beam = {idx: [([], 0.0)] for idx in range(len(bert_texts))}
+
+        while idx_to_beam:
+            hypotheses = [(idx, words, score) for idx, beam in idx_to_beam.items()
+                          for words, score in beam]
+            next_texts = []
+            for idx, words, _ in hypotheses:
+                next_texts.append(fill_masks(bert_texts[idx], words))
+
+            idx_to_expansions = defaultdict(list)
+            for (idx, words, score), preds in zip(hypotheses,
+                                                  self._predict_first_masks(next_texts)):
+                idx_to_expansions[idx] += [(words + pred,
+                                            score + np.log(np.maximum(prob, MIN_PROBABILITY)))
+                                           for pred, prob in preds]
+
+            idx_to_beam = dict()
+            for idx, expansions in idx_to_expansions.items():
+                expansions.sort(key=lambda hypothesis: hypothesis[1], reverse=True)
+                if len(expansions[0][0]) < bert_texts[idx].count(MASK):
+                    idx_to_beam[idx] = expansions[:self.beam_width]
+                else:
+                    top_k_preds[idx] = [(words, np.exp(score))
+                                        for words, score in expansions[:self.top_k]]
+        return top_k_preds
+
+    def _predict_first_masks(self, bert_texts: [str]) -> [[([str], float)]]:
+        '''
+        Predict the first masked token of all bert_texts. Equal inputs are
+        predicted once and the predictions of prediction_cache are reused. The
+        remaining inputs are padded to batches of batch_size and every batch is
+        predicted by one forward pass.
+        :param bert_texts: input sequences for bert
+        :return: Top k predictions for the first mask of every input sequence
+        '''
+        tokenizer = get_tokenizer()
+        batch_ids = [tokenizer.convert_tokens_to_ids(tokenizer.tokenize(
+            '[CLS] ' + bert_text + '. [SEP]')) for bert_text in bert_texts]
+        keys = [prediction_key(NAME_OF_MODEL, self.backend.name, input_ids, self.top_k)
+                for input_ids in batch_ids]
+        key_to_predictions = self.prediction_cache.get_many(keys) \
+            if self.prediction_cache is not None else dict()
+
+        key_to_ids = {key: input_ids for key, input_ids in zip(keys, batch_ids)
+                      if key not in key_to_predictions}
+        missing_keys = list(key_to_ids)
+        mask_id = tokenizer.convert_tokens_to_ids(MASK)
+        for start in range(0, len(missing_keys), self.batch_size):
+            batch = [key_to_ids[key] for key in missing_keys[start:start + self.batch_size]]
+            input_ids, attention_mask = _pad_input_ids(batch, tokenizer.pad_token_id)
+            logits = self.backend.logits(input_ids, attention_mask)
+            mask_logits = logits[np.arange(len(batch)),
+                                 [ids.index(mask_id) for ids in batch]]
+            top_k_indices, probabilities = _top_k_softmax(mask_logits, self.top_k)
+
+            for key, indices, probs in zip(missing_keys[start:start + self.batch_size],
+                                           top_k_indices, probabilities):
+                key_to_predictions[key] = (indices, probs)
+            self.num_predicted += len(batch)
+
+        if self.prediction_cache is not None and missing_keys:
+            self.prediction_cache.put_many([(key,) + key_to_predictions[key]
+                                            for key in missing_keys])
+
+        return [[([word], prob) for word, prob in
+                 zip(tokenizer.convert_ids_to_tokens(key_to_predictions[key][0].tolist()),
+                     key_to_predictions[key][1])] for key in keys]
+
+    def __bert_inputs(self, theorem: str) -> [(str, SemanticSequence, str)]:
+        '''
+        Return the bert inputs of all semantic sequences of theorem.
+        :param theorem: Qualia theorem of created structure
+        :raise WordNotSupportedError if theorem could not be inflected
+        :return: list of (inflected theorem, sem_seq, bert input)
+        '''
+        sing, plu = self.inflect_sing_plural(theorem)
+        return [(tense, sem_seq, bert_text) for role in DebugQualiaStructure(theorem).all_roles
+                for sem_seq in role.get_all_pattern()
+                for tense in [plu if sem_seq.is_plural else sing]
+                for bert_text in sem_seq.get_bert_input(tense)]
+
+    def __create_structure(self, qualia_theorem: str, text_to_predictions: dict,
+                           candidate_to_valid: dict, pred_to_lemma: dict) \
+            -> DebugQualiaStructure:
+        '''
+        Create qualia structure for qualia theorem from the predictions of its
+        bert inputs.
+        :param qualia_theorem: qualia theorem of created structure
+        :param text_to_predictions: dict which map bert input to its predictions
+        :param candidate_to_valid: dict which map (inflected theorem, prediction, sem_seq,
+        bert input) to true if the prediction is valid
+        :param pred_to_lemma: dict which map cleaned valid prediction to its lemma
+        :raise WordNotSupportedError if theorem could not be inflected
+        :return: DebugQualiaStructure of qualia_theorem
+        '''
         qualia_structure = DebugQualiaStructure(qualia_theorem)
 
         for role in qualia_structure.all_roles:
@@ -131,7 +382,10 @@ class BertStrategy(CreationStrategy):
 
                 sem_seq_to_qe[sem_seq] = []
 
-                prob_of_qe, qe_to_mask = self.__extract_elements(qualia_theorem, sem_seq, role)
+                prob_of_qe, qe_to_mask = self.__extract_elements(qualia_theorem, sem_seq, role,
+                                                                 text_to_predictions,
+                                                                 candidate_to_valid,
+                                                                 pred_to_lemma)
 
                 for element in qe_to_mask:
                     qualia_element = QualiaElement(word=element.lower(),
@@ -143,47 +397,19 @@ class BertStrategy(CreationStrategy):
 
         return qualia_structure
 
-    def _predict_masks(self, bert_text: str) -> ([str], float):
-        '''
-        Predict masked tokens in bert_text
-        :param bert_text: input sequence for bert
-        :return: Top k prediction for input sequence
-        '''
-
-        tokenized_text = tokenizer.tokenize('[CLS] ' + bert_text + '. [SEP]')
-        input_ids = tokenizer.convert_tokens_to_ids(tokenized_text)
-        outputs = MODEL(tf.convert_to_tensor([input_ids]))
-        mask_idx = tokenized_text.index(MASK)
-        top_k_output = tf.math.top_k(outputs.logits[0][mask_idx], k=50, sorted=True, name=None)
-        probabilities = Softmax()(top_k_output.values.numpy()).numpy()
-
-        top_k_pred = [([word], prob) for word, prob in
-                      zip(tokenizer.convert_ids_to_tokens(top_k_output.indices), probabilities)]
-
-        if tokenized_text.count(MASK) > 1:
-            for top_k in top_k_pred.copy():
-                top_k_pred.remove(top_k)
-
-                pred = top_k[0]
-                pred_for_last_mask = pred[-1]
-                results_of_next_pred = self._predict_masks(bert_text.replace(MASK,
-                                                                             pred_for_last_mask,
-                                                                             1))
-                for pred_for_next_mask, prob in results_of_next_pred:
-                    top_k_pred.append((pred + pred_for_next_mask, prob))
-
-            return top_k_pred
-
-        return top_k_pred
-
-    def __extract_elements(self, theorem: str, sem_seq: SemanticSequence, role: Role) \
-            -> (dict, dict):
+    def __extract_elements(self, theorem: str, sem_seq: SemanticSequence, role: Role,
+                           text_to_predictions: dict, candidate_to_valid: dict,
+                           pred_to_lemma: dict) -> (dict, dict):
         '''
         Extract predicted elements for the sem_seq and return dictionaries with
         probabilities for
         :param theorem: Qualia theorem of created structure
         :param sem_seq:
         :param role: role of sem_seq
+        :param text_to_predictions: dict which map bert input to its predictions
+        :param candidate_to_valid: dict which map (inflected theorem, prediction, sem_seq,
+        bert input) to true if the prediction is valid
+        :param pred_to_lemma: dict which map cleaned valid prediction to its lemma
         :return:
         '''
 
@@ -194,13 +420,17 @@ class BertStrategy(CreationStrategy):
         qe_to_prob = dict()
 
         for bert_text in sem_seq.get_bert_input(tense):
-            predictions = self._predict_masks(bert_text)
-            valid_pred = [(pred, p) for pred, p in predictions
-                          if self.is_valid_prediction(tense, pred, sem_seq, bert_text)]
-            invalid_pred = [pred for pred in predictions if pred not in valid_pred]
+            valid_pred = []
+            invalid_pred = []
+            for pred, p in text_to_predictions[bert_text]:
+                if candidate_to_valid[(tense, tuple(pred), sem_seq, bert_text)]:
+                    valid_pred.append((pred, p))
+                else:
+                    invalid_pred.append((pred, p))
 
             _append_invalid_predictions(invalid_pred, sem_seq, role, bert_text)
-            _append_valid_prediction(valid_pred, qe_to_prob, qe_to_mask, bert_text)
+            _append_valid_prediction(valid_pred, qe_to_prob, qe_to_mask, bert_text,
+                                     pred_to_lemma)
         return qe_to_prob, qe_to_mask
 
 
@@ -221,16 +451,41 @@ class AdvBertStrategy(BertStrategy):
         :param bert_text: input for bert
         :return:
         '''
+        return self.validate_predictions([(theorem, pred, sem_seq, bert_text)])[0]
+
+    def validate_predictions(self, candidates: [(str, [str], SemanticSequence, str)]) -> [bool]:
+        '''
+        Validate the predictions of multiple bert inputs. The cheap checks of
+        BertStrategy are applied first. The bert texts with the remaining
+        predictions are deduplicated and parsed in batches, before the extraction
+        pattern of the sem_seq is applied.
+        :param candidates: list of (theorem, prediction, sem_seq, bert_text)
+        :return: list with true for every valid prediction
+        '''
+        sentences = [fill_masks(bert_text, pred) if super(AdvBertStrategy, self)
+                     .is_valid_prediction(theorem, pred, sem_seq, bert_text) else None
+                     for theorem, pred, sem_seq, bert_text in candidates]
+        unique_sentences = list(dict.fromkeys(sentence for sentence in sentences
+                                              if sentence is not None))
+        sentence_to_doc = dict(zip(unique_sentences, parse_sequences(unique_sentences)))
+
+        return [sentence is not None and _is_extracted(theorem, pred, sem_seq,
+                                                       sentence_to_doc[sentence])
+                for (theorem, pred, sem_seq, _), sentence in zip(candidates, sentences)]
 
-        if not super(AdvBertStrategy, self).is_valid_prediction(theorem, pred, sem_seq,
-                                                                bert_text):
-            return False
 
-        for pred_word in pred:
-            bert_text = bert_text.replace(MASK, pred_word, 1)
-        try:
-            extracted_element = sem_seq.extract_qualia_elements(theorem, bert_text)
-            extracted_element = [token.orth_.strip() for token in extracted_element[0]]
-            return pred == extracted_element
-        except PatternNotFoundException:
-            return False
+def _is_extracted(theorem: str, pred: [str], sem_seq: SemanticSequence, tokenized_seq) -> bool:
+    '''
+    Return true if the extraction pattern of sem_seq extracts pred from tokenized_seq.
+    :param theorem: theorem of the created qualia structure
+    :param pred: prediction
+    :param sem_seq: semantically sequence of bert text
+    :param tokenized_seq: parsed bert text with prediction
+    :return: true if pred is extracted
+    '''
+    try:
+        extracted_elements = sem_seq.extract_qualia_elements_of_doc(theorem, tokenized_seq)
+    except PatternNotFoundException:
+        return False
+    return len(extracted_elements) > 0 and \
+        [token.orth_.strip() for token in extracted_elements[0]] == list(pred)
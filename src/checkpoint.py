@@ -0,0 +1,156 @@
+'''
+Provide Checkpoint, a manifest of the qualia theorems whose structures are
+already written by a batch run. A theorem is finished for a strategy, a
+metric and a topK, so a resumed run only skips structures created with the
+same arguments. For an output file of json lines the manifest also records
+the size of the file after every finished theorem, so lines which were
+written after the last recorded theorem can be truncated before resuming.
+Failed theorems are recorded too, so their lines can be removed and the
+theorems are created again by the resumed run.
+'''
+import json
+from pathlib import Path
+from threading import Lock
+from time import time
+
+from src.sqlite_utils import ProcessConnection
+
+CHECKPOINT_FILE = '.checkpoint.db'  # Name of the manifest in the output directory
+CHECKPOINT_SUFFIX = '.checkpoint.db'  # Suffix of the manifest of an output file
+FINISHED = 'finished'  # Status of a theorem whose structure is written
+FAILED = 'failed'  # Status of a theorem whose failure message is written
+
+
+class Checkpoint:
+    '''
+    Manifest of finished theorems in the sqlite file path for the structures
+    created by strategy, ranked by metric and cut to top_k elements.
+    '''
+
+    def __init__(self, path: str, strategy: str, metric: str, top_k: int):
+        self.strategy = strategy
+        self.metric = metric
+        self.top_k = top_k
+        self.lock = Lock()
+        self.connection = ProcessConnection(path, timeout=30, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS finished (theorem TEXT, '
+                                'strategy TEXT, metric TEXT, top_k INTEGER, '
+                                'status TEXT, output_size INTEGER, updated REAL, '
+                                'PRIMARY KEY (theorem, strategy, metric, top_k))')
+        self.connection.commit()
+
+    def is_finished(self, qualia_theorem: str) -> bool:
+        '''
+        Return true if the structure of theorem is already written.
+        :param qualia_theorem: qualia theorem
+        :return: true if theorem is finished
+        '''
+        with self.lock:
+            return self.connection.execute('SELECT 1 FROM finished WHERE theorem = ? AND '
+                                           'strategy = ? AND metric = ? AND top_k = ? AND '
+                                           'status = ?',
+                                           (qualia_theorem, self.strategy, self.metric,
+                                            self.top_k, FINISHED)).fetchone() is not None
+
+    def mark_finished(self, qualia_theorem: str, output_size: int = None):
+        '''
+        Record that the structure of theorem is written.
+        :param qualia_theorem: qualia theorem
+        :param output_size: size of the output file after the structure or None
+        :return: None
+        '''
+        self.__mark(qualia_theorem, FINISHED, output_size)
+
+    def mark_failed(self, qualia_theorem: str, output_size: int = None):
+        '''
+        Record that the creation of the structure of theorem failed.
+        :param qualia_theorem: qualia theorem
+        :param output_size: size of the output file after the failure message or None
+        :return: None
+        '''
+        self.__mark(qualia_theorem, FAILED, output_size)
+
+    def __mark(self, qualia_theorem: str, status: str, output_size: int):
+        with self.lock:
+            self.connection.execute('INSERT OR REPLACE INTO finished VALUES '
+                                    '(?, ?, ?, ?, ?, ?, ?)',
+                                    (qualia_theorem, self.strategy, self.metric, self.top_k,
+                                     status, output_size, time()))
+            self.connection.commit()
+
+    def failed_theorems(self) -> set:
+        '''
+        Return all theorems whose creation failed.
+        :return: set of failed theorems
+        '''
+        with self.lock:
+            return {row[0] for row in self.connection.execute(
+                'SELECT theorem FROM finished WHERE status = ?', (FAILED,))}
+
+    def remove_failed(self, output_size: int):
+        '''
+        Remove failed theorems after their lines were removed from the output
+        file, which is shrunk to output_size.
+        :param output_size: size of the output file without the failure messages
+        :return: None
+        '''
+        with self.lock:
+            self.connection.execute('DELETE FROM finished WHERE status = ?', (FAILED,))
+            self.connection.execute('UPDATE finished SET output_size = ? WHERE output_size > ?',
+                                    (output_size, output_size))
+            self.connection.commit()
+
+    def output_size(self) -> int:
+        '''
+        Return size of the output file after the last recorded theorem.
+        :return: recorded size of the output file or 0
+        '''
+        with self.lock:
+            return self.connection.execute('SELECT COALESCE(MAX(output_size), 0) '
+                                           'FROM finished').fetchone()[0]
+
+    def clear(self):
+        '''
+        Remove all finished theorems, e.g. if the output file is overwritten.
+        :return: None
+        '''
+        with self.lock:
+            self.connection.execute('DELETE FROM finished')
+            self.connection.commit()
+
+    def close(self):
+        '''
+        Close connection to sqlite file.
+        :return: None
+        '''
+        with self.lock:
+            self.connection.close()
+
+
+def prepare_json_lines(path: Path, checkpoint: Checkpoint) -> int:
+    '''
+    Prepare file of json lines for a resumed run. Lines after the last
+    recorded theorem are truncated and the lines of failed theorems are
+    removed, so the failed theorems can be created again without duplicates.
+    :param path: path of json lines file, which is not shorter than the
+    recorded size
+    :param checkpoint: checkpoint of the file
+    :return: size of the prepared file
+    '''
+    path = Path(path)
+    output_size = checkpoint.output_size()
+    failed = checkpoint.failed_theorems()
+    if not failed:
+        with open(path, 'r+b') as lines_file:
+            lines_file.truncate(output_size)
+        return output_size
+
+    with open(path, 'rb') as lines_file:
+        lines = lines_file.read(output_size).splitlines(keepends=True)
+    content = b''.join(line for line in lines if json.loads(line)['theorem'] not in failed)
+    temp_path = path.with_name(path.name + '.tmp')
+    with open(temp_path, 'wb') as lines_file:
+        lines_file.write(content)
+    temp_path.replace(path)
+    checkpoint.remove_failed(len(content))
+    return len(content)
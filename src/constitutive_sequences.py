@@ -5,7 +5,7 @@ Provide the semantic sequences for the role constitutive.
 from spacy.symbols import *
 from spacy.tokens.doc import Doc
 
-from src.semantic_sequence import SemanticSequence, to_bert_seq
+from src.semantic_sequence import SemanticSequence, to_bert_seq, token_pattern
 from src.spacy_utils import get_ancestor, get_child
 
 
@@ -14,6 +14,9 @@ class IsMadeUpOf(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return qualia_theorem + ' is made up of'
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' is made up of')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'a|an {} is made up of'.format(qualia_theorem)
 
@@ -27,6 +30,9 @@ class IsMadeOf(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return qualia_theorem + ' is made of'
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' is made of')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'a|an {} is made of'.format(qualia_theorem)
 
@@ -40,6 +46,10 @@ class Comprises(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return qualia_theorem + ' comprises(\sof|)'
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' comprises of'),
+                token_pattern(qualia_theorem + ' comprises')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'a|an {} comprises'.format(qualia_theorem)
 
@@ -57,6 +67,10 @@ class ConsistsOf(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return qualia_theorem + ' consist(\sof|)'
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' consist of'),
+                token_pattern(qualia_theorem + ' consist')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'a|an {} consists of'.format(qualia_theorem)
 
@@ -70,6 +84,9 @@ class AreMadeOf(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return qualia_theorem + ' are made of'
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' are made of')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return self.get_regular_expression(qualia_theorem)
 
@@ -83,6 +100,9 @@ class AreMadeUpOf(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return qualia_theorem + ' are made up of'
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' are made up of')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return self.get_regular_expression(qualia_theorem)
 
@@ -96,6 +116,9 @@ class ComprisesPlu(Comprises):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return qualia_theorem + ' comprise'
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' comprise')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return '{} comprise'.format(qualia_theorem)
 
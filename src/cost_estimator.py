@@ -0,0 +1,198 @@
+'''
+Provide CostEstimator for a dry run of the google strategy. The estimator
+walks the same semantic sequences and metric requests as SearchEngineStrategy,
+but answers search requests only from the cache and counts the cached and
+uncached requests per theorem, role and metric.
+'''
+from itertools import chain
+from math import ceil
+
+from src.metrics import WebBasedMetric
+from src.parse_cache import ParseCache
+from src.qualia_structure import SearchEngineStrategy, DebugQualiaStructure, FORMAL, \
+    CONSTITUTIVE, AGENTIVE, TELIC
+from src.requester import WebRequester
+from src.semantic_sequence import SemanticSequence
+from src.spacy_utils import PARSE_BATCH_SIZE
+
+PATTERN = 'pattern'
+ROLE_NAMES = [role_name for _, role_name in [FORMAL, CONSTITUTIVE, AGENTIVE, TELIC]]
+EMPTY_RESULT_HITS = 1  # Hits of uncached requests to avoid division by zero in metrics
+
+
+class CacheOnlyRequester(WebRequester):
+    '''
+    Implementation of WebRequester, which answers requests only from the cache
+    of requester and never executes a request. Uncached pattern requests
+    have no search items and uncached count requests EMPTY_RESULT_HITS hits.
+    '''
+
+    def __init__(self, requester: WebRequester):
+        self.requester = requester
+
+    def search_for_patter(self, pattern: SemanticSequence, qualia_theorem: str) -> [str]:
+        return self.search_for_patterns([(pattern, qualia_theorem)])[0]
+
+    def search_for_patterns(self, pattern_theorem_pairs: [(SemanticSequence, str)]) -> [[str]]:
+        requests = [self.pattern_request(pattern, qualia_theorem)
+                    for pattern, qualia_theorem in pattern_theorem_pairs]
+        uncached = set(self.uncached_requests(requests))
+        cached_pairs = [pair for pair, request in zip(pattern_theorem_pairs, requests)
+                        if request not in uncached]
+        cached_items = iter(self.requester.search_for_patterns(cached_pairs))
+        return [[] if request in uncached else next(cached_items) for request in requests]
+
+    def num_results(self, search_request: str) -> int:
+        return self.num_results_of_all([search_request])[0]
+
+    def num_results_of_all(self, search_requests: [str]) -> [int]:
+        uncached = set(self.uncached_requests(search_requests))
+        cached_hits = iter(self.requester.num_results_of_all(
+            [request for request in search_requests if request not in uncached]))
+        return [EMPTY_RESULT_HITS if request in uncached else next(cached_hits)
+                for request in search_requests]
+
+    def pattern_request(self, pattern: SemanticSequence, qualia_theorem: str) -> str:
+        return self.requester.pattern_request(pattern, qualia_theorem)
+
+    def near_request(self, word_1: str, word_2: str) -> str:
+        return self.requester.near_request(word_1, word_2)
+
+    def and_request(self, word_1: str, word_2: str) -> str:
+        return self.requester.and_request(word_1, word_2)
+
+    def uncached_requests(self, search_requests: [str]) -> [str]:
+        return self.requester.uncached_requests(search_requests)
+
+
+class TheoremEstimate:
+    '''
+    Search requests of a theorem. Dict requests map (role name, PATTERN or
+    metric name) to requests. If complete is False, some pattern requests are
+    uncached and the metric requests of their elements are unknown.
+    '''
+
+    def __init__(self, qualia_theorem: str):
+        self.qualia_theorem = qualia_theorem
+        self.requests = {}
+        self.uncached = set()
+        self.complete = True
+
+    def get_requests(self, name: str) -> [str]:
+        '''
+        Return unique requests of all roles for PATTERN or a metric name.
+        :param name: PATTERN or metric name
+        :return: unique requests
+        '''
+        return list(dict.fromkeys(chain.from_iterable(
+            requests for (_, req_name), requests in self.requests.items() if req_name == name)))
+
+    def count(self, role_name: str, name: str) -> (int, int):
+        '''
+        Return number of cached and uncached requests of role for PATTERN or
+        a metric name.
+        :param role_name: name of role
+        :param name: PATTERN or metric name
+        :return: (cached, uncached) requests
+        '''
+        requests = set(self.requests.get((role_name, name), []))
+        uncached = len(requests & self.uncached)
+        return len(requests) - uncached, uncached
+
+
+class CostEstimator:
+    '''
+    Estimate the search requests of qualia theorems for the pattern requests
+    and the requests of every metric in name_to_metric_class. Only the cache
+    of requester is used. The cached search items are parsed like by the
+    strategy of the run with parse_batch_size, parse_processes, parse_cache
+    and extraction_window.
+    '''
+
+    def __init__(self, requester: WebRequester, inflection_dict: dict,
+                 name_to_metric_class: dict, parse_batch_size: int = PARSE_BATCH_SIZE,
+                 parse_processes: int = 1, parse_cache: ParseCache = None,
+                 extraction_window=None):
+        self.requester = CacheOnlyRequester(requester)
+        self.name_to_metric = {name: metric_class(self.requester) for name, metric_class
+                               in name_to_metric_class.items()
+                               if issubclass(metric_class, WebBasedMetric)}
+        self.metric_names = list(name_to_metric_class.keys())
+        self.strategy = SearchEngineStrategy(inflection_dict, requester=self.requester,
+                                             metric=None, parse_batch_size=parse_batch_size,
+                                             parse_processes=parse_processes,
+                                             parse_cache=parse_cache,
+                                             extraction_window=extraction_window)
+
+    def estimate(self, qualia_theorem: str) -> TheoremEstimate:
+        '''
+        Estimate the search requests of theorem.
+        :param qualia_theorem: qualia theorem
+        :raise WordNotSupportedError if theorem could not be inflected
+        :return: estimate of theorem
+        '''
+        estimate = TheoremEstimate(qualia_theorem)
+
+        pattern_requests = iter(self.strategy.get_pattern_requests(qualia_theorem))
+        structure = DebugQualiaStructure(qualia_theorem)
+        for role in structure.all_roles:
+            estimate.requests[(role.name, PATTERN)] = [next(pattern_requests)
+                                                       for _ in role.get_all_pattern()]
+
+        structure = self.strategy.extract_qualia_structure(qualia_theorem)
+        for role in structure.all_roles:
+            qualia_elements = dict.fromkeys(chain.from_iterable(role.sem_seq_to_qe.values()))
+            for name in self.metric_names:
+                metric = self.name_to_metric.get(name)
+                estimate.requests[(role.name, name)] = [] if metric is None else list(
+                    chain.from_iterable(metric.get_search_requests(qualia_element.str,
+                                                                   qualia_theorem)
+                                        for qualia_element in qualia_elements))
+
+        estimate.uncached = set(self.requester.uncached_requests(
+            chain.from_iterable(estimate.requests.values())))
+        estimate.complete = not any(request in estimate.uncached
+                                    for request in estimate.get_requests(PATTERN))
+        return estimate
+
+    def format_estimate(self, estimate: TheoremEstimate) -> str:
+        '''
+        Format cached and uncached requests of estimate per role and metric.
+        :param estimate: estimate of theorem
+        :return: formatted estimate
+        '''
+        lines = ['{}{}'.format(estimate.qualia_theorem, '' if estimate.complete else
+                               ' (uncached pattern requests, metric requests are '
+                               'a lower bound)')]
+        for role_name in ROLE_NAMES:
+            lines.append('    {}: {}'.format(role_name, ', '.join(
+                '{} {}/{} uncached'.format(name, estimate.count(role_name, name)[1],
+                                           sum(estimate.count(role_name, name)))
+                for name in [PATTERN] + self.metric_names)))
+        return '\n'.join(lines)
+
+    def format_total(self, estimates: [TheoremEstimate], daily_limit: int,
+                     num_keys: int) -> str:
+        '''
+        Format unique uncached requests of all estimates for the pattern
+        requests combined with every metric and the required key-days.
+        :param estimates: estimates of batch
+        :param daily_limit: daily limit of requests per key
+        :param num_keys: number of api keys
+        :return: formatted total
+        '''
+        pattern_requests = list(chain.from_iterable(estimate.get_requests(PATTERN)
+                                                    for estimate in estimates))
+        lines = ['Total ({} theorems, {} keys with {} daily requests):'
+                 .format(len(estimates), num_keys, daily_limit)]
+        for name in self.metric_names:
+            requests = pattern_requests + list(chain.from_iterable(estimate.get_requests(name)
+                                                                   for estimate in estimates))
+            unique = list(dict.fromkeys(requests))
+            uncached = len(self.requester.uncached_requests(unique))
+            key_days = uncached / daily_limit
+            lines.append('    {}: {} requests, {} unique, {} uncached, {:.2f} key-days, '
+                         '{} days with all keys'.format(name, len(requests), len(unique),
+                                                        uncached, key_days,
+                                                        ceil(key_days / num_keys)))
+        return '\n'.join(lines)
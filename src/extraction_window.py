@@ -0,0 +1,72 @@
+'''
+Provide the windows of the sentence window extraction. The matches of the
+semantic sequences are found on the tokenized search item and only a window
+around each match is parsed: the enclosing sentences or a number of tokens
+before and after the match. The indices of a match are mapped to the parsed
+window, so _handle_pattern_found works on the tokens of the window.
+'''
+from spacy.tokens import Doc
+
+SNIPPET = 'snippet'  # Parse the whole search item
+SENTENCE = 'sentence'  # Parse the sentences of a match
+SENTENCE_END = {'.', '!', '?'}
+
+
+def parse_window_arg(value: str):
+    '''
+    Parse extraction window, which is SNIPPET, SENTENCE or a number of tokens.
+    :param value: extraction window
+    :return: None for SNIPPET, SENTENCE or number of tokens
+    :raise ValueError if value is no valid window
+    '''
+    if value == SNIPPET:
+        return None
+    if value == SENTENCE:
+        return value
+    num_tokens = int(value)
+    if num_tokens < 0:
+        raise ValueError('Window {} is negative'.format(value))
+    return num_tokens
+
+
+def window_span(tokenized_seq: Doc, start: int, end: int, window) -> (int, int):
+    '''
+    Calculate the window of a match.
+    :param tokenized_seq: tokenized search item
+    :param start: index of first token of match
+    :param end: index of last token of match
+    :param window: SENTENCE or number of tokens before and after the match
+    :return: (start, end) of window, end is exclusive
+    '''
+    if window == SENTENCE:
+        window_start = start
+        while window_start > 0 and tokenized_seq[window_start - 1].text not in SENTENCE_END:
+            window_start -= 1
+        window_end = end + 1
+        while window_end < len(tokenized_seq) and \
+                tokenized_seq[window_end - 1].text not in SENTENCE_END:
+            window_end += 1
+        return window_start, window_end
+    return max(0, start - window), min(len(tokenized_seq), end + 1 + window)
+
+
+def map_to_window(tokenized_seq: Doc, window_start: int, window_doc: Doc, start: int,
+                  end: int) -> (int, int):
+    '''
+    Map indices of a match in tokenized_seq to the indices in the parsed window
+    by the character offsets of the tokens.
+    :param tokenized_seq: tokenized search item
+    :param window_start: index of first token of window in tokenized_seq
+    :param window_doc: parsed text of window
+    :param start: index of first token of match
+    :param end: index of last token of match
+    :return: (start, end) in window_doc or None if the window is tokenized differently
+    '''
+    offset = tokenized_seq[window_start].idx
+    idx_to_i = {token.idx: token.i for token in window_doc}
+    window_start_idx = idx_to_i.get(tokenized_seq[start].idx - offset)
+    window_end_idx = idx_to_i.get(tokenized_seq[end].idx - offset)
+    if window_start_idx is None or window_end_idx is None or \
+            len(window_doc[window_end_idx]) != len(tokenized_seq[end]):
+        return None
+    return window_start_idx, window_end_idx
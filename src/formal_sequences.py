@@ -5,7 +5,7 @@ Provide the semantic sequences for the role formal.
 from spacy.symbols import NOUN, VERB, conj, nmod, dobj, nsubj, xcomp
 from spacy.tokens.doc import Doc
 
-from src.semantic_sequence import SemanticSequence, to_bert_seq, MASK
+from src.semantic_sequence import SemanticSequence, to_bert_seq, MASK, token_pattern
 from src.spacy_utils import ROOT, get_ancestor, get_child
 
 
@@ -14,6 +14,9 @@ class IsSemanticSequence(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return qualia_theorem + ' is'
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' is')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'a|an {} is a'.format(qualia_theorem)
 
@@ -27,6 +30,9 @@ class AndOther(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str):
         return qualia_theorem + '(,|) and other'
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' and other')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'a|an {} and other'.format(qualia_theorem)
 
@@ -40,6 +46,9 @@ class OrOther(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str):
         return qualia_theorem + '(,|) or other'
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' or other')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'a|an {} or other'.format(qualia_theorem)
 
@@ -53,6 +62,10 @@ class IsKindOf(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return qualia_theorem + ' is(\sa|) kind of'
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' is kind of'),
+                token_pattern(qualia_theorem + ' is a kind of')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'a|an {} is kind of'.format(qualia_theorem)
 
@@ -66,6 +79,9 @@ class SuchAs(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str):
         return 'such as ' + qualia_theorem
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('such as ' + qualia_theorem)]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return self.get_regular_expression(qualia_theorem)
 
@@ -94,6 +110,9 @@ class Especially(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str):
         return 'especially ' + qualia_theorem
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('especially ' + qualia_theorem)]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return self.get_regular_expression(qualia_theorem)
 
@@ -111,6 +130,9 @@ class Including(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str):
         return 'including ' + qualia_theorem
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('including ' + qualia_theorem)]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return self.get_regular_expression(qualia_theorem)
 
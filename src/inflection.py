@@ -0,0 +1,166 @@
+'''
+Provide InflectionService, which inflects the singular and plural of qualia
+theorems once. Resolved forms are kept in memory and in a table on disk, so
+a theorem is parsed once across semantic sequences and runs. The entries of
+the inflection dict take precedence over pyinflect and the table.
+'''
+from collections import OrderedDict
+from pathlib import Path
+
+from pyinflect import getInflection
+
+from src.spacy_utils import PARSE_BATCH_SIZE, parse_sequences
+
+INFLECTION_TABLE = '.inflectionTable'  # Default file of resolved forms
+MAX_RESOLVED_NOUNS = 100000  # Default number of resolved nouns kept in memory
+
+
+class WordNotSupportedError(Exception):
+    '''
+    Exception for qualia theorems, which are not supported by the used
+     inflection library pyinflect.
+    '''
+
+
+class InflectionService:
+    '''
+    Memoized inflection of nouns. The inflection dict map a singular to its
+    plural. At most max_entries resolved nouns are kept in memory, the least
+    recently used nouns are dropped first. The table at table_path contains
+    one tab separated line (noun, singular, plural) per noun inflected by
+    pyinflect. New lines are appended by flush. The offset of the line of
+    every noun in the table is kept, so a dropped noun is read from the table
+    instead of parsed and appended again. If table_path is None, the forms
+    are only kept in memory.
+    '''
+
+    def __init__(self, inflection_dict: dict, table_path: str = None,
+                 max_entries: int = MAX_RESOLVED_NOUNS):
+        self.inflection_dict = inflection_dict
+        self.table_path = Path(table_path) if table_path is not None else None
+        self.max_entries = max_entries
+        self.noun_to_forms = OrderedDict()
+        self.noun_to_offset = dict()
+        self.pending = dict()
+        self.num_parsed = 0
+
+        if self.table_path is not None and self.table_path.exists():
+            with open(self.table_path, 'rb') as table_file:
+                offset = 0
+                for line in table_file:
+                    row = _parse_row(line)
+                    if row is not None:
+                        self.noun_to_offset[row[0]] = offset
+                        self.__remember(row[0], row[1])
+                    offset += len(line)
+
+    def inflect(self, noun: str) -> (str, str):
+        '''
+        Inflect plural and singular for noun. Only nouns which are not resolved
+        yet are parsed.
+        :param noun: noun to inflect
+        :raise WordNotSupportedError if noun could not be inflected
+        :return: sing and plural of noun
+        '''
+        forms = self.resolve_all([noun])[noun]
+        if isinstance(forms, WordNotSupportedError):
+            raise forms
+        return forms
+
+    def resolve_all(self, nouns: [str], batch_size: int = PARSE_BATCH_SIZE) -> dict:
+        '''
+        Resolve the forms of all nouns, e.g. of a whole input file. The nouns
+        which are not resolved yet are parsed in batches.
+        :param nouns: nouns to inflect
+        :param batch_size: number of nouns parsed together
+        :return: dict which map noun to (sing, plural) or WordNotSupportedError
+        '''
+        noun_to_result = dict()
+        missing = []
+        for noun in dict.fromkeys(nouns):
+            forms = self.__resolved_forms(noun)
+            noun_to_result[noun] = forms
+            if forms is None:
+                missing.append(noun)
+        self.num_parsed += len(missing)
+        docs = parse_sequences(missing, batch_size) if missing else []
+
+        for noun, doc in zip(missing, docs):
+            lemma = doc[0].lemma_
+            sing = getInflection(lemma, 'NN')
+            plu = getInflection(lemma, 'NNS')
+
+            if sing is not None and plu is not None:
+                noun_to_result[noun] = (sing[0], plu[0])
+                if self.table_path is not None and noun not in self.noun_to_offset:
+                    self.pending[noun] = (sing[0], plu[0])
+            else:
+                noun_to_result[noun] = WordNotSupportedError(
+                    'Pyinflect could not inflect {}. Please add word '
+                    'to inflection dict.'.format(noun))
+            self.__remember(noun, noun_to_result[noun])
+        return noun_to_result
+
+    def flush(self):
+        '''
+        Append forms resolved since the last flush to the table.
+        :return: None
+        '''
+        if self.table_path is None or not self.pending:
+            return
+
+        lines = ['{}\t{}\t{}\n'.format(noun, sing, plu).encode('utf-8')
+                 for noun, (sing, plu) in self.pending.items()]
+        with open(self.table_path, 'ab') as table_file:
+            offset = table_file.tell()
+            table_file.write(b''.join(lines))
+        for noun, line in zip(self.pending, lines):
+            self.noun_to_offset[noun] = offset
+            offset += len(line)
+        self.pending.clear()
+
+    def close(self):
+        '''
+        Write resolved forms to the table.
+        :return: None
+        '''
+        self.flush()
+
+    def __resolved_forms(self, noun: str):
+        '''
+        Return forms of noun from the inflection dict, the resolved nouns, the
+        forms which are not flushed yet or the table.
+        :param noun: noun to inflect
+        :return: (sing, plural), WordNotSupportedError or None if not resolved yet
+        '''
+        if noun in self.inflection_dict:
+            return noun, self.inflection_dict[noun]
+        forms = self.noun_to_forms.get(noun)
+        if forms is not None:
+            self.noun_to_forms.move_to_end(noun)
+            return forms
+
+        forms = self.pending.get(noun)
+        if forms is None and noun in self.noun_to_offset:
+            with open(self.table_path, 'rb') as table_file:
+                table_file.seek(self.noun_to_offset[noun])
+                row = _parse_row(table_file.readline())
+            # Lines appended by another process at the same time can shift the offset
+            if row is not None and row[0] == noun:
+                forms = row[1]
+        if forms is not None:
+            self.__remember(noun, forms)
+        return forms
+
+    def __remember(self, noun: str, forms):
+        self.noun_to_forms[noun] = forms
+        self.noun_to_forms.move_to_end(noun)
+        while self.max_entries is not None and len(self.noun_to_forms) > self.max_entries:
+            self.noun_to_forms.popitem(last=False)
+
+
+def _parse_row(line: bytes):
+    columns = line.decode('utf-8').rstrip('\n').split('\t')
+    if len(columns) != 3:
+        return None
+    return columns[0], (columns[1], columns[2])
@@ -0,0 +1,118 @@
+'''
+Provide JobQueue, a durable queue of qualia theorems stored in a sqlite
+file. The queue records the state of every theorem, so a batch can be
+parked and resumed, e.g. if the daily limit of all api keys is reached.
+'''
+import sqlite3
+from pathlib import Path
+from threading import Lock
+from time import time
+
+QUEUE_FILE = 'queue.db'  # Name of the sqlite file in the queue directory
+PENDING = 'pending'
+IN_PROGRESS = 'inProgress'
+DONE = 'done'
+FAILED = 'failed'
+STATES = [PENDING, IN_PROGRESS, DONE, FAILED]
+
+
+class JobQueue:
+    '''
+    Durable queue of qualia theorems in directory. Theorems are processed in
+    the order in which they were added. Theorems which were in progress
+    when the queue was closed are pending again after reopening.
+    '''
+
+    def __init__(self, directory: str):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.lock = Lock()
+        self.connection = sqlite3.connect(str(Path(directory) / QUEUE_FILE), timeout=30,
+                                          check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS jobs (theorem TEXT PRIMARY KEY, '
+                                'position INTEGER, state TEXT, message TEXT, updated REAL)')
+        self.connection.execute('UPDATE jobs SET state = ? WHERE state = ?',
+                                (PENDING, IN_PROGRESS))
+        self.connection.commit()
+
+    def add(self, qualia_theorems: [str]) -> int:
+        '''
+        Append qualia theorems, which are not already part of the queue.
+        :param qualia_theorems: theorems to append
+        :return: number of appended theorems
+        '''
+        with self.lock:
+            position = self.connection.execute('SELECT COALESCE(MAX(position), -1) '
+                                               'FROM jobs').fetchone()[0]
+            num_added = 0
+            for qualia_theorem in qualia_theorems:
+                cursor = self.connection.execute('INSERT OR IGNORE INTO jobs VALUES '
+                                                 '(?, ?, ?, NULL, ?)',
+                                                 (qualia_theorem, position + 1, PENDING, time()))
+                if cursor.rowcount == 1:
+                    position += 1
+                    num_added += 1
+            self.connection.commit()
+        return num_added
+
+    def next_pending(self) -> str:
+        '''
+        Return the next pending theorem and mark it as in progress.
+        :return: next pending theorem or None if no theorem is pending
+        '''
+        with self.lock:
+            row = self.connection.execute('SELECT theorem FROM jobs WHERE state = ? '
+                                          'ORDER BY position LIMIT 1', (PENDING,)).fetchone()
+            if row is None:
+                return None
+            self._set_state(row[0], IN_PROGRESS)
+        return row[0]
+
+    def mark_done(self, qualia_theorem: str):
+        '''
+        Mark theorem as done.
+        :param qualia_theorem: processed theorem
+        :return: None
+        '''
+        with self.lock:
+            self._set_state(qualia_theorem, DONE)
+
+    def mark_failed(self, qualia_theorem: str, message: str):
+        '''
+        Mark theorem as failed. Failed theorems are not processed again.
+        :param qualia_theorem: failed theorem
+        :param message: reason of the failure
+        :return: None
+        '''
+        with self.lock:
+            self._set_state(qualia_theorem, FAILED, message)
+
+    def release(self, qualia_theorem: str):
+        '''
+        Mark theorem in progress as pending again, so it will be processed later.
+        :param qualia_theorem: theorem to release
+        :return: None
+        '''
+        with self.lock:
+            self._set_state(qualia_theorem, PENDING)
+
+    def counts(self) -> {str: int}:
+        '''
+        Return number of theorems in every state.
+        :return: dict which map state to number of theorems
+        '''
+        with self.lock:
+            counts = dict(self.connection.execute('SELECT state, COUNT(*) FROM jobs '
+                                                  'GROUP BY state'))
+        return {state: counts.get(state, 0) for state in STATES}
+
+    def close(self):
+        '''
+        Close connection to sqlite file.
+        :return: None
+        '''
+        self.connection.close()
+
+    def _set_state(self, qualia_theorem: str, state: str, message: str = None):
+        self.connection.execute('UPDATE jobs SET state = ?, message = ?, updated = ? '
+                                'WHERE theorem = ?', (state, message, time(), qualia_theorem))
+        self.connection.commit()
@@ -0,0 +1,163 @@
+'''
+Provide KeyPool, which schedules the search requests over all key pairs
+of the keyfile and persists the used daily quota of every key in a sqlite
+file. A key is not used anymore, if its daily limit is reached.
+'''
+from datetime import datetime, timedelta
+from hashlib import sha256
+from threading import Lock
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+from src.sqlite_utils import ProcessConnection
+
+KEY_USAGE_FILE = '.keyUsage.db'  # Default file of the persisted key usage
+DAILY_LIMIT = 100  # Daily limit of free requests per key
+ROUND_ROBIN = 'roundRobin'
+LEAST_USED = 'leastUsed'
+SCHEDULING_CHOICES = [ROUND_ROBIN, LEAST_USED]
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')  # Daily quota is reset at midnight pacific time
+
+
+def quota_day(now: datetime = None) -> str:
+    '''
+    Return the day of the daily quota.
+    :param now: point in time, current time if None
+    :return: day of quota as iso string
+    '''
+    now = now if now is not None else datetime.now(QUOTA_TIMEZONE)
+    return now.astimezone(QUOTA_TIMEZONE).date().isoformat()
+
+
+def seconds_until_reset(now: datetime = None) -> float:
+    '''
+    Return number of seconds until the daily quota is reset.
+    :param now: point in time, current time if None
+    :return: seconds until next reset
+    '''
+    now = (now if now is not None else datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE)
+    next_day = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(),
+                                tzinfo=QUOTA_TIMEZONE)
+    return next_day.timestamp() - now.timestamp()
+
+
+def mask_key(api_key: str) -> str:
+    '''
+    Mask api key for printing.
+    :param api_key: api key
+    :return: masked api key
+    '''
+    return api_key[:4] + '...' + api_key[-4:] if len(api_key) > 8 else '...'
+
+
+def _key_hash(api_key: str) -> str:
+    return sha256(api_key.encode('utf-8')).hexdigest()
+
+
+class KeyPool:
+    '''
+    Schedule (API key, Custom Search ID) pairs by round robin or by least used
+    key first. The used daily quota of every key is stored by hash of the api
+    key in the sqlite file path, so the counters are shared by all processes
+    and runs.
+    '''
+
+    def __init__(self, keys: [(str, str)], path: str = KEY_USAGE_FILE,
+                 daily_limit: int = DAILY_LIMIT, scheduling: str = ROUND_ROBIN):
+        if scheduling not in SCHEDULING_CHOICES:
+            raise AttributeError('Unknown scheduling {}'.format(scheduling))
+        self.keys = list(dict.fromkeys(keys))
+        self.daily_limit = daily_limit
+        self.scheduling = scheduling
+        self.next_idx = 0
+        self.lock = Lock()
+        self.connection = ProcessConnection(path, timeout=30, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS usage (key_hash TEXT, day TEXT, '
+                                'used INTEGER, exhausted INTEGER, '
+                                'PRIMARY KEY (key_hash, day))')
+        self.connection.commit()
+
+    def acquire(self) -> (str, str):
+        '''
+        Reserve one request of the quota of a key.
+        :return: (API key, Custom Search ID) pair or None if all keys reached limit
+        '''
+        day = quota_day()
+        with self.lock:
+            for api_key, cse_key in self._scheduled_keys(day):
+                cursor = self.connection.execute('UPDATE usage SET used = used + 1 '
+                                                 'WHERE key_hash = ? AND day = ? '
+                                                 'AND used < ? AND exhausted = 0',
+                                                 (_key_hash(api_key), day, self.daily_limit))
+                self.connection.commit()
+                if cursor.rowcount == 1:
+                    return api_key, cse_key
+        return None
+
+    def mark_exhausted(self, api_key: str):
+        '''
+        Mark key as exhausted for the current day, because the api rejected it.
+        :param api_key: api key
+        :return: None
+        '''
+        with self.lock:
+            self.connection.execute('UPDATE usage SET exhausted = 1 WHERE key_hash = ? '
+                                    'AND day = ?', (_key_hash(api_key), quota_day()))
+            self.connection.commit()
+
+    def usage(self) -> {str: (int, bool)}:
+        '''
+        Return used requests of the current day for every key.
+        :return: dict which map api key to (used requests, is exhausted)
+        '''
+        day = quota_day()
+        with self.lock:
+            self._insert_missing(day)
+            rows = dict((key_hash, (used, bool(exhausted))) for key_hash, used, exhausted in
+                        self.connection.execute('SELECT key_hash, used, exhausted FROM usage '
+                                                'WHERE day = ?', (day,)))
+        return {api_key: rows[_key_hash(api_key)] for api_key, _ in self.keys}
+
+    def remaining(self) -> {str: int}:
+        '''
+        Return remaining requests of the current day for every key.
+        :return: dict which map api key to remaining requests
+        '''
+        return {api_key: 0 if exhausted else max(self.daily_limit - used, 0)
+                for api_key, (used, exhausted) in self.usage().items()}
+
+    def close(self):
+        '''
+        Close connection to sqlite file.
+        :return: None
+        '''
+        self.connection.close()
+
+    def _scheduled_keys(self, day: str) -> [(str, str)]:
+        '''
+        Return all keys in order of scheduling.
+        :param day: current quota day
+        :return: ordered keys
+        '''
+        self._insert_missing(day)
+        if self.scheduling == LEAST_USED:
+            used = dict(self.connection.execute('SELECT key_hash, used FROM usage WHERE day = ?',
+                                                (day,)))
+            return sorted(self.keys, key=lambda key: used[_key_hash(key[0])])
+
+        start = self.next_idx
+        self.next_idx = (self.next_idx + 1) % len(self.keys)
+        return self.keys[start:] + self.keys[:start]
+
+    def _insert_missing(self, day: str):
+        '''
+        Insert counters of the day for keys without counter.
+        :param day: current quota day
+        :return: None
+        '''
+        self.connection.executemany('INSERT OR IGNORE INTO usage VALUES (?, ?, 0, 0)',
+                                    [(_key_hash(api_key), day) for api_key, _ in self.keys])
+        self.connection.commit()
@@ -8,9 +8,29 @@ from src.requester import WebRequester
 MAX_PAGES = 25270000000  # Maximum of search Results
 
 
+class OccurrenceIndex:
+    '''
+    Index of the qualia elements of a role, which is built in one pass over
+    all semantic sequences. Dict element_to_sources map an element to its
+    number of sources and element_to_patterns to the number of semantic
+    sequences which extracted it.
+    '''
+
+    def __init__(self, debug_role):
+        self.element_to_sources = dict()
+        self.element_to_patterns = dict()
+
+        for d_q_e in chain.from_iterable(debug_role.sem_seq_to_qe.values()):
+            self.element_to_sources[d_q_e] = self.element_to_sources.get(d_q_e, 0) \
+                                             + len(d_q_e.sources)
+            self.element_to_patterns[d_q_e] = self.element_to_patterns.get(d_q_e, 0) + 1
+
+
 class OccurrenceMetric:
     '''
-    Abstract class for metric, which use generated text artefacts.
+    Abstract class for metric, which use generated text artefacts. The metric
+    values of a role are calculated from an OccurrenceIndex of the role, so
+    scoring all elements of a role is linear in the number of elements.
     '''
 
     def calc_metric_value(self, db_qualia_element, debug_role) -> float:
@@ -21,6 +41,27 @@ class OccurrenceMetric:
         :param debug_role: role of the qualia element
         :return: metric value of db_qualia_element
         '''
+        return self.calc_metric_values([db_qualia_element], debug_role)[0]
+
+    def calc_metric_values(self, db_qualia_elements: [], debug_role) -> [float]:
+        '''
+        Calculate metric values of multiple qualia elements in role.
+        :param db_qualia_elements: debug qualia elements for which metric
+        values will be calculated
+        :param debug_role: role of the qualia elements
+        :return: metric values in order of db_qualia_elements
+        '''
+        index = OccurrenceIndex(debug_role)
+        return [self._calc_metric_value_of_index(db_qualia_element, index)
+                for db_qualia_element in db_qualia_elements]
+
+    def _calc_metric_value_of_index(self, db_qualia_element, index: OccurrenceIndex) -> float:
+        '''
+        Calculate metric value of db_qualia_element by using index of its role.
+        :param db_qualia_element: debug qualia element
+        :param index: index of the role
+        :return: metric value of db_qualia_element
+        '''
         raise NotImplementedError('Abstract Class OccurrenceMetric has been initiated')
 
 
@@ -30,12 +71,8 @@ class NumberOfSources(OccurrenceMetric):
     the qualia element was extracted.
     '''
 
-    def calc_metric_value(self, db_qualia_element, debug_role) -> float:
-        qualia_elements_of_roles = chain.from_iterable(
-            debug_role.sem_seq_to_qe.values())
-
-        return sum(len(d_q_e.sources) for d_q_e in
-                   [d_q_e for d_q_e in qualia_elements_of_roles if d_q_e == db_qualia_element])
+    def _calc_metric_value_of_index(self, db_qualia_element, index: OccurrenceIndex) -> float:
+        return index.element_to_sources.get(db_qualia_element, 0)
 
 
 class OccurrenceInRequests(OccurrenceMetric):
@@ -44,19 +81,17 @@ class OccurrenceInRequests(OccurrenceMetric):
     the qualia element.
     '''
 
-    def calc_metric_value(self, db_qualia_element, db_role) -> float:
-        qualia_elements_for_roles = chain.from_iterable(
-            db_role.sem_seq_to_qe.values())
-
-        return len([d_q_e for d_q_e in qualia_elements_for_roles
-                    if d_q_e == db_qualia_element])
+    def _calc_metric_value_of_index(self, db_qualia_element, index: OccurrenceIndex) -> float:
+        return index.element_to_patterns.get(db_qualia_element, 0)
 
 
 class WebBasedMetric:
     '''
     Abstract class for metrics which use the relation between the number of
     search results to approximate probability distribution. To execute
-    search requests an instance of WebRequester is used.L
+    search requests an instance of WebRequester is used. Subclasses define
+    the needed search requests by get_search_requests and calculate the
+    metric value from their number of results by _calc_metric_value_of_hits.
     '''
 
     def __init__(self, web_requester: WebRequester):
@@ -71,44 +106,89 @@ class WebBasedMetric:
         :return: metric value for qualia element
         '''
 
-        raise NotImplementedError('Abstract Class WebBasedMetric has been initiated')
+        return self.calc_metric_values([qualia_element], qualia_theorem)[0]
 
+    def calc_metric_values(self, qualia_elements: [str], qualia_theorem: str) -> [float]:
+        '''
+        Calculate metric values of multiple qualia elements. Requests shared by
+        the elements, like the number of results of the theorem, are executed
+        once and all requests are passed in one batch to the web requester.
+        :param qualia_elements: strings of qualia elements
+        :param qualia_theorem: string of qualia theorem
+        :return: metric values in order of qualia_elements
+        '''
+        element_requests = [self.get_search_requests(qualia_element, qualia_theorem)
+                            for qualia_element in qualia_elements]
+        unique_requests = list(dict.fromkeys(chain.from_iterable(element_requests)))
+        request_to_hits = dict(zip(unique_requests,
+                                   self.web_requester.num_results_of_all(unique_requests)))
 
-class WebJac(WebBasedMetric):
+        return [self._calc_metric_value_of_hits([request_to_hits[request]
+                                                 for request in requests])
+                for requests in element_requests]
 
-    def calc_metric_value(self, qualia_element: str, qualia_theorem: str) -> float:
+    def get_search_requests(self, qualia_element: str, qualia_theorem: str) -> [str]:
         '''
-        Calculate metric value by approximate P(qualia_element | theorem)
-        / (P(qualia_element) + P(theorem) -  P(qualia_element, theorem)).
+        Return all search requests needed to calculate the metric value.
         :param qualia_element: string of qualia element
         :param qualia_theorem: string of qualia theorem
-        :return: metric value for qualia element
+        :return: search requests of metric value
         '''
-        return self.web_requester.num_results_near(qualia_element, qualia_theorem) \
-               / (self.web_requester.num_results(qualia_element)
-                  + self.web_requester.num_results(qualia_theorem)
-                  - self.web_requester.num_search_and(qualia_element, qualia_theorem))
+
+        raise NotImplementedError('Abstract Class WebBasedMetric has been initiated')
+
+    def _calc_metric_value_of_hits(self, hits: [int]) -> float:
+        '''
+        Calculate metric value from number of results.
+        :param hits: number of results of the requests of get_search_requests
+        :return: metric value
+        '''
+
+        raise NotImplementedError('Abstract Class WebBasedMetric has been initiated')
+
+
+class WebJac(WebBasedMetric):
+    '''
+    Calculate metric value by approximate P(qualia_element | theorem)
+    / (P(qualia_element) + P(theorem) -  P(qualia_element, theorem)).
+    '''
+
+    def get_search_requests(self, qualia_element: str, qualia_theorem: str) -> [str]:
+        return [self.web_requester.near_request(qualia_element, qualia_theorem),
+                qualia_element, qualia_theorem,
+                self.web_requester.and_request(qualia_element, qualia_theorem)]
+
+    def _calc_metric_value_of_hits(self, hits: [int]) -> float:
+        num_near, num_element, num_theorem, num_and = hits
+        return num_near / (num_element + num_theorem - num_and)
 
 
 class WebPMI(WebBasedMetric):
+    '''
+    Calculate metric value by the pointwise mutual information
+    log2(P(qualia_element, theorem) / (P(qualia_element) * P(theorem))).
+    '''
+
+    def get_search_requests(self, qualia_element: str, qualia_theorem: str) -> [str]:
+        return [self.web_requester.and_request(qualia_element, qualia_theorem),
+                qualia_element, qualia_theorem]
 
-    def calc_metric_value(self, qualia_element: str, qualia_theorem: str) -> float:
-        temp = self.web_requester.num_search_and(qualia_element, qualia_theorem) * MAX_PAGES / \
-               (self.web_requester.num_results(qualia_element)
-                * self.web_requester.num_results(qualia_theorem))
+    def _calc_metric_value_of_hits(self, hits: [int]) -> float:
+        num_and, num_element, num_theorem = hits
+        temp = num_and * MAX_PAGES / (num_element * num_theorem)
 
         return 0 if temp == 0 else log(temp, 2)
 
 
 class WebP(WebBasedMetric):
+    '''
+    Calculate metric value by approximate P(qualia_element | theorem)
+    '''
 
-    def calc_metric_value(self, qualia_element: str, qualia_theorem: str):
-        '''
-        Calculate metric value by approximate P(qualia_element | theorem)
-        :param qualia_element: string of qualia element
-        :param qualia_theorem: string of qualia theorem
-        :return: metric value for qualia element
-        '''
+    def get_search_requests(self, qualia_element: str, qualia_theorem: str) -> [str]:
+        return [self.web_requester.near_request(qualia_element, qualia_theorem),
+                qualia_theorem]
 
-        return self.web_requester.num_results_near(qualia_element, qualia_theorem) / \
-               self.web_requester.num_results(qualia_theorem)
+    def _calc_metric_value_of_hits(self, hits: [int]) -> float:
+        num_near, num_theorem = hits
+        return num_near / num_theorem
@@ -0,0 +1,151 @@
+'''
+Provide the inference backends of the masked language model used by
+BertStrategy. TFBackend runs TFBertForMaskedLM with TensorFlow. OnnxBackend
+exports the model once to ONNX, optionally quantizes the weights dynamically
+to int8 and runs it with ONNX Runtime on the CPU. ONNX Runtime and tf2onnx
+are only imported by OnnxBackend.
+'''
+from pathlib import Path
+
+import numpy as np
+
+NAME_OF_MODEL = 'bert-base-cased'
+TF_BACKEND = 'tf'
+ONNX_BACKEND = 'onnx'
+ONNX_INT8_BACKEND = 'onnxInt8'
+BACKEND_CHOICES = [TF_BACKEND, ONNX_BACKEND, ONNX_INT8_BACKEND]
+ONNX_FOLDER = '.onnx'  # Default folder of the exported models
+ONNX_OPSET = 12
+
+_MODEL = None
+
+
+def get_model():
+    '''
+    Return TensorFlow masked language model NAME_OF_MODEL, which is loaded on first use.
+    :return: TFBertForMaskedLM
+    '''
+    global _MODEL
+    if _MODEL is None:
+        from transformers import TFBertForMaskedLM
+
+        _MODEL = TFBertForMaskedLM.from_pretrained(NAME_OF_MODEL, return_dict=True)
+    return _MODEL
+
+
+class MaskedLMBackend:
+    '''
+    Abstract class for an inference backend of the masked language model.
+    The name identifies the backend and its numerical behaviour.
+    '''
+
+    name = None
+
+    def logits(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        '''
+        Abstract method to predict the logits of all tokens of a padded batch.
+        :param input_ids: padded input ids with shape (batch, length)
+        :param attention_mask: attention mask with shape (batch, length)
+        :return: logits with shape (batch, length, vocabulary size)
+        '''
+
+
+class TFBackend(MaskedLMBackend):
+    '''
+    Run the masked language model with TensorFlow.
+    '''
+
+    name = TF_BACKEND
+
+    def logits(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        import tensorflow as tf
+
+        outputs = get_model()(tf.convert_to_tensor(input_ids),
+                              attention_mask=tf.convert_to_tensor(attention_mask))
+        return outputs.logits.numpy()
+
+
+class OnnxBackend(MaskedLMBackend):
+    '''
+    Run the masked language model with ONNX Runtime. The model is exported
+    to folder on first use. If quantize is true, the weights of the exported
+    model are quantized to int8.
+    '''
+
+    def __init__(self, folder: str = ONNX_FOLDER, quantize: bool = False):
+        from onnxruntime import InferenceSession
+
+        self.name = ONNX_INT8_BACKEND if quantize else ONNX_BACKEND
+        model_path = export_onnx(Path(folder))
+        if quantize:
+            model_path = quantize_onnx(model_path)
+        self.session = InferenceSession(str(model_path), providers=['CPUExecutionProvider'])
+
+    def logits(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {'input_ids': input_ids,
+                                       'attention_mask': attention_mask})[0]
+
+
+def create_backend(name: str, folder: str = ONNX_FOLDER) -> MaskedLMBackend:
+    '''
+    Create backend by name of BACKEND_CHOICES.
+    :param name: name of backend
+    :param folder: folder of the exported onnx models
+    :return: backend of masked language model
+    '''
+    if name == TF_BACKEND:
+        return TFBackend()
+    if name in [ONNX_BACKEND, ONNX_INT8_BACKEND]:
+        return OnnxBackend(folder, quantize=name == ONNX_INT8_BACKEND)
+    raise ValueError('Unknown backend {} (choose from {})'.format(name,
+                                                                  ', '.join(BACKEND_CHOICES)))
+
+
+def export_onnx(folder: Path) -> Path:
+    '''
+    Export TensorFlow model NAME_OF_MODEL to onnx, if it is not exported yet.
+    The model has the inputs input_ids and attention_mask with dynamic batch
+    size and length and the logits as output.
+    :param folder: folder of the exported model
+    :return: path of the onnx model
+    '''
+    model_path = folder / '{}.onnx'.format(NAME_OF_MODEL)
+    if model_path.exists():
+        return model_path
+
+    import tensorflow as tf
+    import tf2onnx
+
+    model = get_model()
+    input_signature = [tf.TensorSpec((None, None), tf.int32, name='input_ids'),
+                       tf.TensorSpec((None, None), tf.int32, name='attention_mask')]
+
+    @tf.function(input_signature=input_signature)
+    def masked_lm(input_ids, attention_mask):
+        return model(input_ids, attention_mask=attention_mask).logits
+
+    folder.mkdir(parents=True, exist_ok=True)
+    temp_path = model_path.with_name(model_path.name + '.tmp')
+    tf2onnx.convert.from_function(masked_lm, input_signature=input_signature,
+                                  opset=ONNX_OPSET, output_path=str(temp_path))
+    temp_path.replace(model_path)
+    return model_path
+
+
+def quantize_onnx(model_path: Path) -> Path:
+    '''
+    Quantize the weights of the onnx model dynamically to int8, if it is not
+    quantized yet.
+    :param model_path: path of the onnx model
+    :return: path of the quantized model
+    '''
+    quantized_path = model_path.with_name(model_path.stem + '-int8.onnx')
+    if quantized_path.exists():
+        return quantized_path
+
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    temp_path = quantized_path.with_name(quantized_path.name + '.tmp')
+    quantize_dynamic(str(model_path), str(temp_path), weight_type=QuantType.QInt8)
+    temp_path.replace(quantized_path)
+    return quantized_path
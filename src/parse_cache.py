@@ -0,0 +1,157 @@
+'''
+Provide ParseCache, a content addressed cache of parsed search items. Docs
+are stored by the hash of the cleaned text in memory with LRU eviction and
+persisted as spaCy DocBin shards in a folder, so a search item is parsed
+once across semantic sequences and runs.
+'''
+import os
+from collections import OrderedDict
+from hashlib import sha256
+from pathlib import Path
+
+from spacy.tokens import Doc, DocBin
+
+from src.spacy_utils import get_lang_model, PARSE_BATCH_SIZE, parse_sequences
+
+PARSE_CACHE_FOLDER = '.parseCache'  # Default folder of the DocBin shards
+MAX_CACHED_DOCS = 10000  # Default number of docs kept in memory
+SHARD_SIZE = 1000  # Number of new docs written together as one shard
+SHARD_SUFFIX = '.spacy'
+KEYS_SUFFIX = '.keys'
+DOC_ATTRS = ['ORTH', 'LEMMA', 'TAG', 'POS', 'HEAD', 'DEP', 'ENT_IOB', 'ENT_TYPE']
+
+
+def text_key(text: str) -> str:
+    '''
+    Calculate cache key of text as hash of the text.
+    :param text: cleaned search item
+    :return: hex digest of text
+    '''
+    return sha256(text.encode('utf-8')).hexdigest()
+
+
+class ParseCache:
+    '''
+    Cache of parsed texts. At most max_entries docs are kept in memory. New
+    docs are written as a shard to folder after shard_size parses and on close.
+    Every shard has a keys file with the keys of its docs in the same order.
+    If folder is None, the docs are only cached in memory.
+    '''
+
+    def __init__(self, folder: str = PARSE_CACHE_FOLDER, max_entries: int = MAX_CACHED_DOCS,
+                 shard_size: int = SHARD_SIZE):
+        self.folder = Path(folder) if folder is not None else None
+        self.max_entries = max_entries
+        self.shard_size = shard_size
+        self.key_to_doc = OrderedDict()
+        self.key_to_shard = dict()
+        self.pending = OrderedDict()
+        self.num_hits = 0
+        self.num_parsed = 0
+
+        if self.folder is not None:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            for keys_file in sorted(self.folder.glob('*' + KEYS_SUFFIX)):
+                shard = keys_file.with_suffix(SHARD_SUFFIX)
+                for key in keys_file.read_text().split():
+                    self.key_to_shard[key] = shard
+
+    def get(self, text: str) -> Doc:
+        '''
+        Return parsed doc of text from memory or from its shard.
+        :param text: cleaned search item
+        :return: parsed doc or None if text is not cached
+        '''
+        key = text_key(text)
+        if key not in self.key_to_doc and key in self.key_to_shard:
+            self._load_shard(self.key_to_shard[key], key)
+
+        doc = self.key_to_doc.get(key, self.pending.get(key))
+        if doc is not None:
+            self._remember(key, doc)
+        return doc
+
+    def put(self, text: str, doc: Doc):
+        '''
+        Store parsed doc of text. The doc is persisted with the next shard.
+        :param text: cleaned search item
+        :param doc: parsed doc of text
+        :return: None
+        '''
+        key = text_key(text)
+        self._remember(key, doc)
+        if self.folder is not None and key not in self.key_to_shard:
+            self.pending[key] = doc
+            if len(self.pending) >= self.shard_size:
+                self.flush()
+
+    def parse_all(self, texts: [str], batch_size: int = PARSE_BATCH_SIZE,
+                  n_process: int = 1) -> [Doc]:
+        '''
+        Return parsed docs of texts. Only texts which are not cached are parsed
+        in batches.
+        :param texts: cleaned search items
+        :param batch_size: number of texts parsed together
+        :param n_process: number of processes used for parsing
+        :return: parsed docs in order of texts
+        '''
+        text_to_doc = {text: self.get(text) for text in dict.fromkeys(texts)}
+        missing = [text for text, doc in text_to_doc.items() if doc is None]
+        self.num_hits += len(text_to_doc) - len(missing)
+        self.num_parsed += len(missing)
+
+        for text, doc in zip(missing, parse_sequences(missing, batch_size, n_process)):
+            self.put(text, doc)
+            text_to_doc[text] = doc
+        return [text_to_doc[text] for text in texts]
+
+    def flush(self):
+        '''
+        Write pending docs as a new shard. The keys file is written after the
+        shard, so only complete shards are indexed.
+        :return: None
+        '''
+        if self.folder is None or not self.pending:
+            return
+
+        name = '{}_{}'.format(os.getpid(), text_key(''.join(self.pending.keys()))[:16])
+        shard = self.folder / (name + SHARD_SUFFIX)
+        doc_bin = DocBin(attrs=DOC_ATTRS)
+        for doc in self.pending.values():
+            doc_bin.add(doc)
+        _write_atomic(shard, doc_bin.to_bytes())
+        _write_atomic(self.folder / (name + KEYS_SUFFIX),
+                      '\n'.join(self.pending.keys()).encode('utf-8'))
+
+        for key in self.pending:
+            self.key_to_shard[key] = shard
+        self.pending.clear()
+
+    def close(self):
+        '''
+        Write pending docs to disk.
+        :return: None
+        '''
+        self.flush()
+
+    def _load_shard(self, shard: Path, requested_key: str):
+        keys = shard.with_suffix(KEYS_SUFFIX).read_text().split()
+        docs = DocBin().from_bytes(shard.read_bytes()).get_docs(get_lang_model().vocab)
+        key_to_doc = {key: doc for key, doc in zip(keys, docs) if key not in self.key_to_doc}
+        requested_doc = key_to_doc.pop(requested_key, None)
+        for key, doc in key_to_doc.items():
+            self._remember(key, doc)
+        if requested_doc is not None:
+            self._remember(requested_key, requested_doc)
+
+    def _remember(self, key: str, doc: Doc):
+        self.key_to_doc[key] = doc
+        self.key_to_doc.move_to_end(key)
+        while self.max_entries is not None and len(self.key_to_doc) > self.max_entries:
+            self.key_to_doc.popitem(last=False)
+
+
+def _write_atomic(path: Path, data: bytes):
+    temp_path = path.with_name(path.name + '.tmp')
+    temp_path.write_bytes(data)
+    os.replace(str(temp_path), str(path))
@@ -0,0 +1,89 @@
+'''
+Provide PredictionCache, a persistent cache of the top k predictions of the
+masked language model. The predictions of a mask are stored in one sqlite
+file by the hash of model name, backend, tokenized input and k as arrays of
+token ids and probabilities, so repeated runs and both BERT strategies do
+not predict an input twice.
+'''
+from hashlib import sha256
+from threading import RLock
+
+import numpy as np
+
+from src.sqlite_utils import ProcessConnection
+
+PREDICTION_CACHE_FILE = '.maskedPredictions.db'  # Default file of the sqlite cache
+SELECT_BATCH_SIZE = 500  # Number of keys selected by one query
+
+
+def prediction_key(model_name: str, backend_name: str, input_ids: [int], k: int) -> str:
+    '''
+    Calculate cache key of the predictions of the first mask of input_ids.
+    :param model_name: name of masked language model
+    :param backend_name: name of inference backend
+    :param input_ids: token ids of bert input
+    :param k: number of predictions
+    :return: hex digest of key fields
+    '''
+    return sha256('{}\t{}\t{}\t{}'.format(model_name, backend_name, k,
+                                          ' '.join(map(str, input_ids)))
+                  .encode('utf-8')).hexdigest()
+
+
+class PredictionCache:
+    '''
+    Cache of the top k predictions of masked inputs in a single sqlite file.
+    Token ids are stored as int32 and probabilities as float32 array.
+    '''
+
+    def __init__(self, path: str = PREDICTION_CACHE_FILE):
+        self.path = path
+        self.lock = RLock()
+        self.num_hits = 0
+        self.num_predicted = 0
+        self.connection = ProcessConnection(path, timeout=30, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS predictions ('
+                                'key TEXT PRIMARY KEY, ids BLOB, probs BLOB)')
+        self.connection.commit()
+
+    def get_many(self, keys: [str]) -> dict:
+        '''
+        Return stored predictions of keys.
+        :param keys: keys of prediction_key
+        :return: dict which map stored keys to (token ids, probabilities)
+        '''
+        unique_keys = list(dict.fromkeys(keys))
+        key_to_predictions = dict()
+        with self.lock:
+            for start in range(0, len(unique_keys), SELECT_BATCH_SIZE):
+                batch = unique_keys[start:start + SELECT_BATCH_SIZE]
+                rows = self.connection.execute(
+                    'SELECT key, ids, probs FROM predictions WHERE key IN ({})'
+                    .format(', '.join('?' * len(batch))), batch).fetchall()
+                for key, ids, probs in rows:
+                    key_to_predictions[key] = (np.frombuffer(ids, dtype=np.int32),
+                                               np.frombuffer(probs, dtype=np.float32))
+        self.num_hits += len(key_to_predictions)
+        return key_to_predictions
+
+    def put_many(self, items: [(str, np.ndarray, np.ndarray)]):
+        '''
+        Store predictions of multiple keys.
+        :param items: list of (key, token ids, probabilities)
+        :return: None
+        '''
+        with self.lock:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)',
+                [(key, np.asarray(ids, dtype=np.int32).tobytes(),
+                  np.asarray(probs, dtype=np.float32).tobytes()) for key, ids, probs in items])
+            self.connection.commit()
+        self.num_predicted += len(items)
+
+    def close(self):
+        '''
+        Close the sqlite connection.
+        :return: None
+        '''
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,79 @@
+'''
+Provide AnchorPrefilter, a literal prefilter of search items on the raw text.
+Every word of a token pattern, which is not optional, is an anchor of the
+semantic sequence. A token is a part of the raw text, so a search item can
+only match a semantic sequence if its lowercase text contains all anchors of
+the sequence. Search items which cannot match any sequence are not parsed.
+'''
+import re
+
+from src.semantic_sequence import SemanticSequence
+
+
+def anchor_words(patterns: [[dict]]) -> {str}:
+    '''
+    Return the words, which are part of every alternative of the token patterns.
+    :param patterns: alternative token patterns of a semantic sequence
+    :return: set of anchor words
+    '''
+    alternatives = []
+    for pattern in patterns:
+        words = set()
+        for token in pattern:
+            value = token.get('LOWER')
+            if token.get('OP') in ['?', '*'] or value is None:
+                continue
+            if isinstance(value, str):
+                words.add(value)
+            elif 'REGEX' in value:
+                words.add(re.sub(r'\\(.)', r'\1', value['REGEX'].strip('^$')))
+        alternatives.append(words)
+    return set.intersection(*alternatives) if alternatives else set()
+
+
+class PrefilterCounter:
+    '''
+    Count the checked and skipped pairs of search item and semantic sequence
+    and the search items, which were not parsed.
+    '''
+
+    def __init__(self):
+        self.num_pairs = 0
+        self.num_skipped_pairs = 0
+        self.num_items = 0
+        self.num_skipped_items = 0
+
+    def __repr__(self):
+        return 'Prefilter skipped {} of {} search items and {} of {} extractions'.format(
+            self.num_skipped_items, self.num_items, self.num_skipped_pairs, self.num_pairs)
+
+
+class AnchorPrefilter:
+    '''
+    Prefilter of the semantic sequences in pattern_theorem_pairs. All anchors
+    are searched once per search item.
+    '''
+
+    def __init__(self, pattern_theorem_pairs: [(SemanticSequence, str)]):
+        self.sem_seq_to_anchors = {semantic_seq: anchor_words(
+            semantic_seq.get_token_patterns(qualia_theorem))
+            for semantic_seq, qualia_theorem in pattern_theorem_pairs}
+        self.anchors = set().union(*self.sem_seq_to_anchors.values())
+
+    def present_anchors(self, text: str) -> {str}:
+        '''
+        Return the anchors, which are part of text.
+        :param text: cleaned search item
+        :return: set of present anchors
+        '''
+        text = text.lower()
+        return {anchor for anchor in self.anchors if anchor in text}
+
+    def may_match(self, semantic_seq: SemanticSequence, present_anchors: {str}) -> bool:
+        '''
+        Return true if a search item with present_anchors may match semantic_seq.
+        :param semantic_seq: semantic sequence
+        :param present_anchors: anchors of the search item
+        :return: false if the search item can not match
+        '''
+        return self.sem_seq_to_anchors[semantic_seq] <= present_anchors
@@ -9,18 +9,22 @@ QualiaStructure. This is used for pretty print.
 '''
 import string
 
+from copy import deepcopy
 from itertools import chain
 from datetime import datetime
 
-from pyinflect import getInflection
-
-from src.spacy_utils import LANG_MODEL
+from src.spacy_utils import get_lang_model, PARSE_BATCH_SIZE, parse_sequences
 from src.formal_sequences import *
 from src.agentive_sequences import *
 from src.constitutive_sequences import *
 from src.telic_sequences import *
 
-from src.requester import WebRequester
+from src.requester import WebRequester, AllKeysReachLimit, SearchRequestError
+from src.parse_cache import ParseCache
+from src.inflection import InflectionService, WordNotSupportedError
+from src.sequence_matcher import SequenceMatcher
+from src.prefilter import AnchorPrefilter, PrefilterCounter
+from src.extraction_window import window_span, map_to_window
 from src.metrics import WebBasedMetric, OccurrenceMetric
 
 # Declare used semantic_seq and search Requests.
@@ -41,13 +45,6 @@ AGENTIVE = [ToANew(False), ToAComplete(False), NewHasBeen(False), CompleteHasBee
 TELIC = [IsUsedTo(False), PurposeOfA(False), AreUsedTo(True), PurposeOf(True)], 'telic'
 
 
-class WordNotSupportedError(Exception):
-    '''
-    Exception for qualia theorems, which are not supported by the used
-     inflection library pyinflect.
-    '''
-
-
 class QualiaElement:
     '''
     Internal structure of a qualia element for debugging and internal
@@ -177,11 +174,17 @@ class CreationStrategy:
     '''
     Abstract class for a strategy to create a qualia structure by
     method plural_and_singular_of_word. Contains inflection_dict for
-    words, which can not be inflected by pyinflect.
+    words, which can not be inflected by pyinflect. The inflections are
+    resolved by inflection_service, which is created from inflection_dict
+    if a dict is passed.
     '''
 
     def __init__(self, inflection_dict):
-        self.inflection_dict = inflection_dict
+        if isinstance(inflection_dict, InflectionService):
+            self.inflection_service = inflection_dict
+        else:
+            self.inflection_service = InflectionService(inflection_dict)
+        self.inflection_dict = self.inflection_service.inflection_dict
 
     def generate_qualia_structure(self, qualia_theorem: str) -> DebugQualiaStructure:
         '''
@@ -190,30 +193,30 @@ class CreationStrategy:
         :return: DebugQualiaStructure for theorem
         '''
 
+    def generate_qualia_structures(self, qualia_theorems: [str]) -> [(str, object)]:
+        '''
+        Generate qualia structures of all theorems. Subclasses can override this
+        method to process the theorems of a batch together.
+        :param qualia_theorems: qualia theorems of batch
+        :return: list of (theorem, DebugQualiaStructure or raised WordNotSupportedError)
+        '''
+        results = []
+        for qualia_theorem in qualia_theorems:
+            try:
+                results.append((qualia_theorem, self.generate_qualia_structure(qualia_theorem)))
+            except WordNotSupportedError as word_not_supported_error:
+                results.append((qualia_theorem, word_not_supported_error))
+        return results
+
     def inflect_sing_plural(self, noun: str) -> (str, str):
         '''
-        Inflect plural and singular for word.
+        Inflect plural and singular for word. The forms of every noun are
+        resolved once by inflection_service.
         :param noun: noun to inflect
+        :raise WordNotSupportedError if noun could not be inflected
         :return: sing and plural of noun
         '''
-
-        if noun in self.inflection_dict:
-            sing = noun
-            plu = self.inflection_dict[noun]
-        else:
-            lemma = LANG_MODEL(noun)[0].lemma_
-            sing = getInflection(lemma, 'NN')
-            plu = getInflection(lemma, 'NNS')
-
-            if sing is not None and plu is not None:
-                sing = sing[0]
-                plu = plu[0]
-            else:
-                raise WordNotSupportedError(
-                    'Pyinflect could not inflect {}. Please add word '
-                    'to inflection dict.'.format(noun))
-
-        return sing, plu
+        return self.inflection_service.inflect(noun)
 
 
 def clean_search_item(search_item: str) -> str:
@@ -229,6 +232,16 @@ def clean_search_item(search_item: str) -> str:
     return cleaned_item
 
 
+def _cleaned_items(sem_seq_to_found_items: dict) -> [str]:
+    '''
+    Return unique cleaned search items of all semantic sequences.
+    :param sem_seq_to_found_items: dict which map semantic sequence to found search items
+    :return: unique cleaned search items
+    '''
+    return list(dict.fromkeys(clean_search_item(search_item) for search_item
+                              in chain.from_iterable(sem_seq_to_found_items.values())))
+
+
 def remove_prefix_and_suffix(str_to_edit: str, pattern: str):
     '''
     Remove prefix and suffix of str_to_edit
@@ -264,15 +277,25 @@ class SearchEngineStrategy(CreationStrategy):
     '''
     Implementation of abstract class CreationStrategy. Use implementation of WebRequester
     and semantic_seq from DebugQualiaStructure to execute web requests, extract word, validate
-    and lemmatize them.
+    and lemmatize them. The search items are parsed in batches of parse_batch_size
+    by parse_processes processes. If parse_cache is passed, only search items which
+    are not cached are parsed. If extraction_window is SENTENCE or a number of tokens,
+    only the window around a match is parsed instead of the whole search item.
     '''
 
     def __init__(self, inflection_dict: dict, requester: WebRequester,
-                 metric: [OccurrenceMetric, WebBasedMetric]):
+                 metric: [OccurrenceMetric, WebBasedMetric],
+                 parse_batch_size: int = PARSE_BATCH_SIZE, parse_processes: int = 1,
+                 parse_cache: ParseCache = None, extraction_window=None):
 
         super().__init__(inflection_dict)
         self.search_engine = requester
         self.metric = metric
+        self.parse_batch_size = parse_batch_size
+        self.parse_processes = parse_processes
+        self.parse_cache = parse_cache
+        self.extraction_window = extraction_window
+        self.prefilter_counter = PrefilterCounter()
 
     def generate_qualia_structure(self, qualia_theorem: str) -> DebugQualiaStructure:
         '''
@@ -281,43 +304,332 @@ class SearchEngineStrategy(CreationStrategy):
         :return: created qebug qualia structure
         '''
 
+        structure = self.extract_qualia_structure(qualia_theorem)
+        self.rank_qualia_structure(structure)
+
+        return structure
+
+    def generate_qualia_structures(self, qualia_theorems: [str]) -> [(str, object)]:
+        '''
+        Generate debug qualia structures of all theorems. The search items of
+        all theorems are parsed together before every structure is ranked.
+        :param qualia_theorems: qualia theorems of batch
+        :return: list of (theorem, debug qualia structure or raised exception)
+        '''
+        results = self.extract_qualia_structures(qualia_theorems)
+        for idx, (qualia_theorem, structure) in enumerate(results):
+            if isinstance(structure, DebugQualiaStructure):
+                try:
+                    self.rank_qualia_structure(structure)
+                except (AllKeysReachLimit, SearchRequestError) as error:
+                    results[idx] = (qualia_theorem, error)
+        return results
+
+    def extract_qualia_structure(self, qualia_theorem: str) -> DebugQualiaStructure:
+        '''
+        Generate debug qualia structure with extracted but unranked qualia elements.
+        :param qualia_theorem: qualia theorem of created strategy
+        :return: created debug qualia structure
+        '''
+
+        [(_, structure)] = self.extract_qualia_structures([qualia_theorem])
+        if isinstance(structure, Exception):
+            raise structure
+        return structure
+
+    def extract_qualia_structures(self, qualia_theorems: [str]) -> [(str, object)]:
+        '''
+        Generate debug qualia structures of all theorems with extracted but
+        unranked qualia elements. The search items of all theorems are parsed
+        together, so the parser works on full batches.
+        :param qualia_theorems: qualia theorems of batch
+        :return: list of (theorem, debug qualia structure or raised exception)
+        '''
+        theorem_to_found_items = []
+        for qualia_theorem in qualia_theorems:
+            try:
+                theorem_to_found_items.append((qualia_theorem, self.__prefilter_found_items(
+                    qualia_theorem, self.__search_for_all_patterns(qualia_theorem))))
+            except (AllKeysReachLimit, SearchRequestError, WordNotSupportedError) as error:
+                theorem_to_found_items.append((qualia_theorem, error))
+
+        found_items_of_theorems = [(qualia_theorem, found_items) for qualia_theorem, found_items
+                                   in theorem_to_found_items if isinstance(found_items, dict)]
+        if self.extraction_window is None:
+            theorem_to_matches = self.__match_search_items(found_items_of_theorems)
+        else:
+            theorem_to_matches = self.__match_windows(found_items_of_theorems)
+
+        return [(qualia_theorem, found_items if isinstance(found_items, Exception) else
+                 self.__extract_from_found_items(qualia_theorem, found_items,
+                                                 theorem_to_matches[qualia_theorem]))
+                for qualia_theorem, found_items in theorem_to_found_items]
+
+    def parse_search_items(self, search_items: [str]) -> dict:
+        '''
+        Clean up and parse all unique search items in batches.
+        :param search_items: search items to parse
+        :return: dict which map cleaned search item to parsed Doc
+        '''
+        return self.__parse_texts(clean_search_item(search_item) for search_item in search_items)
+
+    def get_pattern_requests(self, qualia_theorem: str) -> [str]:
+        '''
+        Return the search requests of all semantic sequences for theorem.
+        :param qualia_theorem: qualia theorem
+        :return: search requests
+        '''
+        return [self.search_engine.pattern_request(semantic_seq, tense)
+                for semantic_seq, tense in self.__pattern_theorem_pairs(qualia_theorem)]
+
+    def get_metric_requests(self, structure: DebugQualiaStructure, metric=None) -> [str]:
+        '''
+        Return the search requests of the metric to rank the extracted
+        qualia elements of structure.
+        :param structure: debug qualia structure with extracted elements
+        :param metric: metric to rank elements, metric of strategy if None
+        :return: search requests
+        '''
+        metric = metric if metric is not None else self.metric
+        if not isinstance(metric, WebBasedMetric):
+            return []
+
+        qualia_elements = dict.fromkeys(chain.from_iterable(
+            chain.from_iterable(role.sem_seq_to_qe.values()) for role in structure.all_roles))
+        return list(chain.from_iterable(
+            metric.get_search_requests(qualia_element.str, structure.qualia_theorem)
+            for qualia_element in qualia_elements))
+
+    def rank_qualia_structure(self, structure: DebugQualiaStructure):
+        '''
+        Calc the metric values of the extracted qualia elements of structure and
+        sort them.
+        :param structure: debug qualia structure with extracted elements
+        :return: None
+        '''
+        self.__sort_qualia_elements(structure, self.metric)
+
+    def generate_qualia_structures_by_metrics(self, qualia_theorem: str,
+                                              name_to_metric: dict) -> dict:
+        '''
+        Generate debug qualia structure of theorem once and rank it by every metric.
+        :param qualia_theorem: qualia theorem of created structures
+        :param name_to_metric: dict which map name to metric
+        :return: dict which map name of metric to ranked debug qualia structure
+        '''
+        structure = self.extract_qualia_structure(qualia_theorem)
+        return self.rank_qualia_structure_by_metrics(structure, name_to_metric)
+
+    def rank_qualia_structure_by_metrics(self, structure: DebugQualiaStructure,
+                                         name_to_metric: dict) -> dict:
+        '''
+        Rank copies of the extracted structure by every metric. The union of
+        the search requests of all metrics is executed in one batch.
+        :param structure: debug qualia structure with extracted elements
+        :param name_to_metric: dict which map name to metric
+        :return: dict which map name of metric to ranked debug qualia structure
+        '''
+        self.search_engine.prefetch(list(chain.from_iterable(
+            self.get_metric_requests(structure, metric) for metric in name_to_metric.values())))
+
+        shared_seqs = {id(semantic_seq): semantic_seq for role in structure.all_roles
+                       for semantic_seq in role.get_all_pattern()}
+        name_to_structure = dict()
+        for name, metric in name_to_metric.items():
+            # deepcopy adds the copied objects to the memo, so every copy gets a fresh memo
+            ranked_structure = deepcopy(structure, dict(shared_seqs))
+            self.__sort_qualia_elements(ranked_structure, metric)
+            name_to_structure[name] = ranked_structure
+        return name_to_structure
+
+    def __parse_texts(self, texts: [str]) -> dict:
+        '''
+        Parse all unique texts in batches by using the parse cache if passed.
+        :param texts: texts to parse
+        :return: dict which map text to parsed Doc
+        '''
+        texts = list(dict.fromkeys(texts))
+        parse = parse_sequences if self.parse_cache is None else self.parse_cache.parse_all
+        return dict(zip(texts, parse(texts, self.parse_batch_size, self.parse_processes)))
+
+    def __match_search_items(self, found_items_of_theorems: [(str, dict)]) -> dict:
+        '''
+        Parse the whole search items of all theorems and find the matches of
+        the semantic sequences in the parsed search items.
+        :param found_items_of_theorems: list of (theorem, dict which map semantic
+        sequence to found search items)
+        :return: dict which map theorem to dict, which map cleaned search item to dict
+        of semantic sequence to list of (parsed Doc, indices of matches)
+        '''
+        text_to_doc = self.__parse_texts(chain.from_iterable(
+            _cleaned_items(found_items) for _, found_items in found_items_of_theorems))
+
+        theorem_to_matches = dict()
+        for qualia_theorem, found_items in found_items_of_theorems:
+            matcher = SequenceMatcher(self.__pattern_theorem_pairs(qualia_theorem))
+            theorem_to_matches[qualia_theorem] = {
+                text: {semantic_seq: [(text_to_doc[text], indices)] for semantic_seq, indices
+                       in matcher.find_matches(text_to_doc[text]).items()}
+                for text in _cleaned_items(found_items)}
+        return theorem_to_matches
+
+    def __match_windows(self, found_items_of_theorems: [(str, dict)]) -> dict:
+        '''
+        Find the matches of the semantic sequences in the tokenized search items
+        of all theorems and parse only the windows around the matches. If a window
+        is tokenized differently, the whole search item is parsed instead.
+        :param found_items_of_theorems: list of (theorem, dict which map semantic
+        sequence to found search items)
+        :return: dict which map theorem to dict, which map cleaned search item to dict
+        of semantic sequence to list of (parsed Doc, indices of matches)
+        '''
+        text_to_tokens = {text: get_lang_model().make_doc(text) for text in dict.fromkeys(
+            chain.from_iterable(_cleaned_items(found_items) for _, found_items
+                                in found_items_of_theorems))}
+
+        theorem_to_windows = dict()
+        for qualia_theorem, found_items in found_items_of_theorems:
+            matcher = SequenceMatcher(self.__pattern_theorem_pairs(qualia_theorem))
+            theorem_to_windows[qualia_theorem] = {
+                text: {semantic_seq: [(window_span(text_to_tokens[text], start, end,
+                                                   self.extraction_window), start, end)
+                                      for start, end in indices]
+                       for semantic_seq, indices
+                       in matcher.find_matches(text_to_tokens[text]).items()}
+                for text in _cleaned_items(found_items)}
+
+        window_to_doc = self.__parse_texts(
+            text_to_tokens[text][window_start:window_end].text
+            for text_to_windows in theorem_to_windows.values()
+            for text, sem_seq_to_windows in text_to_windows.items()
+            for windows in sem_seq_to_windows.values()
+            for (window_start, window_end), _, _ in windows)
+        text_to_doc = dict()
+
+        theorem_to_matches = dict()
+        for qualia_theorem, text_to_windows in theorem_to_windows.items():
+            theorem_to_matches[qualia_theorem] = dict()
+            for text, sem_seq_to_windows in text_to_windows.items():
+                tokens = text_to_tokens[text]
+                sem_seq_to_matches = dict()
+                for semantic_seq, windows in sem_seq_to_windows.items():
+                    sem_seq_to_matches[semantic_seq] = []
+                    for (window_start, window_end), start, end in windows:
+                        window_doc = window_to_doc[tokens[window_start:window_end].text]
+                        indices = map_to_window(tokens, window_start, window_doc, start, end)
+                        if indices is None:
+                            if text not in text_to_doc:
+                                text_to_doc.update(self.__parse_texts([text]))
+                            window_doc, indices = text_to_doc[text], (start, end)
+                        sem_seq_to_matches[semantic_seq].append((window_doc, [indices]))
+                theorem_to_matches[qualia_theorem][text] = sem_seq_to_matches
+        return theorem_to_matches
+
+    def __extract_from_found_items(self, qualia_theorem: str, sem_seq_to_found_items: dict,
+                                   text_to_matches: dict) -> DebugQualiaStructure:
+        '''
+        Generate debug qualia structure from the found items of all semantic sequences.
+        :param qualia_theorem: qualia theorem of created strategy
+        :param sem_seq_to_found_items: dict which map semantic sequence to found search items
+        :param text_to_matches: dict which map cleaned search item to dict of semantic
+        sequence to list of (parsed Doc, indices of matches)
+        :return: created debug qualia structure
+        '''
         structure = DebugQualiaStructure(qualia_theorem=qualia_theorem)
 
         for role in structure.all_roles:
             sem_seq_to_qe = dict()
             for semantic_seq in role.get_all_pattern():
                 sem_seq_to_qe[semantic_seq] = set()
-                lemma_to_result = self.__extract_lemmas_from_results(qualia_theorem, role,
-                                                                     semantic_seq)
+                lemma_to_result = self.__extract_lemmas_from_results(
+                    qualia_theorem, role, semantic_seq, sem_seq_to_found_items[semantic_seq],
+                    text_to_matches)
                 for lemma, sources in lemma_to_result.items():
                     qualia_element = QualiaElement(lemma, sources=sources)
                     sem_seq_to_qe[semantic_seq].add(qualia_element)
 
             role.sem_seq_to_qe = sem_seq_to_qe
 
-        self.__sort_qualia_elements(structure)
-
         return structure
 
+    def __search_for_all_patterns(self, qualia_theorem: str) -> dict:
+        '''
+        Execute the search requests of all semantic sequences of the theorem
+        in one batch, so a concurrent web requester can execute them at the
+        same time.
+        :param qualia_theorem: qualia theorem of structure to create
+        :return: dict which map semantic sequence to found search items
+        '''
+        pattern_theorem_pairs = self.__pattern_theorem_pairs(qualia_theorem)
+        found_items = self.search_engine.search_for_patterns(pattern_theorem_pairs)
+        return {semantic_seq: items for (semantic_seq, _), items
+                in zip(pattern_theorem_pairs, found_items)}
+
+    def __prefilter_found_items(self, qualia_theorem: str, sem_seq_to_found_items: dict) -> dict:
+        '''
+        Remove the search items, which can not match their semantic sequence,
+        before they are parsed. Count the skipped search items in prefilter_counter.
+        :param qualia_theorem: qualia theorem of structure to create
+        :param sem_seq_to_found_items: dict which map semantic sequence to found search items
+        :return: dict which map semantic sequence to search items which may match
+        '''
+        prefilter = AnchorPrefilter(self.__pattern_theorem_pairs(qualia_theorem))
+        text_to_anchors = dict()
+        filtered_items = dict()
+        for semantic_seq, found_items in sem_seq_to_found_items.items():
+            filtered_items[semantic_seq] = []
+            for search_item in found_items:
+                text = clean_search_item(search_item)
+                if text not in text_to_anchors:
+                    text_to_anchors[text] = prefilter.present_anchors(text)
+                if prefilter.may_match(semantic_seq, text_to_anchors[text]):
+                    filtered_items[semantic_seq].append(search_item)
+
+        num_pairs = sum(len(found_items) for found_items in sem_seq_to_found_items.values())
+        num_remaining_pairs = sum(len(found_items) for found_items in filtered_items.values())
+        num_remaining_items = len(_cleaned_items(filtered_items))
+        self.prefilter_counter.num_pairs += num_pairs
+        self.prefilter_counter.num_skipped_pairs += num_pairs - num_remaining_pairs
+        self.prefilter_counter.num_items += len(text_to_anchors)
+        self.prefilter_counter.num_skipped_items += len(text_to_anchors) - num_remaining_items
+        return filtered_items
+
+    def __pattern_theorem_pairs(self, qualia_theorem: str) -> [(SemanticSequence, str)]:
+        '''
+        Return all semantic sequences with the singular or plural of theorem used
+        for their search request.
+        :param qualia_theorem: qualia theorem
+        :return: list of (semantic_seq, inflected theorem) pairs
+        '''
+        sing, plu = self.inflect_sing_plural(qualia_theorem)
+        return [(semantic_seq, plu if semantic_seq.is_plural else sing)
+                for semantic_seq in chain.from_iterable(role_pattern for role_pattern, _
+                                                        in [FORMAL, CONSTITUTIVE,
+                                                            AGENTIVE, TELIC])]
+
     def __extract_lemmas_from_results(self, theorem: str, role: Role,
-                                      semantic_seq: SemanticSequence) -> dict:
+                                      semantic_seq: SemanticSequence,
+                                      found_items: [str], text_to_matches: dict) -> dict:
         '''
         Extract qualia elements from search results and return
         dict with lemmatize elements to search result.
         :param theorem: qualia theorem of created strategy
         :param role: Role of semantic seq
         :param semantic_seq: Provide executed search request and extraction pattern
+        :param found_items: search results of the search request of semantic_seq
+        :param text_to_matches: dict which map cleaned search item to dict of semantic
+        sequence to list of (parsed Doc, indices of matches)
         :return: None
         '''
-        sing, plu = self.inflect_sing_plural(theorem)
         lemma_to_result = dict()
 
-        tense = plu if semantic_seq.is_plural else sing
-        found_items = self.search_engine.search_for_patter(semantic_seq, tense)
         for search_item in found_items:
             try:
                 search_item = clean_search_item(search_item)
-                token_sequences = semantic_seq.extract_qualia_elements(tense, search_item)
+                token_sequences = list(chain.from_iterable(
+                    semantic_seq.extract_qualia_elements_of_matches(tokenized_seq, indices)
+                    for tokenized_seq, indices
+                    in text_to_matches[search_item].get(semantic_seq, [])))
                 for token_seq in token_sequences:
                     found_element = ' '.join([token.lemma_.strip() for token in token_seq]).lower()
 
@@ -332,42 +644,62 @@ class SearchEngineStrategy(CreationStrategy):
 
         return lemma_to_result
 
-    def __sort_qualia_elements(self, structure: DebugQualiaStructure):
+    def __sort_qualia_elements(self, structure: DebugQualiaStructure, metric):
         '''
         Calc the metric values for each qualia element and sort the elements
         according to metric value of each semantic sequence.
         :param structure: Qualia structure to create
+        :param metric: metric to rank elements
         :return: None
         '''
+        if isinstance(metric, WebBasedMetric):
+            self.__calc_web_based_metric_values(structure, metric)
+
         for role in structure.all_roles:
 
-            self.__calc_metric_values(role, structure)
+            if isinstance(metric, OccurrenceMetric):
+                self.__calc_occurrence_metric_values(role, metric)
+            elif not isinstance(metric, WebBasedMetric):
+                raise AttributeError('Metric is not an instance of a subclass of'
+                                     ' WebBasedMetric or OccurrenceMetric')
 
             for semantic_seq in role.sem_seq_to_qe:
                 role.sem_seq_to_qe[semantic_seq] = sorted(
                     role.sem_seq_to_qe[semantic_seq],
                     key=lambda d_qe: d_qe.metric_value, reverse=True)
 
-    def __calc_metric_values(self, role: Role, structure: DebugQualiaStructure):
+    def __calc_web_based_metric_values(self, structure: DebugQualiaStructure,
+                                       metric: WebBasedMetric):
+        '''
+        Calculate metric values for the qualia elements of all roles. The value of
+        a web based metric does not depend on the role, so the values of all
+        elements are calculated in one batch.
+        :param structure: Qualia structure to create
+        :param metric: metric to rank elements
+        :return: None
+        '''
+        qualia_elements = list(chain.from_iterable(
+            chain.from_iterable(role.sem_seq_to_qe.values()) for role in structure.all_roles))
+        unique_elements = list(dict.fromkeys(qualia_element.str
+                                             for qualia_element in qualia_elements))
+        metric_values = dict(zip(unique_elements,
+                                 metric.calc_metric_values(unique_elements,
+                                                           structure.qualia_theorem)))
+
+        for qualia_element in qualia_elements:
+            qualia_element.metric_value = metric_values[qualia_element.str]
+
+    def __calc_occurrence_metric_values(self, role: Role, metric: OccurrenceMetric):
         '''
         Calculate metric values for the qualia element of the a role.
         :param role: the role
-        :param structure: Qualia structure to create
+        :param metric: metric to rank elements
         :return: None
         '''
-        metric_values = dict()
-        for qualia_element in chain.from_iterable(role.sem_seq_to_qe.values()):
-
-            if qualia_element not in metric_values:
-                if isinstance(self.metric, WebBasedMetric):
-                    metric_value = self.metric.calc_metric_value(qualia_element.str,
-                                                                 structure.qualia_theorem)
-                elif isinstance(self.metric, OccurrenceMetric):
-                    metric_value = self.metric.calc_metric_value(qualia_element, role)
-                else:
-                    raise AttributeError('Metric is not an instance of a subclass of'
-                                         ' WebBasedMetric or OccurrenceMetric')
-
-                metric_values[qualia_element] = metric_value
+        qualia_elements = list(chain.from_iterable(role.sem_seq_to_qe.values()))
+        unique_elements = list(dict.fromkeys(qualia_elements))
+        metric_values = dict(zip(unique_elements,
+                                 metric.calc_metric_values(unique_elements, role)))
 
+        for qualia_element in qualia_elements:
             qualia_element.metric_value = metric_values[qualia_element]
@@ -0,0 +1,121 @@
+'''
+Provide QueryPlanner, which plans all search requests of a batch of qualia
+theorems before they are executed. Duplicated requests of the batch are
+collapsed and the uncached requests are prefetched in one scheduled pass
+of the web requester. QueryPlan reports the number of billable requests.
+'''
+from src.qualia_structure import SearchEngineStrategy, DebugQualiaStructure, \
+    WordNotSupportedError
+from src.requester import AllKeysReachLimit, SearchRequestError
+
+
+class QueryPlan:
+    '''
+    Planned search requests of a batch. requests contains all requests
+    including duplicates, unique the collapsed requests and uncached the
+    requests, which have to be executed by the api.
+    '''
+
+    def __init__(self, name: str, requests: [str], uncached: [str]):
+        self.name = name
+        self.requests = requests
+        self.unique = list(dict.fromkeys(requests))
+        self.uncached = uncached
+
+    def __repr__(self):
+        return '{}: {} requests, {} unique, {} billable'.format(self.name, len(self.requests),
+                                                                 len(self.unique),
+                                                                 len(self.uncached))
+
+
+class QueryPlanner:
+    '''
+    Plan and prefetch the search requests of a batch of qualia theorems for
+    a SearchEngineStrategy. The requests of the semantic sequences are
+    executed first. After the extraction of all theorems, the requests of
+    the metric are executed. If name_to_metric is passed, the union of the
+    requests of all metrics is executed and every structure is ranked by
+    each metric.
+    '''
+
+    def __init__(self, strategy: SearchEngineStrategy, report=print, name_to_metric: dict = None):
+        self.strategy = strategy
+        self.requester = strategy.search_engine
+        self.report = report
+        self.name_to_metric = name_to_metric
+
+    def plan_pattern_requests(self, qualia_theorems: [str]) -> QueryPlan:
+        '''
+        Plan search requests of the semantic sequences of all theorems. Theorems
+        which can not be inflected are skipped.
+        :param qualia_theorems: qualia theorems of batch
+        :return: plan of requests
+        '''
+        requests = []
+        for qualia_theorem in qualia_theorems:
+            try:
+                requests += self.strategy.get_pattern_requests(qualia_theorem)
+            except WordNotSupportedError:
+                pass
+        return QueryPlan('Pattern requests', requests, self.requester.uncached_requests(requests))
+
+    def plan_metric_requests(self, structures: [DebugQualiaStructure]) -> QueryPlan:
+        '''
+        Plan search requests of the metric for the extracted elements of all
+        structures.
+        :param structures: debug qualia structures with extracted elements
+        :return: plan of requests
+        '''
+        metrics = self.name_to_metric.values() if self.name_to_metric is not None \
+            else [self.strategy.metric]
+        requests = []
+        for structure in structures:
+            for metric in metrics:
+                requests += self.strategy.get_metric_requests(structure, metric)
+        return QueryPlan('Metric requests', requests, self.requester.uncached_requests(requests))
+
+    def execute(self, plan: QueryPlan):
+        '''
+        Execute the uncached requests of plan in one batch. If the limit of all
+        keys is reached, the remaining requests are executed by the theorems
+        which need them and fail there.
+        :param plan: plan of requests
+        :return: None
+        '''
+        self.report(plan)
+        try:
+            self.requester.prefetch(plan.uncached)
+        except AllKeysReachLimit:
+            self.report('{}: maximal requests of all keys is reached'.format(plan.name))
+        except SearchRequestError as error:
+            self.report('{}: {}'.format(plan.name, error))
+
+    def generate_qualia_structures(self, qualia_theorems: [str]) -> [(str, object)]:
+        '''
+        Generate debug qualia structures of all theorems by planning and
+        prefetching the search requests of the whole batch.
+        :param qualia_theorems: qualia theorems of batch
+        :return: list of (theorem, debug qualia structure or raised exception). If
+        name_to_metric is passed, dict which map name of metric to structure
+        instead of structure
+        '''
+        self.execute(self.plan_pattern_requests(qualia_theorems))
+
+        results = self.strategy.extract_qualia_structures(qualia_theorems)
+
+        self.execute(self.plan_metric_requests([structure for _, structure in results
+                                                if isinstance(structure, DebugQualiaStructure)]))
+
+        for idx, (qualia_theorem, structure) in enumerate(results):
+            if isinstance(structure, DebugQualiaStructure):
+                try:
+                    if self.name_to_metric is not None:
+                        results[idx] = (qualia_theorem,
+                                        self.strategy.rank_qualia_structure_by_metrics(
+                                            structure, self.name_to_metric))
+                    else:
+                        self.strategy.rank_qualia_structure(structure)
+                except (AllKeysReachLimit, SearchRequestError) as error:
+                    results[idx] = (qualia_theorem, error)
+
+        return results
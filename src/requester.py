@@ -1,16 +1,25 @@
 '''
 Provide abstract class WebRequester for a general api to execute
 textual search request and implementation for google json api.
+AsyncGoogleRequester executes multiple requests concurrently.
 Method read_key_file will load keys from keyfile.
 '''
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from pickle import dump, load, HIGHEST_PROTOCOL
-from os.path import exists
+from time import monotonic, sleep
+
 from googleapiclient.discovery import build, HttpError
-from src.spacy_utils import PatternNotFoundException
 from src.semantic_sequence import SemanticSequence
+from src.search_cache import SearchCache, SqliteSearchCache
+from src.key_pool import KeyPool
 
-SEARCH_REQ_FOLDER = '.searchRequests'  # Savefolder of search results
+SEARCH_REQ_FOLDER = '.searchRequests'  # Former savefolder of search results
+QUOTA_STATUS = [403, 429]  # Http status of requests rejected because of the quota
+MAX_RETRIES = 3  # Retries of a request after a server or connection error
+RETRY_DELAY = 1  # Seconds before the first retry, doubled for every further retry
 
 
 class AllKeysReachLimit(Exception):
@@ -19,9 +28,18 @@ class AllKeysReachLimit(Exception):
     '''
 
 
+class SearchRequestError(Exception):
+    '''
+    Exception for search requests, which are rejected by the api for another
+    reason than the quota or fail after all retries.
+    '''
+
+
 class WebRequester:
     '''
-    Abstract class for a textual search api.
+    Abstract class for a textual search api. The methods for multiple
+    requests execute the requests one after another and can be
+    overwritten by implementations with concurrent execution.
     '''
 
     def search_for_patter(self, pattern: SemanticSequence, qualia_theorem: str) -> [str]:
@@ -34,6 +52,47 @@ class WebRequester:
         '''
         raise NotImplementedError('Abstract Class WebRequester has been initiated')
 
+    def search_for_patterns(self, pattern_theorem_pairs: [(SemanticSequence, str)]) -> [[str]]:
+        '''
+        Execute search_for_patter for every (semantic_seq, theorem) pair.
+        :param pattern_theorem_pairs: list of (semantic_seq, theorem) pairs
+        :return: search results for each pair in same order
+        '''
+        return [self.search_for_patter(pattern, qualia_theorem)
+                for pattern, qualia_theorem in pattern_theorem_pairs]
+
+    def pattern_request(self, pattern: SemanticSequence, qualia_theorem: str) -> str:
+        '''
+        Return search request for clue of semantic_seq with theorem.
+        :param pattern: semantic_seq with clue to search
+        :param qualia_theorem: theorem that will be placed in clue of semantic_seq
+        :return: search request
+        '''
+        raise NotImplementedError('Abstract Class WebRequester has been initiated')
+
+    def uncached_requests(self, search_requests: [str]) -> [str]:
+        '''
+        Return unique search requests, which are not cached and would be
+        executed by the api.
+        :param search_requests: list of requests
+        :return: unique uncached requests
+        '''
+        return list(dict.fromkeys(search_requests))
+
+    def prefetch(self, search_requests: [str]):
+        '''
+        Execute uncached search requests in one batch, so later calls are
+        answered by the cache. Requesters without cache do nothing.
+        :param search_requests: list of requests
+        :return: None
+        '''
+
+    def close(self):
+        '''
+        Release the resources of the api. Requesters without resources do nothing.
+        :return: None
+        '''
+
     def num_results(self, search_request: str) -> int:
         '''
         Return number of results for search_request.
@@ -42,6 +101,32 @@ class WebRequester:
         '''
         raise NotImplementedError('Abstract Class WebRequester has been initiated')
 
+    def num_results_of_all(self, search_requests: [str]) -> [int]:
+        '''
+        Return number of results for each search request.
+        :param search_requests: list of requests
+        :return: number of results for each request in same order
+        '''
+        return [self.num_results(search_request) for search_request in search_requests]
+
+    def near_request(self, word_1: str, word_2: str) -> str:
+        '''
+        Return search request for results in which word_1 is near to word_2.
+        :param word_1: first word
+        :param word_2: second word
+        :return: search request
+        '''
+        raise NotImplementedError('Abstract Class WebRequester has been initiated')
+
+    def and_request(self, word_1: str, word_2: str) -> str:
+        '''
+        Return search request for results containing word_1 and word_2.
+        :param word_1: first word
+        :param word_2: second word
+        :return: search request
+        '''
+        raise NotImplementedError('Abstract Class WebRequester has been initiated')
+
     def num_results_near(self, word_1: str, word_2: str) -> int:
         '''
         Return number of results in which word_1 is near to word_2.
@@ -49,7 +134,7 @@ class WebRequester:
         :param word_2: second word
         :return: number of results for word_1 near word_2
         '''
-        raise NotImplementedError('Abstract Class WebRequester has been initiated')
+        return self.num_results(self.near_request(word_1, word_2))
 
     def num_search_and(self, word_1: str, word_2: str) -> int:
         '''
@@ -58,88 +143,312 @@ class WebRequester:
         :param word_2: second word
         :return: number of results containing word_1 and word_2
         '''
-        raise NotImplementedError('Abstract Class WebRequester has been initiated')
+        return self.num_results(self.and_request(word_1, word_2))
+
+
+def snippets_of_result(res: dict) -> [str]:
+    '''
+    Return snippets of all items of a search result.
+    :param res: search result of google json api
+    :return: snippets of search result
+    '''
+    found_items = []
+    if 'items' in res.keys():
+        for item in res['items']:
+            for column in ['snippet']:
+                if column in item:
+                    found_items.append(item[column])
+    return found_items
+
+
+def total_results(res: dict) -> int:
+    '''
+    Return total number of results of a search result.
+    :param res: search result of google json api
+    :return: number of results
+    '''
+    return int(res['searchInformation']['totalResults'])
 
 
 class GoogleRequester(WebRequester):
     '''
-    Implementation for the google json api. keys is a list of
-    (API key, Custom Search ID) tuples. key_idx reference current
-    key pair in list.
+    Implementation for the google json api. The requests are scheduled
+    over the (API key, Custom Search ID) pairs by key_pool. Executed
+    search requests are stored in cache. A request which fails because of
+    a server or connection error is retried max_retries times with the same
+    key, the first time after retry_delay seconds.
     '''
 
-    def __init__(self, keys: [(str, str)]):
-        self.keys = keys
-        self.key_idx = 0
-        self.api_key = self.keys[self.key_idx][0]
-        self.cse_key = self.keys[self.key_idx][1]
-        self.service = build('customsearch', 'v1', developerKey=self.api_key)
+    def __init__(self, keys: [(str, str)], cache: SearchCache = None, key_pool: KeyPool = None,
+                 max_retries: int = MAX_RETRIES, retry_delay: float = RETRY_DELAY):
+        self.cache = cache if cache is not None else SqliteSearchCache()
+        self.key_pool = key_pool if key_pool is not None else KeyPool(keys)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.thread_local = threading.local()
 
     def search_for_patter(self, pattern: SemanticSequence, qualia_theorem: str) -> [str]:
-        search_string = "\"{}\"".format(pattern.get_search_requests(qualia_theorem))
-        res = self._get_search_result(search_string)
+        return self.search_for_patterns([(pattern, qualia_theorem)])[0]
+
+    def search_for_patterns(self, pattern_theorem_pairs: [(SemanticSequence, str)]) -> [[str]]:
+        results = self._get_search_results([self.pattern_request(pattern, qualia_theorem)
+                                            for pattern, qualia_theorem
+                                            in pattern_theorem_pairs])
+        return [snippets_of_result(res) for res in results]
+
+    def pattern_request(self, pattern: SemanticSequence, qualia_theorem: str) -> str:
+        return "\"{}\"".format(pattern.get_search_requests(qualia_theorem))
+
+    def uncached_requests(self, search_requests: [str]) -> [str]:
+        return [search_request for search_request in dict.fromkeys(search_requests)
+                if search_request not in self.cache]
 
-        found_items = []
-        if 'items' in res.keys():
-            for item in res['items']:
-                for column in ['snippet']:
-                    if column in item:
-                        found_items.append(item[column])
-        return found_items
+    def prefetch(self, search_requests: [str]):
+        self._get_search_results(self.uncached_requests(search_requests))
 
     def num_results(self, search_request: str):
-        res = self._get_search_result(search_request)
-        hits = int(res['searchInformation']['totalResults'])
-        return hits
+        return self.num_results_of_all([search_request])[0]
 
-    def num_results_near(self, word_1: str, word_2: str):
-        return self.num_results('{} AROUND(10) {}'.format(word_1, word_2))
+    def num_results_of_all(self, search_requests: [str]) -> [int]:
+        return [total_results(res) for res in self._get_search_results(search_requests)]
 
-    def num_search_and(self, word_1: str, word_2: str):
-        return self.num_results('{} {}'.format(word_1, word_2))
+    def near_request(self, word_1: str, word_2: str) -> str:
+        return '{} AROUND(10) {}'.format(word_1, word_2)
+
+    def and_request(self, word_1: str, word_2: str) -> str:
+        return '{} {}'.format(word_1, word_2)
+
+    def _get_search_results(self, search_strings: [str]) -> [dict]:
+        '''
+        Return search results of all search requests.
+        :param search_strings: search requests
+        :raise AllKeysReachLimit If all combination reach the daily limit of 100
+        :raise SearchRequestError If a request is rejected or fails after all retries
+        :return: search results in same order
+        '''
+        return [self._get_search_result(search_string) for search_string in search_strings]
 
     def _get_search_result(self, search_string: str):
         '''
-        Will load search request from SEARCH_REQ_FOLDER if executed in the past
-        or execute search request and store results to SEARCH_REQ_FOLDER.
+        Will load search request from cache if executed in the past
+        or execute search request and store results to cache.
         Automatically use next key from keyfile, if daily limit is reached.
         :param search_string: search request
         :raise AllKeysReachLimit If all combination reach the daily limit of 100
+        :raise SearchRequestError If a request is rejected or fails after all retries
         :return: search results.
         '''
 
-        path = SEARCH_REQ_FOLDER + '/' + search_string
+        res = self.cache.get(search_string)
 
-        if exists(path):
-            with open(path, 'rb') as file:
-                res = load(file)
-        else:
-            res = None
-            while res is None:
-                try:
-                    res = self.service.cse().list(q=search_string, cx=self.cse_key).execute()
-                    with open(path, 'wb') as output:
-                        dump(res, output, HIGHEST_PROTOCOL)
+        if res is None:
+            res = self._execute_request(search_string)
+            self.cache.put(search_string, res)
+        return res
 
-                except HttpError as http_error:
-                    self._change_key(http_error)
+    def _execute_request(self, search_string: str) -> dict:
+        '''
+        Execute search request with the next key of key_pool. If the api
+        rejects a key because of its quota, the key is marked as exhausted
+        and the next key is used.
+        :param search_string: search request
+        :raise AllKeysReachLimit If all keys reach their daily limit
+        :raise SearchRequestError If the api rejects the request or it fails
+        after all retries
+        :return: search results
+        '''
+        res = None
+        while res is None:
+            key = self.key_pool.acquire()
+            if key is None:
+                raise AllKeysReachLimit('All keys reached the daily limit')
+            api_key, cse_key = key
+            try:
+                res = self.__execute_with_retries(search_string, api_key, cse_key)
+            except HttpError as http_error:
+                if http_error.resp.status not in QUOTA_STATUS:
+                    raise SearchRequestError('Search request {} failed with status {}'
+                                             .format(search_string, http_error.resp.status)) \
+                        from http_error
+                self.key_pool.mark_exhausted(api_key)
         return res
 
-    def _change_key(self, http_error: HttpError):
+    def __execute_with_retries(self, search_string: str, api_key: str, cse_key: str) -> dict:
+        '''
+        Execute search request with key and retry it after server errors and
+        connection errors with exponential backoff.
+        :param search_string: search request
+        :param api_key: api key
+        :param cse_key: custom search id
+        :raise HttpError If the api rejects the request
+        :raise SearchRequestError If the request fails after all retries
+        :return: search results
+        '''
+        delay = self.retry_delay
+        for retry in range(self.max_retries + 1):
+            try:
+                return self._get_service(api_key).cse().list(q=search_string,
+                                                             cx=cse_key).execute()
+            except HttpError as http_error:
+                if http_error.resp.status < 500:
+                    raise
+                error = http_error
+            except OSError as os_error:
+                error = os_error
+            if retry < self.max_retries:
+                sleep(delay)
+                delay *= 2
+        raise SearchRequestError('Search request {} failed after {} retries: {!r}'
+                                 .format(search_string, self.max_retries, error)) from error
+
+    def _get_service(self, api_key: str):
+        '''
+        Return api client of current thread for api key. The client of the
+        google api is not thread safe, so every thread builds its own client
+        once per key.
+        :param api_key: api key
+        :return: api client
+        '''
+        services = self.thread_local.__dict__.setdefault('services', {})
+        if api_key not in services:
+            services[api_key] = build('customsearch', 'v1', developerKey=api_key)
+        return services[api_key]
+
+
+class RateLimiter:
+    '''
+    Limit the start of coroutines to requests_per_second. If
+    requests_per_second is None, no limit is applied. Must be created
+    inside of the running event loop.
+    '''
+
+    def __init__(self, requests_per_second: float = None):
+        self.interval = 1 / requests_per_second if requests_per_second else 0
+        self.next_start = monotonic()
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
         '''
-        Increase key_idx to use next key.
-        :param http_error: raised by google api client
-        :raise AllKeysReachLimit if all keys reached limit
+        Wait until the next request is allowed to start.
         :return: None
         '''
+        if self.interval == 0:
+            return
+        async with self.lock:
+            delay = self.next_start - monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_start = max(self.next_start, monotonic()) + self.interval
 
-        self.key_idx += 1
-        if self.key_idx > len(self.keys) - 1:
-            raise AllKeysReachLimit(http_error)
 
-        self.api_key = self.keys[self.key_idx][0]
-        self.cse_key = self.keys[self.key_idx][1]
-        self.service = build('customsearch', 'v1', developerKey=self.api_key)
+class AsyncGoogleRequester(GoogleRequester):
+    '''
+    Implementation for the google json api, which executes the uncached
+    requests of a batch concurrently by using asyncio. At most
+    max_in_flight requests are executed at the same time and optionally
+    at most requests_per_second requests are started per second. If a
+    request fails, all pending requests of the batch are cancelled. The
+    threads of the blocking api clients are kept until close is called.
+    '''
+
+    def __init__(self, keys: [(str, str)], cache: SearchCache = None, key_pool: KeyPool = None,
+                 max_in_flight: int = 8, requests_per_second: float = None,
+                 max_retries: int = MAX_RETRIES, retry_delay: float = RETRY_DELAY):
+        super().__init__(keys, cache, key_pool, max_retries, retry_delay)
+        if max_in_flight < 1:
+            raise AttributeError('max_in_flight must be at least 1')
+        self.max_in_flight = max_in_flight
+        self.requests_per_second = requests_per_second
+        self.executor = None
+        self.executor_pid = None
+
+    def close(self):
+        '''
+        Shut down the threads of the api clients.
+        :return: None
+        '''
+        if self.executor is not None and self.executor_pid == os.getpid():
+            self.executor.shutdown()
+        self.executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        '''
+        Return executor of the blocking api clients. The threads are reused
+        by all batches, so every thread builds its clients only once. A forked
+        process does not inherit the threads and creates its own executor.
+        :return: executor of current process
+        '''
+        if self.executor is None or self.executor_pid != os.getpid():
+            self.executor = ThreadPoolExecutor(self.max_in_flight)
+            self.executor_pid = os.getpid()
+        return self.executor
+
+    def _get_search_results(self, search_strings: [str]) -> [dict]:
+        '''
+        Return search results of all search requests by running
+        get_search_results_async in a new event loop. Coroutines must await
+        get_search_results_async instead or call this method in an executor,
+        like QualiaServer does.
+        :param search_strings: search requests
+        :raise RuntimeError If called in a thread with a running event loop
+        :return: search results in same order
+        '''
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.get_search_results_async(search_strings))
+        raise RuntimeError('AsyncGoogleRequester can not execute requests in a running event '
+                           'loop, await get_search_results_async instead')
+
+    async def get_search_results_async(self, search_strings: [str]) -> [dict]:
+        '''
+        Coroutine to return search results of all search requests. Cached
+        results are loaded and uncached requests are executed concurrently.
+        :param search_strings: search requests
+        :raise AllKeysReachLimit If all combination reach the daily limit of 100
+        :raise SearchRequestError If a request is rejected or fails after all retries
+        :return: search results in same order
+        '''
+        results = {search_string: self.cache.get(search_string)
+                   for search_string in dict.fromkeys(search_strings)}
+        uncached = [search_string for search_string, res in results.items() if res is None]
+
+        if uncached:
+            semaphore = asyncio.Semaphore(self.max_in_flight)
+            rate_limiter = RateLimiter(self.requests_per_second)
+            executor = self._get_executor()
+            tasks = [asyncio.ensure_future(self._execute_limited(search_string, semaphore,
+                                                                 rate_limiter, executor))
+                     for search_string in uncached]
+            try:
+                for search_string, res in zip(uncached, await asyncio.gather(*tasks)):
+                    results[search_string] = res
+            finally:
+                # Cancelling a task also cancels its request, if it is not started yet
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        return [results[search_string] for search_string in search_strings]
+
+    async def _execute_limited(self, search_string: str, semaphore: asyncio.Semaphore,
+                               rate_limiter: RateLimiter, executor: ThreadPoolExecutor) -> dict:
+        '''
+        Execute search request in executor, if semaphore and rate_limiter allow
+        it and store result in cache.
+        :param search_string: search request
+        :param semaphore: limit of concurrent requests
+        :param rate_limiter: limit of requests per second
+        :param executor: executor of the blocking api client
+        :return: search result
+        '''
+        async with semaphore:
+            await rate_limiter.wait()
+            res = await asyncio.get_event_loop().run_in_executor(executor,
+                                                                 self._execute_request,
+                                                                 search_string)
+        self.cache.put(search_string, res)
+        return res
 
 
 def read_key_file(filepath: Path) -> [(str, str)]:
@@ -0,0 +1,216 @@
+'''
+Provide abstract class SearchCache for a general storage of executed search
+requests and the default implementation SqliteSearchCache, which stores all
+compressed results in one indexed sqlite file. Method migrate_pickle_folder
+imports the results of the former one pickle per request folder.
+'''
+import zlib
+from hashlib import sha256
+from pathlib import Path
+from pickle import dumps, load, loads, HIGHEST_PROTOCOL, UnpicklingError
+from threading import RLock
+from time import time
+
+from src.sqlite_utils import ProcessConnection
+
+SEARCH_CACHE_FILE = '.searchRequests.db'  # Default file of the sqlite cache
+MIGRATED_SUFFIX = '.migrated'  # Suffix of a pickle folder after migration
+TOUCH_FLUSH_LIMIT = 256  # Number of buffered access times before write
+MIGRATION_BATCH_SIZE = 1000  # Number of pickles imported per transaction
+
+
+def normalize_query(search_string: str) -> str:
+    '''
+    Normalize search request by removing leading, trailing and
+    repeated whitespaces.
+    :param search_string: search request
+    :return: normalized search request
+    '''
+    return ' '.join(search_string.split())
+
+
+def query_key(search_string: str) -> str:
+    '''
+    Calculate cache key of search request as hash of the normalized request.
+    :param search_string: search request
+    :return: hex digest of normalized request
+    '''
+    return sha256(normalize_query(search_string).encode('utf-8')).hexdigest()
+
+
+class SearchCache:
+    '''
+    Abstract class for a storage of search results.
+    '''
+
+    def get(self, search_string: str):
+        '''
+        Return stored result of search request.
+        :param search_string: search request
+        :return: stored result or None if request is not stored
+        '''
+        raise NotImplementedError('Abstract Class SearchCache has been initiated')
+
+    def put(self, search_string: str, result):
+        '''
+        Store result of search request.
+        :param search_string: search request
+        :param result: result of the search request
+        :return: None
+        '''
+        raise NotImplementedError('Abstract Class SearchCache has been initiated')
+
+    def put_many(self, items: [(str, object)]):
+        '''
+        Store results of multiple search requests.
+        :param items: list of (search request, result) pairs
+        :return: None
+        '''
+        for search_string, result in items:
+            self.put(search_string, result)
+
+    def __contains__(self, search_string: str) -> bool:
+        return self.get(search_string) is not None
+
+    def close(self):
+        '''
+        Release resources of the cache.
+        :return: None
+        '''
+
+
+class SqliteSearchCache(SearchCache):
+    '''
+    Implementation of SearchCache using a single sqlite file. Results are
+    pickled, compressed and stored by the hash of the normalized request.
+    Entries older than ttl seconds are ignored and removed. If max_entries
+    is set, least recently used entries are evicted.
+    '''
+
+    def __init__(self, path: str = SEARCH_CACHE_FILE, ttl: float = None,
+                 max_entries: int = None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = RLock()
+        self.touched = {}
+        self.connection = ProcessConnection(path, timeout=30, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS results ('
+                                'key TEXT PRIMARY KEY, query TEXT, value BLOB, '
+                                'created REAL, accessed REAL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS results_accessed '
+                                'ON results (accessed)')
+        self.connection.commit()
+        self.num_entries = self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def get(self, search_string: str):
+        key = query_key(search_string)
+        with self.lock:
+            row = self.connection.execute('SELECT value, created FROM results WHERE key = ?',
+                                          (key,)).fetchone()
+            if row is None:
+                return None
+
+            value, created = row
+            now = time()
+            if self.ttl is not None and created + self.ttl < now:
+                self.connection.execute('DELETE FROM results WHERE key = ?', (key,))
+                self.connection.commit()
+                self.num_entries -= 1
+                return None
+
+            self.touched[key] = now
+            if len(self.touched) >= TOUCH_FLUSH_LIMIT:
+                self._flush_touched()
+
+        return loads(zlib.decompress(value))
+
+    def __contains__(self, search_string: str) -> bool:
+        with self.lock:
+            row = self.connection.execute('SELECT created FROM results WHERE key = ?',
+                                          (query_key(search_string),)).fetchone()
+        return row is not None and (self.ttl is None or row[0] + self.ttl >= time())
+
+    def put(self, search_string: str, result):
+        self.put_many([(search_string, result)])
+
+    def put_many(self, items: [(str, object)]):
+        now = time()
+        with self.lock:
+            for search_string, result in items:
+                key = query_key(search_string)
+                value = zlib.compress(dumps(result, HIGHEST_PROTOCOL))
+                exists = self.connection.execute('SELECT 1 FROM results WHERE key = ?',
+                                                 (key,)).fetchone() is not None
+                self.connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                                        (key, normalize_query(search_string), value, now, now))
+                self.touched.pop(key, None)
+                if not exists:
+                    self.num_entries += 1
+            self._evict()
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self._flush_touched()
+            self.connection.close()
+
+    def _flush_touched(self):
+        '''
+        Write buffered access times used for least recently used eviction.
+        :return: None
+        '''
+        if self.touched:
+            self.connection.executemany('UPDATE results SET accessed = ? WHERE key = ?',
+                                        [(accessed, key) for key, accessed
+                                         in self.touched.items()])
+            self.connection.commit()
+            self.touched = {}
+
+    def _evict(self):
+        '''
+        Remove least recently used entries if more than max_entries are stored.
+        :return: None
+        '''
+        if self.max_entries is None or self.num_entries <= self.max_entries:
+            return
+
+        self._flush_touched()
+        surplus = self.num_entries - self.max_entries
+        self.connection.execute('DELETE FROM results WHERE key IN (SELECT key FROM results '
+                                'ORDER BY accessed LIMIT ?)', (surplus,))
+        self.num_entries -= surplus
+
+
+def migrate_pickle_folder(folder: str, cache: SearchCache) -> int:
+    '''
+    Import all pickled search results of folder into cache. The filename of a
+    pickle is the executed search request. Afterwards the folder is renamed
+    by appending MIGRATED_SUFFIX, so the migration is only executed once.
+    :param folder: folder with one pickle per search request
+    :param cache: cache to fill
+    :return: number of migrated search results
+    '''
+    folder = Path(folder)
+    if not folder.is_dir():
+        return 0
+
+    num_migrated = 0
+    items = []
+    for file_path in folder.iterdir():
+        if not file_path.is_file():
+            continue
+        try:
+            with open(file_path, 'rb') as file:
+                items.append((file_path.name, load(file)))
+        except (UnpicklingError, EOFError, OSError):
+            continue
+        if len(items) >= MIGRATION_BATCH_SIZE:
+            cache.put_many(items)
+            num_migrated += len(items)
+            items = []
+
+    cache.put_many(items)
+    num_migrated += len(items)
+    folder.rename(folder.with_name(folder.name + MIGRATED_SUFFIX))
+    return num_migrated
@@ -2,10 +2,11 @@ import re
 
 from spacy.tokens import Token, Doc
 
-from src.spacy_utils import LANG_MODEL
+from src.spacy_utils import get_lang_model
 
 VOWELS = ['a', 'e', 'i', 'o', 'u']
 MASK = '[MASK]'
+WILDCARD = {'OP': '*'}  # Token pattern which matches any number of tokens
 
 
 def to_bert_seq(sentence: str, qualia_theorem: str):
@@ -25,6 +26,29 @@ def to_bert_seq(sentence: str, qualia_theorem: str):
     return sentence
 
 
+def token_pattern(words: str, open_start: bool = True, open_end: bool = True) -> [dict]:
+    '''
+    Convert whitespace separated words to a token pattern of the spaCy Matcher,
+    which matches the lowercase tokens. Like a regular expression on the whitespace
+    separated tokens, the first word matches the end of a token if open_start and
+    the last word the start of a token if open_end.
+    :param words: whitespace separated words
+    :param open_start: first word may be the end of a token
+    :param open_end: last word may be the start of a token
+    :return: list of token patterns
+    '''
+    words = words.lower().split()
+    if len(words) == 1 and open_start and open_end:
+        return [{'LOWER': {'REGEX': re.escape(words[0])}}]
+
+    pattern = [{'LOWER': word} for word in words]
+    if open_start:
+        pattern[0] = {'LOWER': {'REGEX': re.escape(words[0]) + '$'}}
+    if open_end:
+        pattern[-1] = {'LOWER': {'REGEX': '^' + re.escape(words[-1])}}
+    return pattern
+
+
 def _calc_start_end_indices_of_matches(regex: str, word_seq: str):
     '''
     Calculate list of (start_idx, end_idx) of regex in sequence
@@ -57,6 +81,15 @@ class SemanticSequence:
 
         raise AssertionError('Abstract Class SemanticSequence has been initiated')
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        '''
+        Generate token patterns of the spaCy Matcher including qualia theorem,
+        which match the same token sequences as the regular expression.
+        :param qualia_theorem: will be placed into the patterns
+        :return: list of alternative patterns
+        '''
+        raise AssertionError('Abstract Class SemanticSequence has been initiated')
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         '''
         Generate search request for theorem sequence including qualia theorem.
@@ -93,14 +126,33 @@ class SemanticSequence:
         :return: extracted qualia elements
         '''
 
-        regex = self.get_regular_expression(qualia_theorem)
+        return self.extract_qualia_elements_of_doc(qualia_theorem, get_lang_model()(sequence))
 
-        tokenized_seq = LANG_MODEL(sequence)
+    def extract_qualia_elements_of_doc(self, qualia_theorem: str, tokenized_seq: Doc) -> [Token]:
+        '''
+        Extract qualia elements from an already parsed sequence, e.g. parsed
+        in a batch by parse_sequences.
+        :param qualia_theorem: qualia theorem for that elements are collected
+        :param tokenized_seq: parsed sequence used for extraction
+        :return: extracted qualia elements
+        '''
+
+        regex = self.get_regular_expression(qualia_theorem)
 
         sequence_token_ws_sep = ' '.join([x.orth_ for x in tokenized_seq]).lower()
 
         indices = _calc_start_end_indices_of_matches(regex, sequence_token_ws_sep)
 
+        return self.extract_qualia_elements_of_matches(tokenized_seq, indices)
+
+    def extract_qualia_elements_of_matches(self, tokenized_seq: Doc,
+                                           indices: [(int, int)]) -> [Token]:
+        '''
+        Extract qualia elements of the matches of the semantic sequence.
+        :param tokenized_seq: parsed sequence used for extraction
+        :param indices: list of (start_idx, end_idx) of the first and last token of matches
+        :return: extracted qualia elements
+        '''
         qualia_elements = []
 
         for (start, end) in indices:
@@ -0,0 +1,64 @@
+'''
+Provide SequenceMatcher, which compiles the token patterns of all semantic
+sequences of a qualia theorem into one spaCy Matcher. Every parsed sequence
+is scanned once for all semantic sequences instead of once per regular
+expression. The matches are selected like re.finditer selects the matches of
+the regular expressions: leftmost and non overlapping, the shortest match for
+patterns with a wildcard and the longest match otherwise.
+'''
+from collections import defaultdict
+
+from spacy.matcher import Matcher
+from spacy.tokens import Doc
+
+from src.semantic_sequence import SemanticSequence
+from src.spacy_utils import get_lang_model
+
+
+class SequenceMatcher:
+    '''
+    Matcher of the semantic sequences in pattern_theorem_pairs. Each semantic
+    sequence is matched with the token patterns of its inflected theorem.
+    '''
+
+    def __init__(self, pattern_theorem_pairs: [(SemanticSequence, str)]):
+        self.matcher = Matcher(get_lang_model().vocab)
+        self.key_to_sem_seq = dict()
+        self.lazy_keys = set()
+
+        for idx, (semantic_seq, qualia_theorem) in enumerate(pattern_theorem_pairs):
+            patterns = semantic_seq.get_token_patterns(qualia_theorem)
+            name = '{}_{}'.format(semantic_seq, idx)
+            self.matcher.add(name, None, *patterns)
+
+            key = get_lang_model().vocab.strings.add(name)
+            self.key_to_sem_seq[key] = semantic_seq
+            if any(token.get('OP') == '*' for pattern in patterns for token in pattern):
+                self.lazy_keys.add(key)
+
+    def find_matches(self, tokenized_seq: Doc) -> dict:
+        '''
+        Find the matches of all semantic sequences in one scan of tokenized_seq.
+        :param tokenized_seq: parsed sequence
+        :return: dict which map semantic sequence to list of (start_idx, end_idx)
+        of the first and last token of its matches. Semantic sequences without
+        match are missing.
+        '''
+        key_to_spans = defaultdict(list)
+        for key, start, end in self.matcher(tokenized_seq):
+            key_to_spans[key].append((start, end))
+
+        sem_seq_to_indices = dict()
+        for key, spans in key_to_spans.items():
+            is_lazy = key in self.lazy_keys
+            spans.sort(key=lambda span: (span[0], span[1] if is_lazy else -span[1]))
+
+            indices = []
+            position = 0
+            for start, end in spans:
+                if start >= position:
+                    indices.append((start, end - 1))
+                    position = end
+            sem_seq_to_indices[self.key_to_sem_seq[key]] = indices
+
+        return sem_seq_to_indices
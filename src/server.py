@@ -0,0 +1,286 @@
+'''
+Provide QualiaServer, a local HTTP/JSON server which keeps one creation
+strategy with loaded models warm. Concurrent requests for the same theorem
+are coalesced into one creation. Requests which arrive within a small
+batch window are created together by generate_qualia_structures, so the
+BERT inputs and the spaCy parses of different requests share batches. The
+models run in a single thread, so the event loop keeps accepting requests
+while a batch is created.
+'''
+import asyncio
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.parse import urlsplit, parse_qs
+
+from src.qualia_structure import CreationStrategy
+
+HOST = '127.0.0.1'
+PORT = 8765
+BATCH_WINDOW = 0.01  # Seconds to wait for further requests of a batch
+MAX_BATCH_SIZE = 32  # Maximal number of theorems created together
+NUM_LATENCIES = 1000  # Number of latest latencies used for the statistics
+MAX_BODY_SIZE = 1 << 20
+STATUS_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 422: 'Unprocessable Entity'}
+
+
+def percentile(values: [float], fraction: float) -> float:
+    '''
+    Return percentile of values by the nearest rank.
+    :param values: sorted values
+    :param fraction: fraction of the percentile between 0 and 1
+    :return: percentile or None if values is empty
+    '''
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))]
+
+
+class ServerStats:
+    '''
+    Counters and latencies of a QualiaServer.
+    '''
+
+    def __init__(self, num_latencies: int = NUM_LATENCIES):
+        self.num_requests = 0
+        self.num_coalesced = 0
+        self.num_failed = 0
+        self.num_batches = 0
+        self.num_batched_theorems = 0
+        self.max_queue_depth = 0
+        self.latencies = deque(maxlen=num_latencies)
+        self.batch_seconds = deque(maxlen=num_latencies)
+
+    def to_dict(self, queue_depth: int, in_progress: int) -> dict:
+        '''
+        Return statistics as dict with latencies in milliseconds.
+        :param queue_depth: number of theorems waiting for the next batch
+        :param in_progress: number of theorems of the running batch
+        :return: dict of statistics
+        '''
+        latencies = sorted(self.latencies)
+        batch_seconds = sorted(self.batch_seconds)
+        return {'requests': self.num_requests,
+                'coalesced': self.num_coalesced,
+                'failed': self.num_failed,
+                'queueDepth': queue_depth,
+                'maxQueueDepth': self.max_queue_depth,
+                'inProgress': in_progress,
+                'batches': self.num_batches,
+                'meanBatchSize': self.num_batched_theorems / self.num_batches
+                if self.num_batches else None,
+                'latencyMs': _milliseconds(latencies),
+                'batchMs': _milliseconds(batch_seconds)}
+
+
+def _milliseconds(values: [float]) -> dict:
+    return {'count': len(values),
+            'mean': 1000 * sum(values) / len(values) if values else None,
+            'p50': _scale(percentile(values, 0.5)),
+            'p95': _scale(percentile(values, 0.95)),
+            'p99': _scale(percentile(values, 0.99)),
+            'max': _scale(values[-1] if values else None)}
+
+
+def _scale(seconds: float) -> float:
+    return 1000 * seconds if seconds is not None else None
+
+
+class QualiaServer:
+    '''
+    Create qualia structures on request with a warm strategy. encode_result
+    converts the theorem and its DebugQualiaStructure or raised exception to
+    a json string.
+    '''
+
+    def __init__(self, strategy: CreationStrategy, encode_result,
+                 batch_window: float = BATCH_WINDOW, max_batch_size: int = MAX_BATCH_SIZE):
+        self.strategy = strategy
+        self.encode_result = encode_result
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.stats = ServerStats()
+        self.theorem_to_future = dict()
+        self.queue = []
+        self.in_progress = 0
+        self.executor = ThreadPoolExecutor(1)
+        self.has_work = None
+        self.is_full = None
+
+    async def serve(self, host: str = HOST, port: int = PORT, started=None):
+        '''
+        Coroutine to accept requests until the task is cancelled.
+        :param host: host of the server
+        :param port: port of the server, 0 for a free port
+        :param started: optional future, which is set to the bound port
+        :return: None
+        '''
+        self.has_work = asyncio.Event()
+        self.is_full = asyncio.Event()
+        batch_task = asyncio.ensure_future(self.__run_batches())
+        server = await asyncio.start_server(self.__handle_connection, host, port)
+        if started is not None:
+            started.set_result(server.sockets[0].getsockname()[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batch_task.cancel()
+            self.executor.shutdown(wait=False)
+
+    async def create(self, qualia_theorem: str):
+        '''
+        Coroutine to create qualia structure of theorem with the next batch. A
+        theorem, which is already waiting or created, is not created again.
+        :param qualia_theorem: qualia theorem
+        :return: DebugQualiaStructure or raised exception
+        '''
+        future = self.theorem_to_future.get(qualia_theorem)
+        if future is not None:
+            self.stats.num_coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_event_loop().create_future()
+        self.theorem_to_future[qualia_theorem] = future
+        self.queue.append(qualia_theorem)
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, len(self.queue))
+        self.has_work.set()
+        if len(self.queue) >= self.max_batch_size:
+            self.is_full.set()
+        return await asyncio.shield(future)
+
+    async def __run_batches(self):
+        '''
+        Coroutine to create the waiting theorems in batches. A batch is started
+        after batch_window seconds or if max_batch_size theorems are waiting.
+        :return: None
+        '''
+        loop = asyncio.get_event_loop()
+        while True:
+            await self.has_work.wait()
+            if len(self.queue) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self.is_full.wait(), self.batch_window)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self.queue[:self.max_batch_size]
+            self.queue = self.queue[self.max_batch_size:]
+            if len(self.queue) < self.max_batch_size:
+                self.is_full.clear()
+            if not self.queue:
+                self.has_work.clear()
+
+            self.in_progress = len(batch)
+            start = perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.__generate, batch)
+            except Exception as exception:
+                results = [(qualia_theorem, exception) for qualia_theorem in batch]
+            self.stats.batch_seconds.append(perf_counter() - start)
+            self.stats.num_batches += 1
+            self.stats.num_batched_theorems += len(batch)
+            self.in_progress = 0
+
+            theorem_to_result = dict(results)
+            for qualia_theorem in batch:
+                self.theorem_to_future.pop(qualia_theorem).set_result(
+                    theorem_to_result.get(qualia_theorem, KeyError(qualia_theorem)))
+
+    def __generate(self, qualia_theorems: [str]) -> [(str, object)]:
+        self.strategy.inflection_service.resolve_all(qualia_theorems)
+        return self.strategy.generate_qualia_structures(qualia_theorems)
+
+    async def __handle_connection(self, reader: asyncio.StreamReader,
+                                  writer: asyncio.StreamWriter):
+        '''
+        Coroutine to answer the requests of a connection until the client
+        closes it.
+        :param reader: reader of connection
+        :param writer: writer of connection
+        :return: None
+        '''
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, response = await self.__respond(method, target, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                payload = response.encode('utf-8')
+                writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\n'
+                             'Content-Length: {}\r\nConnection: {}\r\n\r\n'
+                             .format(status, STATUS_REASONS[status], len(payload),
+                                     'keep-alive' if keep_alive else 'close')
+                             .encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def __respond(self, method: str, target: str, body: bytes) -> (int, str):
+        '''
+        Coroutine to answer a request. GET /qualia?theorem=... and POST /qualia
+        with {"theorem": ...} return the structure, GET /stats the statistics.
+        :param method: http method
+        :param target: request target with query
+        :param body: request body
+        :return: (status, json string)
+        '''
+        url = urlsplit(target)
+        if url.path == '/stats' and method == 'GET':
+            return 200, json.dumps(self.stats.to_dict(len(self.queue), self.in_progress))
+        if url.path != '/qualia' or method not in ['GET', 'POST']:
+            return 404, json.dumps({'error': 'Unknown request {} {}'.format(method, url.path)})
+
+        if method == 'GET':
+            qualia_theorem = parse_qs(url.query).get('theorem', [None])[0]
+        else:
+            try:
+                qualia_theorem = json.loads(body.decode('utf-8')).get('theorem')
+            except (ValueError, AttributeError):
+                qualia_theorem = None
+        if not isinstance(qualia_theorem, str) or not qualia_theorem.strip():
+            return 400, json.dumps({'error': 'Missing theorem'})
+
+        qualia_theorem = qualia_theorem.strip()
+        start = perf_counter()
+        self.stats.num_requests += 1
+        result = await self.create(qualia_theorem)
+        self.stats.latencies.append(perf_counter() - start)
+        if isinstance(result, Exception):
+            self.stats.num_failed += 1
+            return 422, self.encode_result(qualia_theorem, result)
+        return 200, self.encode_result(qualia_theorem, result)
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    '''
+    Coroutine to read the next http request of a connection.
+    :param reader: reader of connection
+    :raise ValueError if the request is malformed or the body is too large
+    :return: (method, target, headers, body) or None if the connection is closed
+    '''
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target, _ = request_line.decode('latin-1').split(' ', 2)
+
+    headers = dict()
+    while True:
+        line = (await reader.readline()).decode('latin-1')
+        if line in ['\r\n', '\n', '']:
+            break
+        name, value = line.split(':', 1)
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_SIZE:
+        raise ValueError('Body of {} bytes is too large'.format(length))
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, headers, body
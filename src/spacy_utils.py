@@ -1,10 +1,42 @@
 import spacy
-from spacy.tokens import Token
+from spacy.tokens import Token, Doc
 
 
 
 ROOT = 8206900633647566924
-LANG_MODEL = spacy.load('en_ud_model_lg')
+NAME_OF_LANG_MODEL = 'en_ud_model_lg'
+DISABLED_PIPES = ['ner', 'textcat', 'entity_linker']  # Pipes not used by the extraction
+PARSE_BATCH_SIZE = 64  # Number of sequences parsed together by one pipe call
+
+_LANG_MODEL = None
+
+
+def get_lang_model():
+    '''
+    Return the spaCy model NAME_OF_LANG_MODEL. The model is loaded on first use with
+    only the pipes needed by the extraction, so commands which parse nothing
+    do not pay its loading time and memory.
+    :return: loaded spaCy model
+    '''
+    global _LANG_MODEL
+    if _LANG_MODEL is None:
+        _LANG_MODEL = spacy.load(NAME_OF_LANG_MODEL, disable=DISABLED_PIPES)
+    return _LANG_MODEL
+
+
+def parse_sequences(sequences: [str], batch_size: int = PARSE_BATCH_SIZE,
+                    n_process: int = 1) -> [Doc]:
+    '''
+    Parse sequences in batches by the pipe of the spaCy model instead of one call per sequence.
+    :param sequences: sequences to parse
+    :param batch_size: number of sequences parsed together
+    :param n_process: number of processes used for parsing
+    :return: parsed sequences in order of sequences
+    '''
+    if not sequences:
+        return []
+    return list(get_lang_model().pipe(sequences, batch_size=batch_size, n_process=n_process))
+
 
 class PatternNotFoundException(Exception):
     '''
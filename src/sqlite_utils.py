@@ -0,0 +1,38 @@
+'''
+Provide ProcessConnection, a sqlite connection which can be used by forked
+processes. A sqlite connection must not be shared by two processes, so a
+forked process opens its own connection to the same file on first use.
+'''
+import os
+import sqlite3
+
+
+class ProcessConnection:
+    '''
+    Sqlite connection of the current process. All attributes of
+    sqlite3.Connection like execute, commit or close are delegated to the
+    connection of the current process. The connection inherited by a forked
+    process is kept but never used or closed, because closing it could
+    release the locks of the parent.
+    '''
+
+    def __init__(self, path: str, **kwargs):
+        self.path = str(path)
+        self.kwargs = kwargs
+        self.pid = os.getpid()
+        self.connection = sqlite3.connect(self.path, **kwargs)
+        self.inherited = []
+
+    def get(self) -> sqlite3.Connection:
+        '''
+        Return connection of the current process, which is opened after a fork.
+        :return: sqlite connection
+        '''
+        if self.pid != os.getpid():
+            self.inherited.append(self.connection)
+            self.pid = os.getpid()
+            self.connection = sqlite3.connect(self.path, **self.kwargs)
+        return self.connection
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
@@ -4,7 +4,7 @@ Provide the semantic sequences for the role telic.
 from spacy.symbols import *
 from spacy.tokens.doc import Doc
 
-from src.semantic_sequence import SemanticSequence, to_bert_seq, MASK
+from src.semantic_sequence import SemanticSequence, to_bert_seq, MASK, token_pattern
 from src.spacy_utils import ROOT, get_ancestor, get_child, PatternNotFoundException
 
 
@@ -13,6 +13,11 @@ class PurposeOfA(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return 'purpose of(\sa|\san|) {} is'.format(qualia_theorem)
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('purpose of {} is'.format(qualia_theorem)),
+                token_pattern('purpose of a {} is'.format(qualia_theorem)),
+                token_pattern('purpose of an {} is'.format(qualia_theorem))]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'purpose of a|an {} is'.format(qualia_theorem)
 
@@ -51,6 +56,9 @@ class PurposeOf(PurposeOfA):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return 'purpose of {} is'.format(qualia_theorem)
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('purpose of {} is'.format(qualia_theorem))]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return self.get_regular_expression(qualia_theorem)
 
@@ -71,6 +79,11 @@ class IsUsedTo(SemanticSequence):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return '(a\s|an\s|){} is used'.format(qualia_theorem)
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern('a {} is used'.format(qualia_theorem)),
+                token_pattern('an {} is used'.format(qualia_theorem)),
+                token_pattern('{} is used'.format(qualia_theorem))]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return 'a|an {} is used to'.format(qualia_theorem)
 
@@ -107,6 +120,9 @@ class AreUsedTo(IsUsedTo):
     def get_regular_expression(self, qualia_theorem: str) -> str:
         return '{} are used'.format(qualia_theorem)
 
+    def get_token_patterns(self, qualia_theorem: str) -> [[dict]]:
+        return [token_pattern(qualia_theorem + ' are used')]
+
     def get_search_requests(self, qualia_theorem: str) -> str:
         return self.get_regular_expression(qualia_theorem)
 
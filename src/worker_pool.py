@@ -0,0 +1,159 @@
+'''
+Provide map_in_workers, which applies a function to multiple qualia theorems
+in forked worker processes. The models are loaded by the parent before the
+workers are forked, so all workers share the read only pages of the models
+copy on write instead of loading them again. Theorems are handed out one by
+one to the next idle worker and the results are returned in order of the
+theorems. If a worker dies, the theorems which were in flight in its pool
+are created again one by one, so only the theorem which kills its worker
+again fails.
+'''
+import multiprocessing
+import pickle
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.util import Finalize
+
+PENDING_PER_WORKER = 2  # Number of submitted theorems per worker
+
+_FUNCTION = None  # Function applied by the forked workers
+_FINALIZER = None  # Function called by a worker before it exits
+
+
+class WorkerError(Exception):
+    '''
+    Exception for errors of a worker, which could not be passed to the parent.
+    '''
+
+
+def map_in_workers(function, items, num_workers: int):
+    '''
+    Apply function to all items in num_workers forked processes. Exceptions
+    raised by function are returned as result of the item, so a failed item
+    does not stop the other items. If a worker dies, the remaining items are
+    passed to newly forked workers and the pending items are retried once in
+    a separate worker. Only an item whose retry also kills the worker is
+    returned with the error.
+    :param function: function which is applied to one item
+    :param items: iterable of items, which is consumed lazily
+    :param num_workers: number of worker processes
+    :return: generator of (item, result or exception) in order of items
+    '''
+    global _FUNCTION
+    _FUNCTION = function
+    pending = deque()
+    pool = _WorkerPool(num_workers)
+    try:
+        for item in items:
+            if len(pending) >= num_workers * PENDING_PER_WORKER:
+                item_of_result, future = pending.popleft()
+                yield item_of_result, pool.result(item_of_result, future)
+            pending.append((item, pool.submit(item)))
+        while pending:
+            item, future = pending.popleft()
+            yield item, pool.result(item, future)
+    finally:
+        pool.shutdown()
+
+
+def set_worker_finalizer(finalizer):
+    '''
+    Set function called by every worker before it exits, e.g. to write
+    pending entries of a cache.
+    :param finalizer: function without arguments or None
+    :return: None
+    '''
+    global _FINALIZER
+    _FINALIZER = finalizer
+
+
+class _WorkerPool:
+    '''
+    Executor of num_workers forked workers, which is forked again if a worker
+    died. The items of a dead executor are retried in a separate executor with
+    one worker, so a retried item never shares its executor with another item.
+    '''
+
+    def __init__(self, num_workers: int):
+        self.num_workers = num_workers
+        self.executor = _fork_executor(num_workers)
+        self.retry_executor = None
+
+    def submit(self, item) -> Future:
+        '''
+        Submit item to the workers. A dead executor is forked again.
+        :param item: item of map_in_workers
+        :return: future of result
+        '''
+        try:
+            return self.executor.submit(_call_in_worker, item)
+        except BrokenProcessPool:
+            self.executor.shutdown(wait=False)
+            self.executor = _fork_executor(self.num_workers)
+            return self.executor.submit(_call_in_worker, item)
+
+    def result(self, item, future: Future):
+        '''
+        Wait for result of item. If the worker of item or another worker of
+        its executor died, item is retried once in the retry executor.
+        :param item: item of map_in_workers
+        :param future: future of submitted item
+        :return: result or exception
+        '''
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            return self.__retry(item)
+        except Exception as exception:
+            return exception
+
+    def __retry(self, item):
+        if self.retry_executor is None:
+            self.retry_executor = _fork_executor(1)
+        try:
+            return self.retry_executor.submit(_call_in_worker, item).result()
+        except BrokenProcessPool as broken_process_pool:
+            self.retry_executor.shutdown(wait=False)
+            self.retry_executor = None
+            return broken_process_pool
+        except Exception as exception:
+            return exception
+
+    def shutdown(self):
+        '''
+        Wait for the workers and shut down both executors.
+        :return: None
+        '''
+        self.executor.shutdown()
+        if self.retry_executor is not None:
+            self.retry_executor.shutdown()
+
+
+def _fork_executor(num_workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(num_workers, mp_context=multiprocessing.get_context('fork'),
+                               initializer=_init_worker)
+
+
+def _init_worker():
+    if _FINALIZER is not None:
+        Finalize(None, _FINALIZER, exitpriority=10)
+
+
+def _call_in_worker(item):
+    '''
+    Apply function to item in worker. An exception, which can not be pickled,
+    is replaced by WorkerError with its traceback.
+    :param item: item of map_in_workers
+    :return: result or exception
+    '''
+    try:
+        return _FUNCTION(item)
+    except Exception as exception:
+        try:
+            pickle.dumps(exception)
+            return exception
+        except Exception:
+            return WorkerError(traceback.format_exc())
+
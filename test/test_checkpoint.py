@@ -0,0 +1,78 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.checkpoint import Checkpoint, prepare_json_lines
+
+
+class CheckpointCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / 'checkpoint.db'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_finished_by_arguments(self):
+        checkpoint = Checkpoint(self.path, 'google', 'numOfSources', 8)
+        self.assertFalse(checkpoint.is_finished('dog'))
+        checkpoint.mark_finished('dog')
+        checkpoint.close()
+
+        checkpoint = Checkpoint(self.path, 'google', 'numOfSources', 8)
+        self.assertTrue(checkpoint.is_finished('dog'))
+        self.assertFalse(checkpoint.is_finished('cat'))
+        checkpoint.close()
+
+        for strategy, metric, top_k in [('bert', 'numOfSources', 8), ('google', 'webP', 8),
+                                        ('google', 'numOfSources', 50)]:
+            checkpoint = Checkpoint(self.path, strategy, metric, top_k)
+            self.assertFalse(checkpoint.is_finished('dog'))
+            checkpoint.close()
+
+    def test_output_size_and_clear(self):
+        checkpoint = Checkpoint(self.path, 'bert', '', 8)
+        self.assertEqual(checkpoint.output_size(), 0)
+        checkpoint.mark_finished('dog', 120)
+        checkpoint.mark_finished('cat', 250)
+        self.assertEqual(checkpoint.output_size(), 250)
+
+        checkpoint.clear()
+        self.assertFalse(checkpoint.is_finished('dog'))
+        self.assertEqual(checkpoint.output_size(), 0)
+        checkpoint.close()
+
+    def test_resume_after_failure(self):
+        lines_path = Path(self.temp_dir.name) / 'structures.jsonl'
+        checkpoint = Checkpoint(self.path, 'bert', '', 8)
+        with open(lines_path, 'w') as lines_file:
+            for theorem, key in [('dog', 'structure'), ('cow', 'error'), ('cat', 'structure')]:
+                lines_file.write(json.dumps({'theorem': theorem, key: theorem}) + '\n')
+                if key == 'error':
+                    checkpoint.mark_failed(theorem, lines_file.tell())
+                else:
+                    checkpoint.mark_finished(theorem, lines_file.tell())
+            lines_file.write('{"theorem": "hum')
+
+        output_size = prepare_json_lines(lines_path, checkpoint)
+        self.assertEqual(lines_path.stat().st_size, output_size)
+        self.assertEqual(checkpoint.output_size(), output_size)
+        self.assertEqual([json.loads(line)['theorem'] for line
+                          in lines_path.read_text().splitlines()], ['dog', 'cat'])
+        self.assertTrue(checkpoint.is_finished('cat'))
+        self.assertFalse(checkpoint.is_finished('cow'))
+        self.assertEqual(checkpoint.failed_theorems(), set())
+
+        with open(lines_path, 'a') as lines_file:
+            lines_file.write(json.dumps({'theorem': 'cow', 'structure': 'cow'}) + '\n')
+            checkpoint.mark_finished('cow', lines_file.tell())
+        self.assertEqual(prepare_json_lines(lines_path, checkpoint), lines_path.stat().st_size)
+        self.assertEqual([json.loads(line)['theorem'] for line
+                          in lines_path.read_text().splitlines()], ['dog', 'cat', 'cow'])
+        checkpoint.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from src.extraction_window import window_span, map_to_window, parse_window_arg, SENTENCE
+from src.spacy_utils import get_lang_model
+
+SNIPPET = 'Hello there. A dog is a pet. Another sentence'
+
+
+class ExtractionWindowCase(unittest.TestCase):
+
+    def test_parse_window_arg(self):
+        self.assertIsNone(parse_window_arg('snippet'))
+        self.assertEqual(parse_window_arg('sentence'), SENTENCE)
+        self.assertEqual(parse_window_arg('5'), 5)
+        self.assertRaises(ValueError, parse_window_arg, '-1')
+
+    def test_window_span(self):
+        tokens = get_lang_model().make_doc(SNIPPET)
+        self.assertEqual(tokens[window_span(tokens, 4, 5, SENTENCE)[0]:
+                                window_span(tokens, 4, 5, SENTENCE)[1]].text, 'A dog is a pet.')
+        self.assertEqual(window_span(tokens, 4, 5, 1), (3, 7))
+        self.assertEqual(window_span(tokens, 0, 1, 10), (0, len(tokens)))
+
+    def test_map_to_window(self):
+        tokens = get_lang_model().make_doc(SNIPPET)
+        window_start, window_end = window_span(tokens, 4, 5, SENTENCE)
+        window_doc = get_lang_model()(tokens[window_start:window_end].text)
+
+        start, end = map_to_window(tokens, window_start, window_doc, 4, 5)
+        self.assertEqual((window_doc[start].orth_, window_doc[end].orth_), ('dog', 'is'))
+
+
+if __name__ == '__main__':
+    unittest.main()
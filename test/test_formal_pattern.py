@@ -1,6 +1,7 @@
 import unittest
 from src.formal_sequences import *
-from src.spacy_utils import token_sequences_to_str_seq, PatternNotFoundException
+from src.spacy_utils import token_sequences_to_str_seq, PatternNotFoundException, \
+    parse_sequences
 
 
 class FormalRoleCase(unittest.TestCase):
@@ -154,6 +155,17 @@ class FormalRoleCase(unittest.TestCase):
 
         self.assertEqual(token_sequences_to_str_seq(matching_words), [['pizzas']])
 
+    def test_extract_from_parsed_docs(self):
+        and_other_pattern = AndOther(True)
+        sequences = ['PC and other electronic devices. PC and other things.',
+                     'I like my PC and other devices', 'PC and other objects.']
+
+        docs = parse_sequences(sequences, batch_size=2)
+
+        self.assertEqual([token_sequences_to_str_seq(
+            and_other_pattern.extract_qualia_elements_of_doc('PC', doc)) for doc in docs],
+            [[['devices'], ['things']], [['devices']], [['objects']]])
+
 
 if __name__ == '__main__':
     unittest.main()
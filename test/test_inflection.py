@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.inflection import InflectionService, WordNotSupportedError
+
+INFLECTION_DICT = {'smartphone': 'smartphones'}
+
+
+class InflectionServiceCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.table_path = str(Path(self.temp_dir.name) / 'inflectionTable')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_resolve_once(self):
+        service = InflectionService(INFLECTION_DICT)
+        self.assertEqual(service.inflect('computers'), ('computer', 'computers'))
+        self.assertEqual(service.inflect('computers'), ('computer', 'computers'))
+        self.assertEqual(service.inflect('smartphone'), ('smartphone', 'smartphones'))
+        self.assertEqual(service.num_parsed, 1)
+
+    def test_resolve_all(self):
+        service = InflectionService(INFLECTION_DICT)
+        noun_to_result = service.resolve_all(['dog', 'watch', 'dog', 'smartphone'])
+        self.assertEqual(noun_to_result, {'dog': ('dog', 'dogs'), 'watch': ('watch', 'watches'),
+                                          'smartphone': ('smartphone', 'smartphones')})
+        self.assertEqual(service.num_parsed, 2)
+
+    def test_persist_table(self):
+        service = InflectionService(INFLECTION_DICT, self.table_path)
+        service.resolve_all(['dog', 'watch'])
+        service.close()
+
+        service = InflectionService(INFLECTION_DICT, self.table_path)
+        self.assertEqual(service.inflect('watch'), ('watch', 'watches'))
+        self.assertEqual(service.num_parsed, 0)
+
+    def test_drop_least_recently_used(self):
+        service = InflectionService(INFLECTION_DICT, max_entries=2)
+        service.resolve_all(['dog', 'watch'])
+        service.inflect('dog')
+        self.assertEqual(service.resolve_all(['cat'])['cat'], ('cat', 'cats'))
+        self.assertEqual(list(service.noun_to_forms), ['dog', 'cat'])
+        service.inflect('watch')
+        self.assertEqual(service.num_parsed, 4)
+
+    def test_persist_dropped_nouns_once(self):
+        service = InflectionService(INFLECTION_DICT, self.table_path, max_entries=1)
+        nouns = ['dog', 'watch', 'cat']
+        service.resolve_all(nouns)
+        service.resolve_all(nouns)
+        service.flush()
+        noun_to_result = service.resolve_all(nouns)
+        service.close()
+        self.assertEqual(len(Path(self.table_path).read_text().splitlines()), 3)
+        self.assertEqual(service.num_parsed, 3)
+
+        service = InflectionService(INFLECTION_DICT, self.table_path, max_entries=1)
+        self.assertEqual(service.resolve_all(nouns), noun_to_result)
+        service.close()
+        self.assertEqual(len(Path(self.table_path).read_text().splitlines()), 3)
+        self.assertEqual(service.num_parsed, 0)
+
+    def test_unsupported_word(self):
+        service = InflectionService(dict())
+        service.noun_to_forms['xyz'] = WordNotSupportedError('xyz')
+        self.assertRaises(WordNotSupportedError, service.inflect, 'xyz')
+        self.assertIsInstance(service.resolve_all(['xyz'])['xyz'], WordNotSupportedError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import tempfile
+import unittest
+
+from src.job_queue import JobQueue, PENDING, IN_PROGRESS, DONE, FAILED
+
+
+class JobQueueCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_order_and_states(self):
+        queue = JobQueue(self.temp_dir.name)
+        self.assertEqual(queue.add(['dog', 'cat', 'dog', 'human']), 3)
+
+        self.assertEqual(queue.next_pending(), 'dog')
+        queue.mark_done('dog')
+        self.assertEqual(queue.next_pending(), 'cat')
+        queue.mark_failed('cat', 'not supported')
+        self.assertEqual(queue.next_pending(), 'human')
+        self.assertEqual(queue.counts(), {PENDING: 0, IN_PROGRESS: 1, DONE: 1, FAILED: 1})
+
+        queue.release('human')
+        self.assertEqual(queue.next_pending(), 'human')
+        queue.mark_done('human')
+        self.assertIsNone(queue.next_pending())
+        queue.close()
+
+    def test_resume(self):
+        queue = JobQueue(self.temp_dir.name)
+        queue.add(['dog', 'cat'])
+        self.assertEqual(queue.next_pending(), 'dog')
+        queue.close()
+
+        queue = JobQueue(self.temp_dir.name)
+        self.assertEqual(queue.add(['cat', 'home']), 1)
+        self.assertEqual([queue.next_pending() for _ in range(4)], ['dog', 'cat', 'home', None])
+        queue.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
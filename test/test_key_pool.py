@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.key_pool import KeyPool, LEAST_USED, QUOTA_TIMEZONE, quota_day, seconds_until_reset
+
+KEYS = [('api_key_1', 'cse_1'), ('api_key_2', 'cse_2')]
+
+
+class KeyPoolCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / 'usage.db'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_robin(self):
+        key_pool = KeyPool(KEYS, path=self.path, daily_limit=2)
+        self.assertEqual([key_pool.acquire() for _ in range(5)],
+                         [KEYS[0], KEYS[1], KEYS[0], KEYS[1], None])
+        self.assertEqual(key_pool.remaining(), {'api_key_1': 0, 'api_key_2': 0})
+        key_pool.close()
+
+    def test_least_used(self):
+        key_pool = KeyPool(KEYS, path=self.path, daily_limit=3, scheduling=LEAST_USED)
+        key_pool.acquire()
+        key_pool.acquire()
+        self.assertEqual(key_pool.usage(), {'api_key_1': (1, False), 'api_key_2': (1, False)})
+        key_pool.close()
+
+    def test_persisted_usage(self):
+        key_pool = KeyPool(KEYS, path=self.path, daily_limit=2)
+        key_pool.acquire()
+        key_pool.mark_exhausted('api_key_2')
+        key_pool.close()
+
+        key_pool = KeyPool(KEYS, path=self.path, daily_limit=2)
+        self.assertEqual(key_pool.remaining(), {'api_key_1': 1, 'api_key_2': 0})
+        self.assertEqual(key_pool.acquire(), KEYS[0])
+        self.assertIsNone(key_pool.acquire())
+        key_pool.close()
+
+    def test_quota_day(self):
+        now = datetime(2021, 3, 1, 23, 0, tzinfo=QUOTA_TIMEZONE)
+        self.assertEqual(quota_day(now), '2021-03-01')
+        self.assertEqual(seconds_until_reset(now), 60 * 60)
+
+    def test_daylight_saving_time(self):
+        self.assertEqual(quota_day(datetime(2021, 7, 1, 7, 30, tzinfo=timezone.utc)),
+                         '2021-07-01')
+        self.assertEqual(seconds_until_reset(datetime(2021, 3, 14, tzinfo=QUOTA_TIMEZONE)),
+                         23 * 60 * 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
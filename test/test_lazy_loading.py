@@ -0,0 +1,29 @@
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT_FOLDER = str(Path(__file__).resolve().parent.parent)
+
+
+def run_python(code: str) -> [str]:
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT_FOLDER,
+                            stdout=subprocess.PIPE, check=True)
+    return output.stdout.decode().split()
+
+
+class LazyLoadingCase(unittest.TestCase):
+
+    def test_import_does_not_load_lang_model(self):
+        output = run_python('import qualia_generator, src.qualia_structure, src.spacy_utils as su; '
+                            'print(su._LANG_MODEL is None)')
+        self.assertEqual(output, ['True'])
+
+    def test_import_does_not_load_bert(self):
+        output = run_python('import src.bert_strategy as bs, src.mlm_backend as mb; '
+                            'print(bs._TOKENIZER is None, mb._MODEL is None)')
+        self.assertEqual(output, ['True', 'True'])
+
+
+if __name__ == '__main__':
+    unittest.main()
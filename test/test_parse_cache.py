@@ -0,0 +1,49 @@
+import tempfile
+import unittest
+
+from src.parse_cache import ParseCache
+
+TEXTS = ['PC and other electronic devices.', 'A dog is a kind of animal.']
+
+
+def doc_to_tuples(doc):
+    return [(token.orth_, token.lemma_, token.pos_, token.dep_, token.head.i) for token in doc]
+
+
+class ParseCacheCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parse_once(self):
+        cache = ParseCache(self.temp_dir.name)
+        docs = cache.parse_all(TEXTS + TEXTS[:1])
+        self.assertEqual(cache.num_parsed, 2)
+        self.assertIs(docs[0], docs[2])
+
+        cache.parse_all(TEXTS)
+        self.assertEqual(cache.num_parsed, 2)
+        self.assertEqual(cache.num_hits, 3)
+        cache.close()
+
+    def test_persist_shards(self):
+        cache = ParseCache(self.temp_dir.name)
+        expected = [doc_to_tuples(doc) for doc in cache.parse_all(TEXTS)]
+        cache.close()
+
+        cache = ParseCache(self.temp_dir.name)
+        self.assertEqual([doc_to_tuples(doc) for doc in cache.parse_all(TEXTS)], expected)
+        self.assertEqual(cache.num_parsed, 0)
+
+    def test_lru_eviction(self):
+        cache = ParseCache(None, max_entries=1)
+        cache.parse_all(TEXTS)
+        self.assertIsNone(cache.get(TEXTS[0]))
+        self.assertIsNotNone(cache.get(TEXTS[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
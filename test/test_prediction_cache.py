@@ -0,0 +1,47 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from src.prediction_cache import PredictionCache, prediction_key
+
+INPUT_IDS = [101, 3676, 1110, 170, 1912, 1104, 103, 119, 102]
+
+
+class PredictionCacheCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / 'predictions.db'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        key = prediction_key('bert-base-cased', 'tf', INPUT_IDS, 3)
+        ids = np.array([4267, 3624, 1285])
+        probs = np.array([0.5, 0.3, 0.2], dtype=np.float32)
+
+        cache = PredictionCache(self.path)
+        self.assertEqual(cache.get_many([key]), dict())
+        cache.put_many([(key, ids, probs)])
+        cache.close()
+
+        cache = PredictionCache(self.path)
+        stored_ids, stored_probs = cache.get_many([key, key])[key]
+        self.assertEqual(stored_ids.tolist(), ids.tolist())
+        self.assertEqual(stored_probs.tolist(), probs.tolist())
+        self.assertEqual(cache.num_hits, 1)
+        cache.close()
+
+    def test_key(self):
+        key = prediction_key('bert-base-cased', 'tf', INPUT_IDS, 50)
+        self.assertEqual(key, prediction_key('bert-base-cased', 'tf', list(INPUT_IDS), 50))
+        self.assertNotEqual(key, prediction_key('bert-base-cased', 'onnx', INPUT_IDS, 50))
+        self.assertNotEqual(key, prediction_key('bert-base-cased', 'tf', INPUT_IDS, 10))
+        self.assertNotEqual(key, prediction_key('bert-base-cased', 'tf', INPUT_IDS[1:], 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from src.agentive_sequences import ToANew
+from src.constitutive_sequences import ConsistsOf
+from src.formal_sequences import IsKindOf
+from src.prefilter import AnchorPrefilter, anchor_words
+
+
+class AnchorPrefilterCase(unittest.TestCase):
+
+    def test_anchor_words(self):
+        self.assertEqual(anchor_words(IsKindOf(False).get_token_patterns('Dog')),
+                         {'dog', 'is', 'kind', 'of'})
+        self.assertEqual(anchor_words(ConsistsOf(False).get_token_patterns('car')),
+                         {'car', 'consist'})
+        self.assertEqual(anchor_words(ToANew(False).get_token_patterns('car')),
+                         {'to', 'new', 'car'})
+
+    def test_may_match(self):
+        is_kind_of = IsKindOf(False)
+        to_a_new = ToANew(False)
+        prefilter = AnchorPrefilter([(is_kind_of, 'dog'), (to_a_new, 'dog')])
+
+        present = prefilter.present_anchors('My Dog is a kind of animal.')
+        self.assertTrue(prefilter.may_match(is_kind_of, present))
+        self.assertFalse(prefilter.may_match(to_a_new, present))
+
+        present = prefilter.present_anchors('a dog ... is kind of ... to buy a new car')
+        self.assertTrue(prefilter.may_match(is_kind_of, present))
+        self.assertTrue(prefilter.may_match(to_a_new, present))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,13 @@
+import importlib.util
+import tempfile
 import unittest
 
-from src.bert_strategy import BertStrategy
+import numpy as np
+
+from src.bert_strategy import BertStrategy, AdvBertStrategy, fill_masks, _top_k_softmax
+from src.mlm_backend import OnnxBackend
+from src.spacy_utils import PatternNotFoundException
+from src.metrics import NumberOfSources, OccurrenceInRequests
 from src.qualia_structure import *
 from src.formal_sequences import IsKindOf
 
@@ -26,6 +33,63 @@ class BertFactoryCase(unittest.TestCase):
                 self.assertAlmostEqual(sum(a[1] for a in factory._predict_masks(bert_text)),
                                        1, places=3)
 
+    def test_batched_prediction(self):
+        factory = BertStrategy(INFLECTION_DICT, batch_size=4)
+        bert_texts = IsKindOf(False).get_bert_input('dog') + PurposeOfA(False).get_bert_input('dog')
+        for bert_text, top_k_pred in zip(bert_texts, factory._predict_masks_batch(bert_texts)):
+            expected = factory._predict_masks(bert_text)
+            self.assertEqual([pred for pred, _ in top_k_pred], [pred for pred, _ in expected])
+            for (_, prob), (_, expected_prob) in zip(top_k_pred, expected):
+                self.assertAlmostEqual(prob, expected_prob, places=4)
+
+    def test_top_k_softmax(self):
+        logits = np.array([[0.5, 3.0, -1.0, 3.0, 2.0], [-200.0, 0.0, 1.0, -300.0, 2.0]])
+        indices, probabilities = _top_k_softmax(logits, 3)
+        self.assertEqual(indices.tolist(), [[1, 3, 4], [4, 2, 1]])
+        self.assertTrue(np.allclose(probabilities.sum(axis=-1), 1))
+        self.assertEqual(_top_k_softmax(logits, 5)[0].tolist(), [[1, 3, 4, 0, 2],
+                                                                  [4, 2, 1, 0, 3]])
+        self.assertEqual(_top_k_softmax(logits, 5)[1][1, -1], 0)
+
+    def test_beam_search(self):
+        bert_text = [bert_text for bert_text in PurposeOfA(False).get_bert_input('dog')
+                     if bert_text.count('[MASK]') == 2][0]
+        exhaustive = BertStrategy(INFLECTION_DICT, beam_width=50)._predict_masks(bert_text)
+        beam = BertStrategy(INFLECTION_DICT, beam_width=5)._predict_masks(bert_text)
+        self.assertEqual(len(beam), 50)
+        self.assertTrue(all(len(pred) == 2 for pred, _ in beam))
+        self.assertEqual([prob for _, prob in beam], sorted([prob for _, prob in beam],
+                                                            reverse=True))
+        self.assertLessEqual(beam[0][1], exhaustive[0][1] + 1e-6)
+
+    def test_batched_validation(self):
+        factory = AdvBertStrategy(INFLECTION_DICT)
+        candidates = [('dog', pred, sem_seq, bert_text)
+                      for sem_seq in [IsKindOf(False), AndOther(False)]
+                      for bert_text in sem_seq.get_bert_input('dog')
+                      for pred, _ in factory._predict_masks(bert_text)]
+        for candidate, valid in zip(candidates, factory.validate_predictions(candidates)):
+            theorem, pred, sem_seq, bert_text = candidate
+            try:
+                extracted = sem_seq.extract_qualia_elements(theorem, fill_masks(bert_text, pred))
+            except PatternNotFoundException:
+                extracted = []
+            self.assertEqual(valid, BertStrategy.is_valid_prediction(factory, *candidate) and
+                             len(extracted) > 0 and
+                             [token.orth_.strip() for token in extracted[0]] == pred)
+
+    @unittest.skipUnless(importlib.util.find_spec('onnxruntime') and
+                         importlib.util.find_spec('tf2onnx'), 'onnxruntime is not installed')
+    def test_onnx_backend(self):
+        bert_texts = IsKindOf(False).get_bert_input('dog') + AndOther(False).get_bert_input('dog')
+        expected = BertStrategy(INFLECTION_DICT)._predict_masks_batch(bert_texts)
+        with tempfile.TemporaryDirectory() as folder:
+            factory = BertStrategy(INFLECTION_DICT, backend=OnnxBackend(folder))
+            for top_k_pred, expected_pred in zip(factory._predict_masks_batch(bert_texts),
+                                                 expected):
+                self.assertEqual(top_k_pred[0][0], expected_pred[0][0])
+                self.assertAlmostEqual(top_k_pred[0][1], expected_pred[0][1], places=3)
+
 
 class QualiaElementTest(unittest.TestCase):
 
@@ -64,3 +128,22 @@ class QualiaStructureTest(unittest.TestCase):
         formal_sing.sem_seq_to_qe = pattern_to_qualia_elements
 
         self.assertTrue(qualia_element in qualia_structure.all_roles[0].sem_seq_to_qe[kind_of])
+
+
+class OccurrenceMetricTest(unittest.TestCase):
+
+    def setUp(self):
+        self.role = Role(*FORMAL)
+        is_kind_of, is_pattern = list(self.role.get_all_pattern())[:2]
+        self.role.sem_seq_to_qe[is_kind_of] = [QualiaElement('animal', sources=['s1', 's2']),
+                                               QualiaElement('pet', sources=['s3'])]
+        self.role.sem_seq_to_qe[is_pattern] = [QualiaElement('animal', sources=['s4'])]
+
+    def test_number_of_sources(self):
+        self.assertEqual(NumberOfSources().calc_metric_values(
+            [QualiaElement('animal'), QualiaElement('pet'), QualiaElement('human')], self.role),
+            [3, 1, 0])
+
+    def test_occurrence_in_requests(self):
+        self.assertEqual(OccurrenceInRequests().calc_metric_value(QualiaElement('animal'),
+                                                                  self.role), 2)
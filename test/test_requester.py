@@ -0,0 +1,191 @@
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from googleapiclient.discovery import HttpError
+
+from src.key_pool import KeyPool
+from src.requester import GoogleRequester, AsyncGoogleRequester, SearchRequestError
+from src.search_cache import SqliteSearchCache
+
+KEYS = [('api_key_1', 'cse_1'), ('api_key_2', 'cse_2')]
+RESULT = {'searchInformation': {'totalResults': '7'}, 'items': []}
+
+
+class Response:
+    '''
+    Http response with status like httplib2.Response.
+    '''
+
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = 'Status {}'.format(status)
+
+
+def http_error(status: int) -> HttpError:
+    return HttpError(Response(status), b'')
+
+
+class StubService:
+    '''
+    Api client which raises the passed errors one after another and then
+    returns RESULT.
+    '''
+
+    def __init__(self, errors: [Exception]):
+        self.errors = list(errors)
+        self.num_calls = 0
+
+    def cse(self):
+        return self
+
+    def list(self, q: str, cx: str):
+        return self
+
+    def execute(self) -> dict:
+        self.num_calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return RESULT
+
+
+class GoogleRequesterCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.key_pool = KeyPool(KEYS, path=Path(self.temp_dir.name) / 'usage.db')
+
+    def tearDown(self):
+        self.key_pool.close()
+        self.temp_dir.cleanup()
+
+    def create_requester(self, key_to_errors: dict) -> (GoogleRequester, dict):
+        services = {api_key: StubService(key_to_errors.get(api_key, []))
+                    for api_key, _ in KEYS}
+        requester = GoogleRequester(KEYS, cache=SqliteSearchCache(':memory:'),
+                                    key_pool=self.key_pool, retry_delay=0)
+        requester._get_service = services.get
+        return requester, services
+
+    def test_retry_server_error_and_change_key(self):
+        requester, services = self.create_requester({'api_key_1': [http_error(500),
+                                                                   http_error(403)]})
+        self.assertEqual(requester.num_results('dog'), 7)
+        self.assertEqual(services['api_key_1'].num_calls, 2)
+        self.assertEqual(services['api_key_2'].num_calls, 1)
+        self.assertEqual(self.key_pool.remaining()['api_key_1'], 0)
+
+    def test_rejected_request(self):
+        requester, services = self.create_requester({'api_key_1': [http_error(400)]})
+        self.assertRaises(SearchRequestError, requester.num_results, 'dog')
+        self.assertEqual(services['api_key_1'].num_calls, 1)
+        self.assertEqual(services['api_key_2'].num_calls, 0)
+
+    def test_retries_exhausted(self):
+        requester, services = self.create_requester({'api_key_1': [
+            http_error(503), ConnectionResetError(), http_error(500), http_error(502)]})
+        requester.max_retries = 3
+        self.assertRaises(SearchRequestError, requester.num_results, 'dog')
+        self.assertEqual(services['api_key_1'].num_calls, 4)
+        self.assertNotIn('dog', requester.cache)
+
+
+class SleepingRequests:
+    '''
+    Replacement of _execute_request, which sleeps for seconds and records the
+    executed requests and the maximal number of requests in flight. The
+    request failing raises SearchRequestError.
+    '''
+
+    def __init__(self, seconds: float, failing: str = None):
+        self.seconds = seconds
+        self.failing = failing
+        self.executed = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, search_string: str) -> dict:
+        with self.lock:
+            self.executed.append(search_string)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.in_flight -= 1
+        if search_string == self.failing:
+            raise SearchRequestError(search_string)
+        return {'searchInformation': {'totalResults': str(len(search_string))}}
+
+
+class AsyncGoogleRequesterCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.key_pool = KeyPool(KEYS, path=Path(self.temp_dir.name) / 'usage.db')
+
+    def tearDown(self):
+        self.key_pool.close()
+        self.temp_dir.cleanup()
+
+    def create_requester(self, requests: SleepingRequests, **kwargs) -> AsyncGoogleRequester:
+        requester = AsyncGoogleRequester(KEYS, cache=SqliteSearchCache(':memory:'),
+                                         key_pool=self.key_pool, **kwargs)
+        requester._execute_request = requests
+        self.addCleanup(requester.close)
+        return requester
+
+    def test_max_in_flight(self):
+        requests = SleepingRequests(0.05)
+        requester = self.create_requester(requests, max_in_flight=3)
+        requester.num_results_of_all(['request {}'.format(idx) for idx in range(12)])
+        self.assertEqual(len(requests.executed), 12)
+        self.assertEqual(requests.max_in_flight, 3)
+
+    def test_requests_per_second(self):
+        requests = SleepingRequests(0)
+        requester = self.create_requester(requests, max_in_flight=8, requests_per_second=20)
+        start = time.monotonic()
+        requester.num_results_of_all(['request {}'.format(idx) for idx in range(10)])
+        seconds = time.monotonic() - start
+        self.assertGreaterEqual(seconds, 9 / 20 - 0.01)
+        self.assertLess(seconds, 10 / 20 + 0.3)
+
+    def test_order_and_cache(self):
+        requests = SleepingRequests(0.01)
+        requester = self.create_requester(requests)
+        requester.cache.put('bird', {'searchInformation': {'totalResults': '1'}})
+        self.assertEqual(requester.num_results_of_all(['horse', 'cat', 'bird', 'cat']),
+                         [5, 3, 1, 3])
+        self.assertEqual(sorted(requests.executed), ['cat', 'horse'])
+        self.assertIn('horse', requester.cache)
+        self.assertIn('cat', requester.cache)
+        self.assertEqual(requester.num_results_of_all(['cat', 'horse']), [3, 5])
+        self.assertEqual(len(requests.executed), 2)
+
+    def test_failure_cancels_pending_requests(self):
+        requests = SleepingRequests(0.05, failing='request 0')
+        requester = self.create_requester(requests, max_in_flight=2)
+        search_strings = ['request {}'.format(idx) for idx in range(10)]
+        self.assertRaises(SearchRequestError, requester.num_results_of_all, search_strings)
+        num_executed = len(requests.executed)
+        self.assertLess(num_executed, len(search_strings))
+        time.sleep(0.2)
+        self.assertEqual(len(requests.executed), num_executed)
+        self.assertEqual(requests.in_flight, 0)
+        self.assertNotIn(search_strings[-1], requester.cache)
+
+    def test_running_event_loop(self):
+        requester = self.create_requester(SleepingRequests(0))
+
+        async def request():
+            return requester.num_results('dog')
+
+        self.assertRaises(RuntimeError, asyncio.run, request())
+
+
+if __name__ == '__main__':
+    unittest.main()
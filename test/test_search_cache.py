@@ -0,0 +1,75 @@
+import tempfile
+import unittest
+from pathlib import Path
+from pickle import dump
+
+from src.search_cache import SqliteSearchCache, migrate_pickle_folder, query_key, \
+    MIGRATED_SUFFIX
+
+RESULT = {'searchInformation': {'totalResults': '42'}, 'items': [{'snippet': 'a dog is a pet'}]}
+
+
+class SqliteSearchCacheCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / 'cache.db'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_put_and_get(self):
+        cache = SqliteSearchCache(self.path)
+        self.assertIsNone(cache.get('"a dog is a"'))
+        cache.put('"a dog is a"', RESULT)
+        self.assertEqual(cache.get('"a dog is a"'), RESULT)
+        cache.close()
+
+        cache = SqliteSearchCache(self.path)
+        self.assertEqual(cache.get('"a dog is a"'), RESULT)
+        cache.close()
+
+    def test_normalized_key(self):
+        self.assertEqual(query_key(' dog  cat '), query_key('dog cat'))
+        self.assertNotEqual(query_key('dog/cat'), query_key('dog cat'))
+
+        cache = SqliteSearchCache(self.path)
+        cache.put('dog  AROUND(10)   cat', RESULT)
+        self.assertIn('dog AROUND(10) cat', cache)
+        cache.close()
+
+    def test_ttl(self):
+        cache = SqliteSearchCache(self.path, ttl=-1)
+        cache.put('dog', RESULT)
+        self.assertIsNone(cache.get('dog'))
+        self.assertEqual(cache.num_entries, 0)
+        cache.close()
+
+    def test_lru_eviction(self):
+        cache = SqliteSearchCache(self.path, max_entries=2)
+        cache.put('dog', RESULT)
+        cache.put('cat', RESULT)
+        cache.get('dog')
+        cache.put('human', RESULT)
+        self.assertIn('dog', cache)
+        self.assertNotIn('cat', cache)
+        self.assertIn('human', cache)
+        cache.close()
+
+    def test_migration(self):
+        folder = Path(self.temp_dir.name) / '.searchRequests'
+        folder.mkdir()
+        with open(folder / '"a dog is a"', 'wb') as file:
+            dump(RESULT, file)
+
+        cache = SqliteSearchCache(self.path)
+        self.assertEqual(migrate_pickle_folder(str(folder), cache), 1)
+        self.assertEqual(cache.get('"a dog is a"'), RESULT)
+        self.assertFalse(folder.exists())
+        self.assertTrue(Path(str(folder) + MIGRATED_SUFFIX).exists())
+        self.assertEqual(migrate_pickle_folder(str(folder), cache), 0)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+import unittest
+
+from src.agentive_sequences import *
+from src.constitutive_sequences import *
+from src.formal_sequences import *
+from src.telic_sequences import *
+from src.qualia_structure import FORMAL, CONSTITUTIVE, AGENTIVE, TELIC
+from src.sequence_matcher import SequenceMatcher
+from src.spacy_utils import get_lang_model, token_sequences_to_str_seq, PatternNotFoundException
+
+# (semantic sequence, qualia theorem, sequence) of the pattern tests
+CORPUS = [
+    (ToANew(False), 'car',
+     'Therefore to carefully test a new car.'),
+    (ToANew(False), 'girl',
+     'They want to easily love a new girl.'),
+    (ToANew(False), 'car',
+     'After that we want to carefully buy new car.'),
+    (ToAComplete(False), 'car',
+     'Therefore to carefully test complete car.'),
+    (ToAComplete(False), 'girl',
+     'They want to easily love complete girl.'),
+    (ToAComplete(False), 'car',
+     'After that we want to carefully buy a complete car.'),
+    (NewHasBeen(False), 'car',
+     'A new car has been here bought.A new car has been destroyed.'),
+    (NewHasBeen(False), 'window',
+     'After that new window has been finally built'),
+    (NewHasBeen(False), 'car',
+     'My final advice was that a new car has been cleared.'),
+    (CompleteHasBeen(False), 'car',
+     'A complete car has been here bought. A complete car has been destroyed.'),
+    (CompleteHasBeen(False), 'window',
+     'After that the complete window has been finally built'),
+    (CompleteHasBeen(False), 'car',
+     'My final advice was that the complete car has been cleared.'),
+    (ToNew(True), 'cars',
+     'Therefore to carefully test new cars.'),
+    (ToNew(True), 'girls',
+     'They want to easily love new girls.'),
+    (ToNew(True), 'cars',
+     'After that we want to carefully buy new cars.'),
+    (ToComplete(True), 'cars',
+     'Therefore to carefully test complete cars.'),
+    (ToComplete(True), 'girls',
+     'They want to easily love complete girls.'),
+    (ToComplete(True), 'cars',
+     'After that we want to carefully buy complete cars.'),
+    (IsMadeUpOf(False), 'PC',
+     'PC is made up of golden banana. Additional PC is made up of metal'),
+    (IsMadeUpOf(False), 'device',
+     'An electronic device is made up of bolts.'),
+    (IsMadeUpOf(False), 'bolt',
+     'Furthermore the additional bolt is made up of metal.'),
+    (IsMadeOf(False), 'PC',
+     'PC is made of golden banana. Additional PC is made of metal'),
+    (IsMadeOf(False), 'device',
+     'An electronic device is made of bolts.'),
+    (IsMadeOf(False), 'bolt',
+     'Furthermore the additional bolt is made of metal.'),
+    (Comprises(False), 'Pizza',
+     'Pizza comprises hamburger. Additionally we celebrate pizza comprises nice salami.'),
+    (Comprises(False), 'bolt',
+     'The bolt comprises of metal which snap fits over one component and has spacer section on other side'),
+    (Comprises(False), 'Students',
+     'The students comprises of tears and depressions'),
+    (ConsistsOf(False), 'PC',
+     'PC consist of golden banana. Additional PC consist of metal'),
+    (ConsistsOf(False), 'Car',
+     'My car consist of golden bolts and other components.'),
+    (ConsistsOf(False), 'Students',
+     'The students consists of tears and depressions'),
+    (ConsistsOf(False), 'Bicycles',
+     'Bicycles consists of motorcycles.'),
+    (AreMadeOf(True), 'Computers',
+     'Computers are made of golden banana. Computers are made of metal.'),
+    (AreMadeOf(True), 'devices',
+     'All electronic devices are made of bolts.'),
+    (AreMadeOf(True), 'bolts',
+     'Furthermore the additional bolts are made of metal.'),
+    (AreMadeUpOf(True), 'Computers',
+     'Computers are made up of golden banana. Computers are made up of metal.'),
+    (AreMadeUpOf(True), 'devices',
+     'All electronic devices are made up of bolts.'),
+    (AreMadeUpOf(True), 'bolts',
+     'Furthermore the additional bolts are made up of metal.'),
+    (IsKindOf(False), 'Dog',
+     'Dog is kind of animal. Additional Dog is kind of human'),
+    (IsKindOf(False), 'aunt',
+     'My aunt is kind of human and likes my turtle.'),
+    (IsKindOf(False), 'thing',
+     'Furthermore that thing is kind of magic.'),
+    (IsKindOf(False), 'bicycle',
+     'A bicycle is kind of funny.'),
+    (IsSemanticSequence(False), 'Dog',
+     'Dog is a nice animal. Additional Dog is a good friend.'),
+    (IsSemanticSequence(False), 'Dog',
+     'Dog is an animal.'),
+    (SuchAs(True), 'food',
+     'I like pommes such as food. Additionally i eat pizzas such as food.'),
+    (SuchAs(True), 'europeans',
+     'In medieval there were crusaders such as europeans.'),
+    (AndOther(True), 'PC',
+     'PC and other electronic devices. PC and other things.'),
+    (AndOther(True), 'animals',
+     'I very much into animals and other species'),
+    (AndOther(True), 'people',
+     'After thinking about nice people and other animals iwould like to start.'),
+    (AndOther(True), 'bicycles',
+     'Bicycles and other objects.'),
+    (OrOther(True), 'PC',
+     'PC or other electronic devices. PC or other things.'),
+    (OrOther(True), 'animals',
+     'I very much into animals or other species'),
+    (OrOther(True), 'people',
+     'After thinking about nice people or other animals iwould like to start.'),
+    (OrOther(True), 'bicycles',
+     'Bicycles or other objects.'),
+    (Especially(True), 'pizza',
+     'I like hamburger especially pizza. We ate salami especially pizza.'),
+    (Especially(True), 'things',
+     'I like moving pizzas especially things.'),
+    (Including(True), 'pizzas',
+     'I like foods including pizzas. We ate many things including pizzas.'),
+    (Including(True), 'things',
+     'I like moving pizzas including things.'),
+    (IsUsedTo(False), 'Human',
+     'Human is used to animals. Additional human is used to cats'),
+    (IsUsedTo(False), 'Human',
+     'A Human is used to be loved.'),
+    (IsUsedTo(False), 'Human',
+     'A Human is used to sacrifice'),
+    (IsUsedTo(False), 'computer',
+     'A computer is used to do things'),
+    (PurposeOfA(False), 'Satanism',
+     'And the purpose of Satanism is to destroy humanity. Furthermore the purpose of Satanism is sacrifice. Finallythe purpose of satanism is to be destroyed'),
+    (PurposeOfA(False), 'tank',
+     'I want to recognize that the purpose of a tank is war'),
+    (PurposeOfA(False), 'children',
+     'To conclude the purpose of children is to be loved'),
+    (PurposeOfA(False), 'children',
+     'Finally we have to say that the purpose of children is love'),
+    (PurposeOfA(False), 'bicycle',
+     'The purpose of a bicycle is to be free ride'),
+    (PurposeOfA(False), 'bicycle',
+     'The purpose of a bicycle is to learn'),
+    (PurposeOfA(False), 'bicycle',
+     'The purpose of a bicycle is to be the norm'),
+    (AreUsedTo(True), 'Humans',
+     'Humans are used to animals. Additional humans are used to cats'),
+    (AreUsedTo(True), 'Humans',
+     'Humans are used to be loved.'),
+    (AreUsedTo(True), 'Dogs',
+     'Dogs are used to sacrifice'),
+    (AreUsedTo(True), 'Dogs',
+     'Dogs are used to sacrifice humans'),
+]
+
+
+def extract_by_regex(semantic_seq, qualia_theorem, tokenized_seq):
+    try:
+        return token_sequences_to_str_seq(
+            semantic_seq.extract_qualia_elements_of_doc(qualia_theorem, tokenized_seq))
+    except PatternNotFoundException:
+        return PatternNotFoundException
+
+
+def extract_by_matcher(semantic_seq, matcher, tokenized_seq):
+    indices = matcher.find_matches(tokenized_seq).get(semantic_seq, [])
+    try:
+        return token_sequences_to_str_seq(
+            semantic_seq.extract_qualia_elements_of_matches(tokenized_seq, indices))
+    except PatternNotFoundException:
+        return PatternNotFoundException
+
+
+class SequenceMatcherCase(unittest.TestCase):
+
+    def test_same_extractions_as_regex(self):
+        for semantic_seq, qualia_theorem, sequence in CORPUS:
+            with self.subTest(semantic_seq=semantic_seq, sequence=sequence):
+                tokenized_seq = get_lang_model()(sequence)
+                matcher = SequenceMatcher([(semantic_seq, qualia_theorem)])
+                self.assertEqual(extract_by_matcher(semantic_seq, matcher, tokenized_seq),
+                                 extract_by_regex(semantic_seq, qualia_theorem, tokenized_seq))
+
+    def test_one_matcher_for_all_sequences(self):
+        all_sequences = [semantic_seq for role_pattern, _ in [FORMAL, CONSTITUTIVE, AGENTIVE,
+                                                               TELIC]
+                         for semantic_seq in role_pattern]
+        for qualia_theorem in dict.fromkeys(theorem for _, theorem, _ in CORPUS):
+            matcher = SequenceMatcher([(semantic_seq, qualia_theorem)
+                                       for semantic_seq in all_sequences])
+            for _, _, sequence in CORPUS:
+                tokenized_seq = get_lang_model()(sequence)
+                for semantic_seq in all_sequences:
+                    with self.subTest(semantic_seq=semantic_seq, qualia_theorem=qualia_theorem,
+                                      sequence=sequence):
+                        self.assertEqual(
+                            extract_by_matcher(semantic_seq, matcher, tokenized_seq),
+                            extract_by_regex(semantic_seq, qualia_theorem, tokenized_seq))
+
+    def test_lazy_wildcard(self):
+        to_new = ToNew(True)
+        tokenized_seq = get_lang_model()('We want to buy new cars and to sell new cars.')
+        self.assertEqual(SequenceMatcher([(to_new, 'cars')]).find_matches(tokenized_seq),
+                         {to_new: [(2, 5), (7, 10)]})
+
+
+if __name__ == '__main__':
+    unittest.main()
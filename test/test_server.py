@@ -0,0 +1,97 @@
+import asyncio
+import json
+import unittest
+
+from src.qualia_structure import CreationStrategy, DebugQualiaStructure, WordNotSupportedError
+from src.server import QualiaServer, percentile
+
+
+class BatchRecordingStrategy(CreationStrategy):
+    '''
+    Strategy which records its batches and creates empty structures. The
+    creation of cow fails.
+    '''
+
+    def __init__(self):
+        super().__init__({'dog': 'dogs', 'cat': 'cats', 'cow': 'cows'})
+        self.batches = []
+
+    def generate_qualia_structures(self, qualia_theorems: [str]) -> [(str, object)]:
+        self.batches.append(list(qualia_theorems))
+        results = []
+        for qualia_theorem in qualia_theorems:
+            if qualia_theorem == 'cow':
+                results.append((qualia_theorem, WordNotSupportedError('Could not inflect cow')))
+            else:
+                results.append((qualia_theorem, DebugQualiaStructure(qualia_theorem)))
+        return results
+
+
+def encode_result(qualia_theorem: str, result) -> str:
+    if isinstance(result, Exception):
+        return json.dumps({'theorem': qualia_theorem, 'error': str(result)})
+    return json.dumps({'theorem': qualia_theorem})
+
+
+async def request(port: int, target: str) -> (int, dict):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write('GET {} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'
+                 .format(target).encode('latin-1'))
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+    return int(head.split()[1]), json.loads(body.decode('utf-8'))
+
+
+class ServerCase(unittest.TestCase):
+
+    def run_with_server(self, client, batch_window: float = 0.05):
+        strategy = BatchRecordingStrategy()
+        server = QualiaServer(strategy, encode_result, batch_window=batch_window)
+
+        async def run():
+            started = asyncio.get_event_loop().create_future()
+            serve_task = asyncio.ensure_future(server.serve(port=0, started=started))
+            try:
+                return await client(await started)
+            finally:
+                serve_task.cancel()
+                await asyncio.gather(serve_task, return_exceptions=True)
+
+        return strategy, asyncio.run(run())
+
+    def test_coalesce_and_batch(self):
+        async def client(port: int):
+            responses = await asyncio.gather(*[request(port, '/qualia?theorem={}'.format(theorem))
+                                               for theorem in ['dog', 'cat', 'dog', 'cow', 'dog']])
+            return responses, await request(port, '/stats')
+
+        strategy, (responses, (_, stats)) = self.run_with_server(client)
+        self.assertEqual(strategy.batches, [['dog', 'cat', 'cow']])
+        self.assertEqual([status for status, _ in responses], [200, 200, 200, 422, 200])
+        self.assertEqual(responses[3][1]['theorem'], 'cow')
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['coalesced'], 2)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['batches'], 1)
+        self.assertEqual(stats['maxQueueDepth'], 3)
+        self.assertEqual(stats['latencyMs']['count'], 5)
+
+    def test_bad_requests(self):
+        async def client(port: int):
+            return [await request(port, target) for target in ['/qualia', '/unknown']]
+
+        strategy, responses = self.run_with_server(client)
+        self.assertEqual([status for status, _ in responses], [400, 404])
+        self.assertEqual(strategy.batches, [])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([3], 0.95), 3)
+        self.assertIsNone(percentile([], 0.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from src.inflection import WordNotSupportedError
+from src.prediction_cache import PredictionCache
+from src.worker_pool import map_in_workers
+
+
+def _inflect(word: str) -> str:
+    if word == 'crash':
+        os._exit(1)
+    if word == 'slow':
+        time.sleep(0.2)
+        return word
+    if not word.isalpha():
+        raise WordNotSupportedError('Could not inflect {}'.format(word))
+    return word + 's'
+
+
+@unittest.skipUnless('fork' in multiprocessing.get_all_start_methods(), 'fork is not supported')
+class WorkerPoolCase(unittest.TestCase):
+
+    def test_results_in_order(self):
+        words = ['dog', 'cat', '42', 'knife', 'computer'] * 3
+        results = list(map_in_workers(_inflect, iter(words), 3))
+        self.assertEqual([word for word, _ in results], words)
+        for word, result in results:
+            if word == '42':
+                self.assertIsInstance(result, WordNotSupportedError)
+            else:
+                self.assertEqual(result, word + 's')
+
+    def test_dead_worker(self):
+        words = ['slow', 'crash', 'knife'] + ['cat'] * 10
+        results = list(map_in_workers(_inflect, words, 2))
+        self.assertEqual([word for word, _ in results], words)
+        self.assertEqual(results[0][1], 'slow')
+        self.assertIsInstance(results[1][1], Exception)
+        self.assertEqual([result for _, result in results[2:]], [word + 's' for word in words[2:]])
+
+    def test_forked_cache(self):
+        with tempfile.TemporaryDirectory() as folder:
+            cache = PredictionCache(Path(folder) / 'predictions.db')
+            cache.put_many([('parent', np.array([1]), np.array([1.0]))])
+
+            def put(key: str) -> int:
+                cache.put_many([(key, np.array([2]), np.array([0.5]))])
+                return len(cache.get_many(['parent', key]))
+
+            keys = ['key_{}'.format(i) for i in range(8)]
+            self.assertEqual([result for _, result in map_in_workers(put, keys, 4)], [2] * 8)
+            self.assertEqual(len(cache.get_many(['parent'] + keys)), 9)
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()